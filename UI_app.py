@@ -10,6 +10,15 @@ import traceback
 import itertools
 import json
 import os
+import hashlib
+import pickle
+import threading
+import queue
+import socket
+import shutil
+import sqlite3
+import uuid
+import atexit
 from typing import Dict, List, Optional, Any, Tuple, Union
 
 def get_core_folder_path():
@@ -564,8 +573,12 @@ def validate_date_range(start_date, end_date):
 
 # Add these functions after the existing utility functions
 def save_file_paths(file_paths):
-    """Save file paths to a JSON file for persistence."""
+    """Save file paths to a JSON file (or the active project database's settings) for persistence."""
     try:
+        project_db = active_project_db()
+        if project_db:
+            set_project_setting(project_db, 'file_paths', file_paths)
+            return
         config_path = "./.ui_config.json"
         with open(config_path, 'w') as f:
             json.dump(file_paths, f)
@@ -600,9 +613,18 @@ def get_file_paths():
         'soft_constraints': base_path + 'soft_constraints.xlsx'
     }
     
+    # A project database replaces the workbooks with its datasets
+    project_db = active_project_db()
+    if project_db:
+        project_paths = {key: project_dataset_path(project_db, key) for key in default_paths}
+        saved_paths = get_project_setting(project_db, 'file_paths', {})
+        project_paths.update({key: path for key, path in saved_paths.items() if key in project_paths})
+        return project_paths
+    
     # Try to load saved paths
     saved_paths = load_saved_file_paths()
     if saved_paths:
+        saved_paths.pop('project_db', None)
         # Use saved paths, but fall back to defaults for any missing keys
         for key in default_paths:
             if key not in saved_paths:
@@ -637,18 +659,22 @@ def update_session_state_after_upload(config_key, temp_path, uploaded_file, lang
         elif config_key == 'shifts':
             # Load the uploaded shift data into session state  
             new_shifts_df = pd.read_excel(temp_path)
-            new_shifts_df = ensure_proper_shift_data_types(new_shifts_df)
+            invalid_times = []
+            new_shifts_df = ensure_proper_shift_data_types(new_shifts_df, invalid_times)
             st.session_state.shifts_df = new_shifts_df.copy()
+            st.session_state.unparseable_shift_times = invalid_times
             
         elif config_key == 'hard_constraints':
             # Load the uploaded hard constraints into session state
             new_constraints_df = pd.read_excel(temp_path)
             st.session_state.hard_constraints_df = new_constraints_df.copy()
+            st.session_state.pop('hard_constraints_saved', None)
             
         elif config_key == 'soft_constraints':
             # Load the uploaded soft constraints into session state
             new_constraints_df = pd.read_excel(temp_path)
             st.session_state.soft_constraints_df = new_constraints_df.copy()
+            st.session_state.pop('soft_constraints_saved', None)
             
         # Mark this file as processed BEFORE calling rerun
         st.session_state[processed_files_key] = file_hash
@@ -659,20 +685,754 @@ def update_session_state_after_upload(config_key, temp_path, uploaded_file, lang
     except Exception as e:
         st.warning(f"Could not update session state: {str(e)}")
 
+# =============================================================================
+# PERSISTENT WORKBOOK CACHE
+# Normalized DataFrames are pickled next to a small JSON signature so that a
+# fresh Streamlit process does not have to re-parse unchanged Excel files.
+# =============================================================================
+
+WORKBOOK_CACHE_DIR = "./.ui_cache"
+
+# Bump this whenever the normalization in the load_* functions changes, so
+# frames cached by an older version of the UI are rebuilt.
+WORKBOOK_CACHE_VERSION = 2
+
+def _file_content_hash(file_path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _workbook_cache_paths(file_path, kind):
+    """Return (signature_path, frame_path) for the sidecar cache of a workbook."""
+    key = hashlib.sha1(f"{kind}|{os.path.abspath(file_path)}".encode('utf-8')).hexdigest()
+    base = os.path.join(WORKBOOK_CACHE_DIR, f"{kind}_{key}")
+    return base + ".json", base + ".pkl"
+
+def load_cached_frame(file_path, kind):
+    """
+    Return the cached normalized DataFrame for a workbook, or None on a miss.
+
+    The cache entry is keyed by path, mtime, size and content hash. When only
+    the mtime changed (e.g. the file was re-saved without edits) the content
+    hash is compared and the entry is kept if the bytes are identical.
+    """
+    signature_path, frame_path = _workbook_cache_paths(file_path, kind)
+    try:
+        if not (os.path.exists(signature_path) and os.path.exists(frame_path)):
+            return None
+
+        with open(signature_path, 'r') as f:
+            signature = json.load(f)
+
+        stat = os.stat(file_path)
+        if (signature.get('version') != WORKBOOK_CACHE_VERSION or
+                signature.get('path') != os.path.abspath(file_path) or
+                signature.get('size') != stat.st_size):
+            return None
+
+        if signature.get('mtime') != stat.st_mtime:
+            # Same size but touched - only trust the cache if the bytes match
+            if signature.get('sha256') != _file_content_hash(file_path):
+                return None
+            signature['mtime'] = stat.st_mtime
+            with open(signature_path, 'w') as f:
+                json.dump(signature, f)
+
+        with open(frame_path, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        # A broken cache entry is treated as a miss
+        return None
+
+def store_cached_frame(file_path, kind, df):
+    """Write the normalized DataFrame for a workbook to the sidecar cache."""
+    signature_path, frame_path = _workbook_cache_paths(file_path, kind)
+    try:
+        os.makedirs(WORKBOOK_CACHE_DIR, exist_ok=True)
+        stat = os.stat(file_path)
+        signature = {
+            'version': WORKBOOK_CACHE_VERSION,
+            'path': os.path.abspath(file_path),
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'sha256': _file_content_hash(file_path)
+        }
+
+        # Write to temporary files first so a crash never leaves a half-written entry
+        with open(frame_path + ".tmp", 'wb') as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(signature_path + ".tmp", 'w') as f:
+            json.dump(signature, f)
+        os.replace(frame_path + ".tmp", frame_path)
+        os.replace(signature_path + ".tmp", signature_path)
+    except Exception:
+        # Silently ignore cache write errors - the workbook is still the source of truth
+        pass
+
+# =============================================================================
+# CACHED LOADER REGISTRY
+# Tracks which st.cache_data loader entries were built from which file, so a
+# save only evicts the entries that depend on the file that was written.
+# =============================================================================
+
+@st.cache_resource
+def _get_loader_registry():
+    """Process-wide registry shared by all sessions: {'lock': Lock, 'entries': {path: {(loader, arg)}}}."""
+    return {'lock': threading.Lock(), 'entries': {}}
+
+def _normalize_cache_path(file_path):
+    """Normalize a file path so different spellings of the same file share registry entries."""
+    return os.path.normcase(os.path.abspath(file_path))
+
+def register_cached_load(loader_name, file_path):
+    """Record that a cached loader has an entry for file_path (called on cache misses)."""
+    registry = _get_loader_registry()
+    with registry['lock']:
+        registry['entries'].setdefault(_normalize_cache_path(file_path), set()).add((loader_name, file_path))
+
+def invalidate_cached_loaders(file_path):
+    """Evict only the cached loader entries that were built from file_path."""
+    loaders = {
+        'load_employees': load_employees,
+        'load_shifts': load_shifts,
+        '_load_constraints_workbook': _load_constraints_workbook
+    }
+    
+    registry = _get_loader_registry()
+    with registry['lock']:
+        entries = registry['entries'].pop(_normalize_cache_path(file_path), set())
+    
+    for loader_name, loader_arg in entries:
+        loader = loaders.get(loader_name)
+        if loader is None:
+            continue
+        try:
+            loader.clear(loader_arg)
+        except TypeError:
+            # Older Streamlit versions can only clear the whole function cache
+            loader.clear()
+
+# =============================================================================
+# WORKBOOK PROBE
+# Previews only need the header and a few rows; the full parse of large
+# schedules happens once, in the solver process.
+# =============================================================================
+
+WORKBOOK_PREVIEW_ROWS = 5
+
+def probe_schedule_workbook(file_path, n_rows: int = WORKBOOK_PREVIEW_ROWS) -> Tuple[pd.DataFrame, Optional[int]]:
+    """
+    Read the header row and the first n_rows of the first sheet.
+    
+    .xlsx files are streamed with openpyxl in read-only mode, and the total
+    row count comes from the sheet's stored dimensions. Other formats fall
+    back to pd.read_excel(nrows=n_rows).
+    
+    Returns:
+        Tuple of (preview DataFrame, number of data rows or None if unknown)
+    """
+    if parse_project_path(file_path):
+        df = read_project_dataset(file_path)
+        return df.head(n_rows), len(df)
+    if str(file_path).lower().endswith(('.xlsx', '.xlsm')):
+        try:
+            from openpyxl import load_workbook
+            
+            workbook = load_workbook(file_path, read_only=True, data_only=True)
+            try:
+                sheet = workbook.worksheets[0]
+                rows = sheet.iter_rows(values_only=True)
+                header = next(rows, None)
+                if header is None:
+                    return pd.DataFrame(), 0
+                data = list(itertools.islice(rows, n_rows))
+                columns = [column if column is not None else f"Unnamed: {position}"
+                           for position, column in enumerate(header)]
+                total_rows = sheet.max_row - 1 if sheet.max_row else None
+            finally:
+                workbook.close()
+            return pd.DataFrame(data, columns=columns), total_rows
+        except ImportError:
+            pass
+    
+    return pd.read_excel(file_path, nrows=n_rows), None
+
+def describe_historical_workbook(preview_df: pd.DataFrame, total_rows: Optional[int]) -> Optional[Dict[str, Any]]:
+    """
+    Build historical_info from a probed workbook: first column employee IDs,
+    remaining columns dates.
+    
+    Returns:
+        Dict with num_employees, start_date, end_date and num_days, or None
+        if there are no date columns
+    """
+    date_columns = [col for col in preview_df.columns[1:] if col != preview_df.columns[0]]
+    if not date_columns:
+        return None
+    return {
+        'num_employees': total_rows if total_rows is not None else len(preview_df),
+        'start_date': pd.to_datetime(date_columns[0]).date(),
+        'end_date': pd.to_datetime(date_columns[-1]).date(),
+        'num_days': len(date_columns)
+    }
+
+# =============================================================================
+# PROJECT DATABASE
+# Optional single-file SQLite store for employees, shifts, constraints,
+# holidays and settings. When .ui_config.json names a project database,
+# get_file_paths returns pseudo paths "sqlite:<db>#<dataset>" that the
+# loaders, save_dataframe and the holiday helpers route here. A save is a
+# row-level diff applied as upserts and deletes in one transaction, and rows
+# another planner added since the table was loaded are kept. The solver and
+# the core test functions still read xlsx: solver_input_path exports each
+# dataset revision once to ./.ui_cache/project/. Dates and times are stored
+# as ISO text; the column kinds are recorded so reads restore them. The row
+# keys a session loaded are kept in st.session_state, because the table on
+# screen is rebuilt with concat by the editors and the constraint form.
+# =============================================================================
+
+PROJECT_DB_SCHEME = "sqlite:"
+PROJECT_DATASETS = ('employees', 'shifts', 'hard_constraints', 'soft_constraints')
+PROJECT_NATURAL_KEYS = {'employees': 'ID', 'shifts': 'shift_ID'}
+PROJECT_EXPORT_DIR = os.path.join(WORKBOOK_CACHE_DIR, "project")
+
+_PROJECT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    dataset TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (dataset, row_key)
+);
+CREATE INDEX IF NOT EXISTS records_by_position ON records (dataset, position);
+CREATE TABLE IF NOT EXISTS dataset_columns (
+    dataset TEXT PRIMARY KEY,
+    columns TEXT NOT NULL,
+    kinds TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS holidays (
+    day TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+def project_dataset_path(db_path, dataset) -> str:
+    """Pseudo path of a dataset in a project database."""
+    return f"{PROJECT_DB_SCHEME}{os.path.abspath(db_path)}#{dataset}"
+
+def parse_project_path(file_path) -> Optional[Tuple[str, str]]:
+    """(database path, dataset) for a project pseudo path, None for ordinary files."""
+    if not isinstance(file_path, str) or not file_path.startswith(PROJECT_DB_SCHEME) or '#' not in file_path:
+        return None
+    db_path, dataset = file_path[len(PROJECT_DB_SCHEME):].rsplit('#', 1)
+    return db_path, dataset
+
+def active_project_db() -> Optional[str]:
+    """Project database named in .ui_config.json, if any."""
+    return (load_saved_file_paths() or {}).get('project_db') or None
+
+def dataset_exists(file_path) -> bool:
+    """os.path.exists for workbooks and project datasets."""
+    project = parse_project_path(file_path)
+    if project is None:
+        return bool(file_path) and os.path.exists(file_path)
+    return os.path.exists(project[0])
+
+def _connect_project_db(db_path) -> sqlite3.Connection:
+    """Open a project database (created on first use); transactions are explicit."""
+    connection = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(_PROJECT_SCHEMA)
+    return connection
+
+def _project_cell(value):
+    """JSON-safe form of a DataFrame cell (blanks become None, dates ISO strings)."""
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    if isinstance(value, (pd.Timestamp, datetime, date, time)):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+def _project_column_kind(series: pd.Series) -> Optional[str]:
+    """'datetime', 'date' or 'time' for columns whose cells are stored as ISO text, otherwise None."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'datetime'
+    if series.dtype != object:
+        return None
+    values = series.dropna()
+    if values.empty:
+        return None
+    first = values.iloc[0]
+    if isinstance(first, (pd.Timestamp, datetime)):
+        return 'datetime'
+    if isinstance(first, date):
+        return 'date'
+    if isinstance(first, time):
+        return 'time'
+    return None
+
+def _project_column_kinds(df: pd.DataFrame) -> Dict[str, str]:
+    kinds = {str(column): _project_column_kind(df[column]) for column in df.columns}
+    return {column: kind for column, kind in kinds.items() if kind}
+
+def _restore_project_column(series: pd.Series, kind) -> pd.Series:
+    """Turn the ISO text of a stored date/time column back into the type it was saved with."""
+    if kind == 'datetime':
+        return pd.to_datetime(series, errors='coerce')
+    parse = date.fromisoformat if kind == 'date' else time.fromisoformat
+    
+    def restore(value):
+        if not isinstance(value, str):
+            return value
+        try:
+            return parse(value)
+        except ValueError:
+            return value
+    
+    return series.map(restore).astype(object)
+
+def _write_project_columns(connection, dataset, columns: List[str], kinds: Dict[str, str]):
+    connection.execute(
+        "INSERT INTO dataset_columns (dataset, columns, kinds) VALUES (?, ?, ?) "
+        "ON CONFLICT(dataset) DO UPDATE SET columns = excluded.columns, kinds = excluded.kinds",
+        (dataset, json.dumps(columns, ensure_ascii=False), json.dumps(kinds, ensure_ascii=False))
+    )
+
+def _read_project_columns(connection, dataset) -> Tuple[Optional[List[str]], Dict[str, str]]:
+    row = connection.execute("SELECT columns, kinds FROM dataset_columns WHERE dataset = ?", (dataset,)).fetchone()
+    if row is None:
+        return None, {}
+    return json.loads(row[0]), json.loads(row[1] or '{}')
+
+def _project_row_keys(dataset, df: pd.DataFrame, payloads: List[str]) -> List[str]:
+    """Row keys: the natural ID where it is present and unique, otherwise content hash plus occurrence."""
+    natural_key = PROJECT_NATURAL_KEYS.get(dataset)
+    if natural_key in df.columns:
+        ids = [_project_cell(value) for value in df[natural_key]]
+        ids = [str(value).strip() if value is not None else '' for value in ids]
+        if all(ids) and len(set(ids)) == len(ids):
+            return [f"id:{value}" for value in ids]
+    
+    occurrences = {}
+    keys = []
+    for payload in payloads:
+        digest = hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+        occurrences[digest] = occurrences.get(digest, 0) + 1
+        keys.append(f"h:{digest}:{occurrences[digest] - 1}")
+    return keys
+
+def _bump_project_revision(connection, dataset):
+    connection.execute(
+        "INSERT INTO settings (key, value) VALUES (?, '1') "
+        "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+        (f"revision:{dataset}",)
+    )
+
+def _project_revision(connection, dataset) -> int:
+    row = connection.execute("SELECT value FROM settings WHERE key = ?", (f"revision:{dataset}",)).fetchone()
+    return int(row[0]) if row else 0
+
+def read_project_dataset(file_path) -> pd.DataFrame:
+    """
+    Read a dataset from the project database in its stored row order.
+    
+    Date and time columns are restored to the types they were saved with.
+    The row keys and stored payloads are put in df.attrs for
+    remember_project_rows; they do not survive concat, so the caller that
+    puts the table in session state must remember them.
+    """
+    db_path, dataset = parse_project_path(file_path)
+    connection = _connect_project_db(db_path)
+    try:
+        rows = connection.execute(
+            "SELECT row_key, payload FROM records WHERE dataset = ? ORDER BY position, row_key", (dataset,)
+        ).fetchall()
+        columns, kinds = _read_project_columns(connection, dataset)
+    finally:
+        connection.close()
+    
+    df = pd.DataFrame([json.loads(payload) for _, payload in rows], columns=columns)
+    for column, kind in kinds.items():
+        if column in df.columns:
+            df[column] = _restore_project_column(df[column], kind)
+    df.attrs['project_row_keys'] = [row_key for row_key, _ in rows]
+    df.attrs['project_row_payloads'] = [payload for _, payload in rows]
+    return df
+
+def _project_payloads(df: pd.DataFrame) -> List[str]:
+    """Stored JSON payload of every row of df."""
+    columns = [str(column) for column in df.columns]
+    return [json.dumps({column: _project_cell(value) for column, value in zip(columns, values)},
+                       ensure_ascii=False, default=str)
+            for values in df.itertuples(index=False, name=None)]
+
+def _project_fingerprint(payload: str) -> str:
+    """Content of a payload without blank cells, so rows compare equal whatever columns the table has."""
+    cells = {column: value for column, value in json.loads(payload).items() if value not in (None, '')}
+    return json.dumps(cells, sort_keys=True, ensure_ascii=False, default=str)
+
+def remember_project_rows(file_path, df: pd.DataFrame):
+    """
+    Record the rows of a project dataset as this session loaded them.
+    
+    Call with the frame returned by a loader, before it is copied into
+    session state; ordinary workbooks are ignored. Saves compare against
+    this baseline (see save_project_dataset).
+    """
+    keys = df.attrs.get('project_row_keys')
+    payloads = df.attrs.get('project_row_payloads')
+    if parse_project_path(file_path) is None or keys is None or payloads is None:
+        return
+    st.session_state.setdefault('project_loaded_rows', {})[file_path] = {
+        key: (payload, _project_fingerprint(payload)) for key, payload in zip(keys, payloads)
+    }
+
+def _remembered_project_rows(file_path) -> Optional[Dict[str, Tuple[str, str]]]:
+    return st.session_state.get('project_loaded_rows', {}).get(file_path)
+
+def save_project_dataset(file_path, df: pd.DataFrame, loaded=None) -> Dict[str, Any]:
+    """
+    Write a table to the project database as a row-level diff in one transaction.
+    
+    Rows are matched to the rows this session loaded (by natural ID, or by
+    content for datasets without one). Only rows the user added, edited or
+    deleted are written. An edit or delete of a row that another planner
+    changed since it was loaded is not applied but reported as a conflict.
+    
+    Args:
+        file_path: Project pseudo path
+        df: The full table as the user sees it
+        loaded: {row key: (payload, fingerprint)} from remember_project_rows.
+            With None every row that differs from the database is written
+            and nothing is deleted (imports).
+        
+    Returns:
+        Dict with upserted and deleted row counts, conflicts (row keys that
+        were left alone), keys of the table's rows and loaded (the baseline
+        for the next save)
+    """
+    db_path, dataset = parse_project_path(file_path)
+    columns = [str(column) for column in df.columns]
+    payloads = _project_payloads(df)
+    keys = _project_row_keys(dataset, df, payloads)
+    fingerprints = [_project_fingerprint(payload) for payload in payloads]
+    kinds = _project_column_kinds(df)
+    now = datetime.now().isoformat(timespec='seconds')
+    
+    connection = _connect_project_db(db_path)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        existing = {row_key: (position, payload) for row_key, position, payload in connection.execute(
+            "SELECT row_key, position, payload FROM records WHERE dataset = ?", (dataset,))}
+        next_position = max((position for position, _ in existing.values()), default=-1) + 1
+        upserts, removed, conflicts, baseline = [], [], [], {}
+        
+        if loaded is None:
+            for position, (key, payload) in enumerate(zip(keys, payloads)):
+                if existing.get(key) != (position, payload):
+                    upserts.append((dataset, key, position, payload, now))
+                baseline[key] = (payload, _project_fingerprint(payload))
+        else:
+            # Match the table's rows to the loaded rows: by ID, else by
+            # content and then edited rows to the leftover loaded rows in order
+            if all(key.startswith('id:') for key in keys):
+                matches = [key if key in loaded else None for key in keys]
+            else:
+                by_fingerprint = {}
+                for loaded_key, (_, fingerprint) in loaded.items():
+                    by_fingerprint.setdefault(fingerprint, []).append(loaded_key)
+                matches = [by_fingerprint[fingerprint].pop(0) if by_fingerprint.get(fingerprint) else None
+                           for fingerprint in fingerprints]
+                taken = set(matches)
+                leftover = iter([loaded_key for loaded_key in loaded if loaded_key not in taken])
+                matches = [match if match is not None else next(leftover, None) for match in matches]
+            matched = {match for match in matches if match is not None}
+            
+            for key, payload, fingerprint, loaded_key in zip(keys, payloads, fingerprints, matches):
+                if loaded_key is not None:
+                    loaded_payload, loaded_fingerprint = loaded[loaded_key]
+                    if fingerprint == loaded_fingerprint:
+                        baseline[loaded_key] = loaded[loaded_key]  # untouched by this session
+                    elif loaded_key in existing and existing[loaded_key][1] != loaded_payload:
+                        conflicts.append(loaded_key)  # another planner edited it since
+                        baseline[loaded_key] = loaded[loaded_key]
+                    else:
+                        position = existing[loaded_key][0] if loaded_key in existing else next_position
+                        next_position += loaded_key not in existing
+                        upserts.append((dataset, loaded_key, position, payload, now))
+                        baseline[loaded_key] = (payload, fingerprint)
+                elif key in existing:
+                    # Another planner added a row with the same ID
+                    if _project_fingerprint(existing[key][1]) != fingerprint:
+                        conflicts.append(key)
+                    else:
+                        baseline[key] = (existing[key][1], fingerprint)
+                else:
+                    upserts.append((dataset, key, next_position, payload, now))
+                    next_position += 1
+                    baseline[key] = (payload, fingerprint)
+            
+            for loaded_key in set(loaded) - matched:
+                if loaded_key not in existing:
+                    continue
+                if existing[loaded_key][1] == loaded[loaded_key][0]:
+                    removed.append(loaded_key)
+                else:
+                    conflicts.append(loaded_key)
+                    baseline[loaded_key] = loaded[loaded_key]
+        
+        connection.executemany("DELETE FROM records WHERE dataset = ? AND row_key = ?",
+                               [(dataset, key) for key in removed])
+        connection.executemany(
+            "INSERT INTO records (dataset, row_key, position, payload, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(dataset, row_key) DO UPDATE SET position = excluded.position, "
+            "payload = excluded.payload, updated_at = excluded.updated_at",
+            upserts
+        )
+        _write_project_columns(connection, dataset, columns, kinds)
+        if upserts or removed:
+            _bump_project_revision(connection, dataset)
+        connection.execute("COMMIT")
+    except Exception:
+        connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.close()
+    return {'upserted': len(upserts), 'deleted': len(removed), 'conflicts': conflicts, 'keys': keys,
+            'loaded': baseline}
+
+def append_project_rows(file_path, rows: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Insert rows at the end of a dataset in one transaction (constraint form additions); returns {key: payload}."""
+    db_path, dataset = parse_project_path(file_path)
+    now = datetime.now().isoformat(timespec='seconds')
+    keys = [f"a:{uuid.uuid4().hex}" for _ in rows]
+    payloads = [json.dumps({column: _project_cell(value) for column, value in row.items()},
+                           ensure_ascii=False, default=str) for row in rows]
+    connection = _connect_project_db(db_path)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        next_position = connection.execute(
+            "SELECT COALESCE(MAX(position) + 1, 0) FROM records WHERE dataset = ?", (dataset,)
+        ).fetchone()[0]
+        connection.executemany(
+            "INSERT INTO records (dataset, row_key, position, payload, updated_at) VALUES (?, ?, ?, ?, ?)",
+            [(dataset, key, next_position + offset, payload, now)
+             for offset, (key, payload) in enumerate(zip(keys, payloads))]
+        )
+        
+        # New parameters become columns of the dataset; known column kinds are kept
+        columns, kinds = _read_project_columns(connection, dataset)
+        columns = list(dict.fromkeys((columns or []) + [column for row in rows for column in row]))
+        kinds = {**_project_column_kinds(pd.DataFrame(rows)), **kinds}
+        _write_project_columns(connection, dataset, columns, kinds)
+        _bump_project_revision(connection, dataset)
+        connection.execute("COMMIT")
+    except Exception:
+        connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.close()
+    return dict(zip(keys, payloads))
+
+def load_project_holidays(db_path) -> List[date]:
+    connection = _connect_project_db(db_path)
+    try:
+        days = [row[0] for row in connection.execute("SELECT day FROM holidays ORDER BY day")]
+    finally:
+        connection.close()
+    return [date.fromisoformat(day) for day in days]
+
+def save_project_holidays(db_path, holiday_list):
+    """Replace the holiday set with row-level inserts and deletes in one transaction."""
+    days = {holiday.isoformat() for holiday in holiday_list}
+    connection = _connect_project_db(db_path)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        existing = {row[0] for row in connection.execute("SELECT day FROM holidays")}
+        connection.executemany("DELETE FROM holidays WHERE day = ?", [(day,) for day in existing - days])
+        connection.executemany("INSERT INTO holidays (day) VALUES (?)", [(day,) for day in days - existing])
+        connection.execute("COMMIT")
+    except Exception:
+        connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.close()
+
+def get_project_setting(db_path, key, default=None):
+    connection = _connect_project_db(db_path)
+    try:
+        row = connection.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+    finally:
+        connection.close()
+    return json.loads(row[0]) if row else default
+
+def set_project_setting(db_path, key, value):
+    connection = _connect_project_db(db_path)
+    try:
+        connection.execute(
+            "INSERT INTO settings (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, json.dumps(value))
+        )
+    finally:
+        connection.close()
+
+def solver_input_path(file_path) -> str:
+    """
+    Path the solver can read for a data file.
+    
+    Ordinary files are returned unchanged; a project dataset is exported to
+    xlsx once per revision and the export path is returned.
+    """
+    project = parse_project_path(file_path)
+    if project is None:
+        return file_path
+    db_path, dataset = project
+    connection = _connect_project_db(db_path)
+    try:
+        revision = _project_revision(connection, dataset)
+    finally:
+        connection.close()
+    
+    prefix = f"{hashlib.sha1(db_path.encode('utf-8')).hexdigest()[:8]}_{dataset}_r"
+    export_path = os.path.abspath(os.path.join(PROJECT_EXPORT_DIR, f"{prefix}{revision}.xlsx"))
+    if not os.path.exists(export_path):
+        os.makedirs(PROJECT_EXPORT_DIR, exist_ok=True)
+        read_project_dataset(file_path).to_excel(export_path + '.tmp.xlsx', index=False)
+        os.replace(export_path + '.tmp.xlsx', export_path)
+        for name in os.listdir(PROJECT_EXPORT_DIR):
+            if name.startswith(prefix) and name != os.path.basename(export_path):
+                try:
+                    os.remove(os.path.join(PROJECT_EXPORT_DIR, name))
+                except OSError:
+                    pass
+    return export_path
+
+def import_project_from_workbooks(db_path, file_paths, holidays_file="holidays.json") -> Dict[str, int]:
+    """
+    Fill a project database from the xlsx layout.
+    
+    Args:
+        db_path: Project database (created if missing)
+        file_paths: Dict dataset -> xlsx path (missing files are skipped)
+        holidays_file: holidays.json to import, if it exists
+        
+    Returns:
+        Dict dataset -> number of rows imported
+    """
+    # Journaled constraint additions that were not compacted yet belong to the import
+    flush_constraint_journals(file_paths.get('hard_constraints'), file_paths.get('soft_constraints'))
+    
+    imported = {}
+    for dataset in PROJECT_DATASETS:
+        source = file_paths.get(dataset)
+        if source and not parse_project_path(source) and os.path.exists(source):
+            df = pd.read_excel(source)
+            save_project_dataset(project_dataset_path(db_path, dataset), df)
+            imported[dataset] = len(df)
+    if holidays_file and os.path.exists(holidays_file):
+        with open(holidays_file, 'r') as f:
+            save_project_holidays(db_path, [date.fromisoformat(day) for day in json.load(f)])
+    return imported
+
+def export_project_to_workbooks(db_path, folder) -> Dict[str, str]:
+    """Write every dataset as <folder>/<dataset>.xlsx and the holidays as holidays.json."""
+    os.makedirs(folder, exist_ok=True)
+    exported = {}
+    for dataset in PROJECT_DATASETS:
+        target = os.path.join(folder, f"{dataset}.xlsx")
+        read_project_dataset(project_dataset_path(db_path, dataset)).to_excel(target, index=False)
+        exported[dataset] = target
+    with open(os.path.join(folder, "holidays.json"), 'w') as f:
+        json.dump([holiday.isoformat() for holiday in load_project_holidays(db_path)], f, indent=2)
+    return exported
+
+def set_active_project_db(db_path: Optional[str]):
+    """Switch the app to a project database, or back to the xlsx files with None."""
+    config = load_saved_file_paths() or {}
+    if db_path:
+        config['project_db'] = os.path.abspath(db_path)
+    else:
+        config.pop('project_db', None)
+    with open("./.ui_config.json", 'w') as f:
+        json.dump(config, f)
+
+def show_project_database_tools(lang):
+    """Project database section of the tools tab: open/import, export and switch back to xlsx."""
+    current_db = active_project_db()
+    if current_db:
+        st.success("🗃️ " + (f"Aktiv projektdatabase: {current_db}" if lang == 'da' else f"Active project database: {current_db}"))
+    else:
+        st.info("ℹ️ " + ("Data ligger i Excel-filer" if lang == 'da' else "Data is stored in Excel files"))
+    
+    db_path = st.text_input(
+        "Sti til projektdatabase" if lang == 'da' else "Project database path",
+        value=current_db or "./project.db",
+        key="project_db_path"
+    )
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("📥 " + ("Importer Excel og brug database" if lang == 'da' else "Import Excel and use database"),
+                     disabled=bool(current_db), key="project_db_import"):
+            try:
+                imported = import_project_from_workbooks(db_path, get_file_paths())
+                set_active_project_db(db_path)
+                for dataset in PROJECT_DATASETS:
+                    invalidate_cached_loaders(project_dataset_path(db_path, dataset))
+                st.success("✅ " + ", ".join(f"{dataset}: {rows}" for dataset, rows in imported.items()))
+                st.rerun()
+            except Exception as e:
+                st.error("❌ " + ("Import fejlede:" if lang == 'da' else "Import failed:") + f" {e}")
+    with col2:
+        export_folder = st.text_input("Eksportmappe" if lang == 'da' else "Export folder", value="./project_export",
+                                      key="project_db_export_folder")
+        if st.button("📤 " + ("Eksporter til Excel" if lang == 'da' else "Export to Excel"),
+                     disabled=not current_db, key="project_db_export"):
+            try:
+                exported = export_project_to_workbooks(current_db, export_folder)
+                st.success("✅ " + ", ".join(exported.values()))
+            except Exception as e:
+                st.error("❌ " + ("Eksport fejlede:" if lang == 'da' else "Export failed:") + f" {e}")
+    with col3:
+        if st.button("↩️ " + ("Brug Excel-filer igen" if lang == 'da' else "Switch back to Excel files"),
+                     disabled=not current_db, key="project_db_disable"):
+            set_active_project_db(None)
+            st.rerun()
+
 # =============================================================================
 # DATA LOADING AND SAVING FUNCTIONS (unchanged from original)
 # =============================================================================
 
 @st.cache_data
 def load_employees(file_path):
-    """Load employee data from Excel file with proper data type handling."""
+    """Load employee data from Excel file with proper data type handling (checks the persistent workbook cache first)."""
+    register_cached_load('load_employees', file_path)
     expected_columns = [
         'ID', 'nickname', 'title', 'shift_types'
     ]
+    project = parse_project_path(file_path)
     
     try:
-        if os.path.exists(file_path):
-            df = pd.read_excel(file_path)
+        if dataset_exists(file_path):
+            cached_df = load_cached_frame(file_path, 'employees') if project is None else None
+            if cached_df is not None:
+                return cached_df
+            
+            df = pd.read_excel(file_path) if project is None else read_project_dataset(file_path)
             
             # Check if file is empty or doesn't have expected structure
             if df.empty or not any(col in df.columns for col in expected_columns):
@@ -703,6 +1463,8 @@ def load_employees(file_path):
                 if col in df.columns:
                     df[col] = pd.to_datetime(df[col], errors='coerce')
             
+            if project is None:
+                store_cached_frame(file_path, 'employees', df)
             return df
         else:
             # File doesn't exist, return empty dataframe with expected columns
@@ -723,12 +1485,18 @@ def create_empty_employees_df():
 
 @st.cache_data
 def load_shifts(file_path):
-    """Load shift data from Excel file with proper data type handling."""
+    """Load shift data from Excel file with proper data type handling (checks the persistent workbook cache first)."""
+    register_cached_load('load_shifts', file_path)
     expected_columns = ['shift_ID', 'start_time', 'end_time', 'shift_types']
+    project = parse_project_path(file_path)
     
     try:
-        if os.path.exists(file_path):
-            df = pd.read_excel(file_path)
+        if dataset_exists(file_path):
+            cached_df = load_cached_frame(file_path, 'shifts') if project is None else None
+            if cached_df is not None:
+                return cached_df
+            
+            df = pd.read_excel(file_path) if project is None else read_project_dataset(file_path)
             
             # Check if file is empty or doesn't have expected structure
             if df.empty or not any(col in df.columns for col in expected_columns):
@@ -746,29 +1514,14 @@ def load_shifts(file_path):
                 if col in df.columns:
                     df[col] = df[col].astype('string')  # Use pandas string dtype
             
-            # Handle time columns formatting
+            # Handle time columns formatting (shared with ensure_proper_shift_data_types)
             time_columns = ['start_time', 'end_time']
             for col in time_columns:
                 if col in df.columns:
-                    # Handle different possible time formats from Excel
-                    if df[col].dtype == 'object':
-                        # First try the format with seconds (HH:MM:SS)
-                        try:
-                            df[col] = pd.to_datetime(df[col], format='%H:%M:%S', errors='raise').dt.time
-                        except (ValueError, TypeError):
-                            # If that fails, try without seconds (HH:MM)
-                            try:
-                                df[col] = pd.to_datetime(df[col], format='%H:%M', errors='raise').dt.time
-                            except (ValueError, TypeError):
-                                # If both fail, try pandas' automatic parsing
-                                df[col] = pd.to_datetime(df[col], errors='coerce').dt.time
-                    elif pd.api.types.is_numeric_dtype(df[col]):
-                        # Numeric format (Excel decimal time representation)
-                        df[col] = pd.to_datetime(df[col], unit='D', origin='1900-01-01', errors='coerce').dt.time
-                    elif pd.api.types.is_datetime64_any_dtype(df[col]):
-                        # Already datetime, just extract time part
-                        df[col] = df[col].dt.time
-                        
+                    df[col], _ = normalize_time_column(df[col])
+            
+            if project is None:
+                store_cached_frame(file_path, 'shifts', df)
             return df
         else:
             return create_empty_shifts_df()
@@ -787,116 +1540,257 @@ def create_empty_shifts_df():
     
     return df
 
-def apply_shift_editor_changes_to_dataframe(base_df, editor_state):
+def apply_data_editor_changes(base_df, editor_state, normalize):
     """
-    Apply changes from st.data_editor to the shifts dataframe.
+    Apply a st.data_editor state to a dataframe as a batch of vectorized updates.
+    
+    Edits are grouped per column and written with one assignment each, deleted
+    rows are dropped with a single boolean mask and added rows are appended
+    with one concat. Only the columns that were edited are re-normalized;
+    added rows are normalized on their own before being appended.
     
     Args:
-        base_df: The original dataframe
+        base_df: The original dataframe (already normalized)
         editor_state: The state dictionary from st.data_editor
+        normalize: Callable(df, columns=None) returning a normalized copy
         
     Returns:
         Updated dataframe with changes applied
     """
     result_df = base_df.copy()
+    num_rows = len(result_df)
+    
+    # Group edited cells by column: {column: ([row positions], [values])}
+    column_updates = {}
+    for row_idx, changes in editor_state.get('edited_rows', {}).items():
+        row_idx = int(row_idx)
+        if row_idx >= num_rows:
+            continue
+        for col, new_value in changes.items():
+            if col in result_df.columns:
+                positions, values = column_updates.setdefault(col, ([], []))
+                positions.append(row_idx)
+                values.append(new_value)
+    
+    for col, (positions, values) in column_updates.items():
+        # Work on an object copy so mixed editor values never clash with the column dtype,
+        # then restore the original dtype where the new values allow it
+        original_dtype = result_df[col].dtype
+        column = result_df[col].astype('object')
+        column.iloc[positions] = values
+        try:
+            column = column.astype(original_dtype)
+        except (ValueError, TypeError):
+            pass
+        result_df[col] = column
+    
+    if column_updates:
+        result_df = normalize(result_df, columns=list(column_updates))
     
-    # Apply edited rows
-    if 'edited_rows' in editor_state:
-        for row_idx, changes in editor_state['edited_rows'].items():
-            for col, new_value in changes.items():
-                if row_idx < len(result_df):
-                    result_df.iloc[row_idx, result_df.columns.get_loc(col)] = new_value
-    
-    # Apply added rows
-    if 'added_rows' in editor_state:
-        new_rows = []
-        for new_row in editor_state['added_rows']:
-            complete_row = {}
-            for col in result_df.columns:
-                complete_row[col] = new_row.get(col, pd.NA)
-            new_rows.append(complete_row)
-        
-        if new_rows:
-            new_rows_df = pd.DataFrame(new_rows)
-            new_rows_df = ensure_proper_shift_data_types(new_rows_df)
-            result_df = pd.concat([result_df, new_rows_df], ignore_index=True)
-    
-    # Apply deleted rows
-    if 'deleted_rows' in editor_state:
-        rows_to_delete = sorted(editor_state['deleted_rows'], reverse=True)
-        for row_idx in rows_to_delete:
-            if row_idx < len(result_df):
-                result_df = result_df.drop(result_df.index[row_idx]).reset_index(drop=True)
-    
-    # Ensure proper data types after all changes
-    result_df = ensure_proper_shift_data_types(result_df)
+    # Deleted row positions refer to the original rows, so drop them before appending
+    deleted_rows = [int(row_idx) for row_idx in editor_state.get('deleted_rows', []) if int(row_idx) < num_rows]
+    if deleted_rows:
+        delete_mask = pd.Series(False, index=range(num_rows))
+        delete_mask.iloc[deleted_rows] = True
+        result_df = result_df.loc[~delete_mask.values].reset_index(drop=True)
+    
+    added_rows = editor_state.get('added_rows', [])
+    if added_rows:
+        # Missing columns become NA, keys outside the frame are ignored
+        new_rows_df = pd.DataFrame(added_rows).reindex(columns=result_df.columns)
+        new_rows_df = normalize(new_rows_df)
+        result_df = pd.concat([result_df, new_rows_df], ignore_index=True)
     
     return result_df
 
-def ensure_proper_shift_data_types(df):
-    """Ensure shift DataFrame has proper data types to avoid Streamlit compatibility issues."""
+def apply_shift_editor_changes_to_dataframe(base_df, editor_state, invalid_times=None):
+    """
+    Apply changes from st.data_editor to the shifts dataframe.
+    
+    Args:
+        base_df: The original dataframe
+        editor_state: The state dictionary from st.data_editor
+        invalid_times: Optional list collecting unparseable time cells
+        
+    Returns:
+        Updated dataframe with changes applied
+    """
+    return apply_data_editor_changes(
+        base_df,
+        editor_state,
+        lambda df, columns=None: ensure_proper_shift_data_types(df, invalid_times, columns=columns)
+    )
+
+def _time_value_kind(value):
+    """Classify a single cell for normalize_time_column."""
+    if isinstance(value, str):
+        return 'text' if value.strip() else 'blank'
+    if isinstance(value, time):
+        return 'time'
+    if isinstance(value, datetime):
+        return 'datetime'
+    if pd.api.types.is_number(value) and not isinstance(value, bool):
+        return 'blank' if pd.isna(value) else 'number'
+    try:
+        if pd.isna(value):
+            return 'blank'
+    except (TypeError, ValueError):
+        pass
+    return 'other'
+
+def _excel_day_fraction_to_datetime(numbers):
+    """Convert Excel fractional-day values (0.5 == 12:00) to datetimes on a dummy date."""
+    fraction = pd.to_numeric(numbers, errors='coerce') % 1
+    return (pd.Timestamp('1900-01-01') + pd.to_timedelta(fraction, unit='D')).dt.round('s')
+
+def _parse_time_strings(text):
+    """Parse a Series of time strings, trying HH:MM:SS, then HH:MM, then pandas' own parser."""
+    import warnings
+    
+    parsed = pd.to_datetime(text, format='%H:%M:%S', errors='coerce')
+    
+    missing = parsed.isna()
+    if missing.any():
+        parsed[missing] = pd.to_datetime(text[missing], format='%H:%M', errors='coerce')
+    
+    # Only strings that look like times get the (slower, permissive) fallback parser
+    missing = parsed.isna() & text.str.contains(':', regex=False)
+    if missing.any():
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                parsed[missing] = pd.to_datetime(text[missing], errors='coerce')
+        except (ValueError, TypeError, OverflowError):
+            pass
+    
+    return parsed
+
+def normalize_time_column(values):
+    """
+    Normalize a column of shift times in a single vectorized pass.
+    
+    Handles HH:MM:SS and HH:MM strings, Excel fractional-day numbers,
+    datetime values and datetime.time objects - also mixed in one column.
+    
+    Args:
+        values: Series (or list-like) with the raw cell values
+        
+    Returns:
+        tuple: (times, invalid_mask) - an object Series of datetime.time / pd.NaT
+               with the original index, and a boolean Series flagging cells that
+               held a value which could not be parsed
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    original_index = series.index
+    series = series.reset_index(drop=True)
+    
+    parsed = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+    times = pd.Series(pd.NaT, index=series.index, dtype='object')
+    
+    if pd.api.types.is_datetime64_any_dtype(series):
+        parsed = pd.to_datetime(series, errors='coerce')
+        blank = series.isna()
+    elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        parsed = _excel_day_fraction_to_datetime(series)
+        blank = series.isna()
+    else:
+        as_object = series.astype('object')
+        kinds = as_object.map(_time_value_kind)
+        blank = kinds == 'blank'
+        
+        is_time = kinds == 'time'
+        if is_time.any():
+            times[is_time] = as_object[is_time]
+        
+        is_datetime = kinds == 'datetime'
+        if is_datetime.any():
+            parsed[is_datetime] = pd.to_datetime(as_object[is_datetime], errors='coerce')
+        
+        is_number = kinds == 'number'
+        if is_number.any():
+            parsed[is_number] = _excel_day_fraction_to_datetime(as_object[is_number])
+        
+        is_text = kinds == 'text'
+        if is_text.any():
+            parsed[is_text] = _parse_time_strings(as_object[is_text].astype(str).str.strip())
+    
+    has_parsed = parsed.notna()
+    if has_parsed.any():
+        times[has_parsed] = parsed[has_parsed].dt.time
+    
+    invalid_mask = ~blank & times.isna()
+    
+    times.index = original_index
+    invalid_mask.index = original_index
+    return times, invalid_mask
+
+def ensure_proper_shift_data_types(df, invalid_times=None, columns=None):
+    """
+    Ensure shift DataFrame has proper data types to avoid Streamlit compatibility issues.
+    
+    If invalid_times is a list, (column, raw_value) pairs for time cells that
+    could not be parsed are appended to it so the caller can report them.
+    If columns is given, only those columns are normalized.
+    """
     if df.empty:
         return df
     
     df = df.copy()
+    selected = set(df.columns) if columns is None else set(columns) & set(df.columns)
     
     # Convert text columns to string type
     text_columns = ['shift_ID', 'shift_types', 'shift_category']
     for col in text_columns:
-        if col in df.columns:
+        if col in selected:
             df[col] = df[col].astype('object')
             mask = pd.isna(df[col]) | (df[col] == 'nan') | (df[col] == '<NA>') | (df[col] is None)
             df.loc[mask, col] = ''
             df[col] = df[col].astype(str)
     
-    # Handle time columns more robustly
+    # Parse time columns in one pass per column
     time_columns = ['start_time', 'end_time']
     for col in time_columns:
-        if col in df.columns:
-            # Convert each value individually to handle mixed types
-            new_values = []
-            for value in df[col]:
-                if pd.isna(value):
-                    new_values.append(pd.NaT)
-                elif isinstance(value, str):
-                    try:
-                        # Try parsing as time string
-                        if ':' in value:
-                            try:
-                                # Try HH:MM:SS format first
-                                time_obj = pd.to_datetime(value, format='%H:%M:%S').time()
-                                new_values.append(time_obj)
-                            except ValueError:
-                                try:
-                                    # Fall back to HH:MM format
-                                    time_obj = pd.to_datetime(value, format='%H:%M').time()
-                                    new_values.append(time_obj)
-                                except ValueError:
-                                    # If both fail, try pandas' automatic parsing
-                                    try:
-                                        time_obj = pd.to_datetime(value, errors='coerce').time()
-                                        new_values.append(time_obj if pd.notna(time_obj) else pd.NaT)
-                                    except:
-                                        new_values.append(pd.NaT)
-                        else:
-                            new_values.append(pd.NaT)
-                    except:
-                        new_values.append(pd.NaT)
-                elif hasattr(value, 'hour'):  # Already a time object
-                    new_values.append(value)
-                else:
-                    new_values.append(pd.NaT)
-            
-            df[col] = new_values
+        if col in selected:
+            times, invalid_mask = normalize_time_column(df[col])
+            if invalid_times is not None and invalid_mask.any():
+                invalid_times.extend((col, value) for value in df.loc[invalid_mask, col].tolist())
+            df[col] = times
     
     return df
 
-@st.cache_data
+def show_unparseable_time_warning(invalid_times, lang):
+    """Show a warning listing shift time cells that could not be parsed."""
+    if not invalid_times:
+        return
+    
+    examples = ", ".join(f"{col} '{value}'" for col, value in invalid_times[:5])
+    if len(invalid_times) > 5:
+        examples += ", ..."
+    
+    st.warning(
+        f"⚠️ {len(invalid_times)} time value(s) could not be read and were left empty: {examples}"
+        if lang == 'en' else
+        f"⚠️ {len(invalid_times)} tidsværdi(er) kunne ikke læses og blev efterladt tomme: {examples}"
+    )
+
 def load_constraints(file_path):
-    """Load constraint data from Excel file with proper data type handling."""
+    """Load constraint data, including additions still pending in the constraint journal."""
+    if os.path.exists(file_path + CONSTRAINT_JOURNAL_SUFFIX):
+        return ConstraintStore(file_path).load()
+    return _load_constraints_workbook(file_path)
+
+@st.cache_data
+def _load_constraints_workbook(file_path):
+    """Load constraint data from Excel file with proper data type handling (checks the persistent workbook cache first)."""
+    register_cached_load('_load_constraints_workbook', file_path)
+    project = parse_project_path(file_path)
     try:
-        if os.path.exists(file_path):
-            df = pd.read_excel(file_path)
+        if dataset_exists(file_path):
+            cached_df = load_cached_frame(file_path, 'constraints') if project is None else None
+            if cached_df is not None:
+                return cached_df
+            
+            df = pd.read_excel(file_path) if project is None else read_project_dataset(file_path)
             
             # For constraints, we can accept empty files
             if df.empty:
@@ -905,6 +1799,8 @@ def load_constraints(file_path):
             # Ensure proper data types for constraint columns
             df = ensure_proper_constraint_data_types(df)
             
+            if project is None:
+                store_cached_frame(file_path, 'constraints', df)
             return df
         else:
             return pd.DataFrame(columns=['constraint_type'])
@@ -920,7 +1816,8 @@ def ensure_proper_constraint_data_types(df):
     df = df.copy()
     
     # Convert text columns to string type
-    text_columns = ['constraint_type', 'ID', 'shift_ID', 'category', 'column_name', 'column_value', 'column_values']
+    text_columns = ['constraint_type', 'ID', 'shift_ID', 'category', 'column_name', 'column_value', 'column_values',
+                    'set_valued']
     for col in text_columns:
         if col in df.columns:
             # Convert to object type first to handle mixed types
@@ -973,72 +1870,502 @@ def create_empty_employees_df():
     return df
 
 def save_dataframe(df, file_path, success_message):
-    """Save dataframe to Excel file with error handling."""
+    """Save dataframe to Excel file (or a project database dataset) with error handling."""
     try:
+        if parse_project_path(file_path):
+            saved = save_project_dataset(file_path, df, _remembered_project_rows(file_path))
+            st.session_state.setdefault('project_loaded_rows', {})[file_path] = saved['loaded']
+            if saved['conflicts']:
+                st.warning(f"⚠️ {len(saved['conflicts'])} " + (
+                    "rækker blev ændret af en anden planlægger efter du indlæste dem og blev ikke overskrevet; "
+                    "genindlæs for at se deres version" if lang == 'da' else
+                    "rows were changed by another planner since you loaded them and were not overwritten; "
+                    "refresh to see their version"))
+            st.success(success_message)
+            invalidate_cached_loaders(file_path)
+            return True
+        
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
         df.to_excel(file_path, index=False)
         st.success(success_message)
-        # Clear cache to reload fresh data
-        load_employees.clear()
-        load_shifts.clear()
-        load_constraints.clear()  # This is important for constraints
+        # Evict only the cached loads of this file so other data stays warm
+        invalidate_cached_loaders(file_path)
         return True
     except Exception as e:
         st.error(f"Error saving data: {e}")
         return False
 
 # =============================================================================
-# CONSTRAINT LOADING FUNCTIONS - DYNAMIC LOADING FROM ACTUAL CONSTRAINT CLASSES
+# CONSTRAINT JOURNAL
+# Constraint changes are appended to <file>.journal.jsonl instead of rewriting
+# the workbook, so an add, edit or delete costs the same for any file size and
+# leaves the workbook caches valid. Additions carry the new rows; edits and
+# deletes name the row they change by its constraint_row_key, so they apply to
+# the right row even when other sessions changed the file in between.
+# load_constraints replays the journal on top of the cached workbook and keeps
+# the result until the workbook or the journal changes; a journal that only
+# grew is replayed from where the kept result stopped. The
+# journal is folded into the workbook before solver runs and constraint
+# tests, and in the background once it holds CONSTRAINT_JOURNAL_COMPACT_ENTRIES
+# entries.
 # =============================================================================
 
-def load_available_constraints():
+CONSTRAINT_JOURNAL_SUFFIX = ".journal.jsonl"
+CONSTRAINT_JOURNAL_COMPACT_ENTRIES = 200
+CONSTRAINT_COMPACT_ATTEMPTS = 3
+
+@st.cache_resource
+def _get_constraint_journal_registry():
     """
-    Dynamically load available constraints from the actual constraint loader classes.
-    
-    This function imports the constraint modules and extracts the constraint types
-    directly from their constraint_types dictionaries. This ensures the UI automatically
-    stays in sync with constraint definitions without requiring manual updates.
-    
-    Returns:
-        dict: Dictionary with 'hard' and 'soft' keys containing constraint type mappings
+    Process-wide journal state: {'lock': Lock, 'files': {path: Lock},
+    'compacting': set of paths, 'entries': {path: journal line count},
+    'replayed': {path: (workbook signature, journal size, replayed frame)},
+    'errors': {path: error of the last failed background compaction}}.
     """
-    try:
-        # Import the constraint modules - these contain the actual constraint definitions
-        
-        # Create instances to access their constraint_types dictionaries
-        # We use dummy paths since we only need access to the constraint type definitions
-        hard_loader = HardConstraintLoader("dummy_path")
-        soft_loader = SoftConstraintLoader("dummy_path")
-        
-        return {
-            'hard': hard_loader.constraint_types,
-            'soft': soft_loader.constraint_types
-        }
-    
-    except Exception as e:
-        st.error(f"Error loading constraint types: {e}")
-        return {'hard': {}, 'soft': {}}
+    return {'lock': threading.Lock(), 'files': {}, 'compacting': set(), 'entries': {}, 'replayed': {},
+            'errors': {}}
 
-# List of constraints to hide from the UI - you can modify this list as needed
-# These are typically system-level constraints that should always be active
-HIDDEN_CONSTRAINTS = {}
-
-def filter_constraints_for_ui(constraint_types, constraint_category):
+def constraint_row_key(row) -> Tuple[Tuple[str, str], ...]:
     """
-    Filter out constraints that should be hidden from the UI.
-    
-    This allows you to hide system-level or automatically-applied constraints
-    while still showing user-configurable constraints in the interface.
+    Identity of a constraint row: its non-blank cells as normalized (column, value) pairs.
     
-    Args:
-        constraint_types: Dictionary of constraint types from loader
-        constraint_category: 'hard' or 'soft' constraint category
-        
-    Returns:
-        dict: Filtered constraint types suitable for UI display
+    Independent of column order and of columns that are blank, so a row from
+    the form and the same row in a wider table get the same key.
     """
-    filtered = {}
+    marker = set(_split_list(row.get(SET_VALUED_MARKER)))
+    pairs = ((str(column), _normalize_constraint_value(value, column in marker)) for column, value in row.items())
+    return tuple(sorted((column, text) for column, text in pairs if text))
+
+def constraint_row_keys(df: pd.DataFrame) -> Dict[Any, Tuple[Tuple[str, str], ...]]:
+    """constraint_row_key of every row, by index label."""
+    return {label: constraint_row_key(row) for label, row in zip(df.index, df.to_dict('records'))}
+
+def _journal_row(row) -> Dict[str, Any]:
+    """Non-blank cells of a constraint row in JSON-safe form."""
+    return {str(column): _project_cell(value) for column, value in row.items()
+            if _normalize_constraint_value(value) != ''}
+
+def _read_constraint_workbook(file_path) -> pd.DataFrame:
+    """Read a constraints workbook without Streamlit caching or messages (safe in background threads)."""
+    if not os.path.exists(file_path):
+        return pd.DataFrame(columns=['constraint_type'])
+    cached_df = load_cached_frame(file_path, 'constraints')
+    if cached_df is not None:
+        return cached_df
+    df = pd.read_excel(file_path)
+    return ensure_proper_constraint_data_types(df) if not df.empty else pd.DataFrame(columns=['constraint_type'])
+
+def _journal_entries(journal: bytes):
+    """Parsed journal entries; a torn last line from a crash is skipped."""
+    for line in journal.decode('utf-8', 'replace').splitlines():
+        try:
+            yield json.loads(line)
+        except ValueError:
+            continue
+
+def _replay_constraint_journal(df: pd.DataFrame, journal: bytes) -> pd.DataFrame:
+    """Apply journal entries to a constraints frame."""
+    entries = list(_journal_entries(journal))
+    if all(entry.get('op') == 'add' for entry in entries):
+        # Additions only: no row keys needed
+        added_rows = [row for entry in entries for row in entry.get('rows', [])]
+        if not added_rows:
+            return df
+        return ensure_proper_constraint_data_types(pd.concat([df, pd.DataFrame(added_rows)], ignore_index=True))
+    
+    rows = df.to_dict('records')
+    keys = [constraint_row_key(row) for row in rows]
+    for entry in entries:
+        if entry.get('op') == 'add':
+            rows.extend(entry.get('rows', []))
+            keys.extend(constraint_row_key(row) for row in entry.get('rows', []))
+            continue
+        for change in entry.get('changes', []):
+            try:
+                position = keys.index(tuple(tuple(pair) for pair in change['key']))
+            except (KeyError, TypeError, ValueError):
+                continue  # The row was already changed or removed elsewhere
+            if entry.get('op') == 'delete':
+                del rows[position]
+                del keys[position]
+            elif entry.get('op') == 'edit':
+                rows[position] = change['values']
+                keys[position] = constraint_row_key(change['values'])
+    
+    columns = list(dict.fromkeys(list(df.columns) + [column for row in rows for column in row]))
+    if not rows:
+        return pd.DataFrame(columns=columns)
+    return ensure_proper_constraint_data_types(pd.DataFrame(rows, columns=columns))
+
+class ConstraintStore:
+    """A constraints workbook plus its append-only journal of pending changes."""
+    
+    def __init__(self, constraint_file: str):
+        self.file = constraint_file
+        self.journal_path = constraint_file + CONSTRAINT_JOURNAL_SUFFIX
+        self.key = _normalize_cache_path(constraint_file)
+        registry = _get_constraint_journal_registry()
+        with registry['lock']:
+            self.lock = registry['files'].setdefault(self.key, threading.Lock())
+        self.registry = registry
+    
+    def _read_journal(self) -> bytes:
+        try:
+            with open(self.journal_path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return b''
+    
+    def _workbook_signature(self):
+        try:
+            stat = os.stat(self.file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def has_pending(self) -> bool:
+        return os.path.exists(self.journal_path)
+    
+    def load(self, base_df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Workbook rows with the journaled changes applied (cached per workbook signature and journal size)."""
+        with self.lock:
+            journal = self._read_journal()
+            if base_df is not None:
+                return _replay_constraint_journal(base_df, journal)
+            signature = self._workbook_signature()
+            cached = self.registry['replayed'].get(self.key)
+            if cached is not None and cached[0] == signature and cached[1] <= len(journal):
+                # The journal is append-only between compactions: replay only what was added
+                replayed = _replay_constraint_journal(cached[2], journal[cached[1]:])
+            else:
+                replayed = _replay_constraint_journal(_load_constraints_workbook(self.file), journal)
+            self.registry['replayed'][self.key] = (signature, len(journal), replayed)
+        return replayed.copy()
+    
+    def _write_entries(self, entries: List[Dict[str, Any]]) -> bool:
+        """Append entries to the journal; starts a background compaction once it is long enough."""
+        lines = ''.join(json.dumps(entry, default=str, ensure_ascii=False) + '\n' for entry in entries)
+        try:
+            with self.lock:
+                os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+                with open(self.journal_path, 'a', encoding='utf-8') as f:
+                    f.write(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                counts = self.registry['entries']
+                if self.key not in counts:
+                    counts[self.key] = self._read_journal().count(b'\n')
+                else:
+                    counts[self.key] += len(entries)
+                entries_count = counts[self.key]
+        except OSError:
+            return False
+        error = self.registry['errors'].pop(self.key, None)
+        if error:
+            st.warning(f"⚠️ Background compaction of {os.path.basename(self.file)} failed: {error}. "
+                       f"The changes are kept in the journal and compacted again later"
+                       if lang == 'en' else
+                       f"⚠️ Baggrundskomprimering af {os.path.basename(self.file)} fejlede: {error}. "
+                       f"Ændringerne er gemt i journalen og komprimeres igen senere")
+        if entries_count >= CONSTRAINT_JOURNAL_COMPACT_ENTRIES:
+            self.compact_in_background()
+        return True
+    
+    def append(self, rows: List[Dict[str, Any]], kind: str) -> bool:
+        """
+        Journal new constraint rows; the workbook is not touched.
+        
+        Args:
+            rows: Converted constraint rows
+            kind: 'hard' or 'soft' (recorded with the entry)
+        """
+        if parse_project_path(self.file):
+            # A project database inserts the rows in one transaction; no journal needed
+            try:
+                appended = append_project_rows(self.file, rows)
+            except sqlite3.Error:
+                return False
+            loaded = _remembered_project_rows(self.file)
+            if loaded is not None:
+                loaded.update({key: (payload, _project_fingerprint(payload)) for key, payload in appended.items()})
+            invalidate_cached_loaders(self.file)
+            return True
+        
+        at = datetime.now().isoformat(timespec='seconds')
+        return self._write_entries([{'op': 'add', 'kind': kind, 'at': at, 'rows': [_journal_row(row) for row in rows]}])
+    
+    def save_changes(self, df: pd.DataFrame, saved_keys: Optional[Dict[Any, tuple]], kind: str,
+                     success_message: str) -> Optional[Dict[Any, tuple]]:
+        """
+        Save an edited table by journaling its added, edited and deleted rows.
+        
+        Args:
+            df: The table on screen
+            saved_keys: constraint_row_keys of the table as last loaded or saved
+                (index label -> key); None falls back to rewriting the workbook
+            kind: 'hard' or 'soft'
+            success_message: Message shown on success
+            
+        Returns:
+            The saved keys of df.reset_index(drop=True), which the caller keeps
+            as the table, or None if saving failed
+        """
+        records = df.to_dict('records')
+        labels = list(df.index)
+        keys = [constraint_row_key(row) for row in records]
+        if saved_keys is None or parse_project_path(self.file):
+            return dict(enumerate(keys)) if self.export(df, success_message) else None
+        
+        current_labels = set(labels)
+        deleted = [{'key': key} for label, key in saved_keys.items() if label not in current_labels]
+        edited = [{'key': saved_keys[label], 'values': _journal_row(row)}
+                  for label, key, row in zip(labels, keys, records)
+                  if label in saved_keys and saved_keys[label] != key]
+        added = [_journal_row(row) for label, row in zip(labels, records) if label not in saved_keys]
+        
+        at = datetime.now().isoformat(timespec='seconds')
+        entries = [entry for entry in (
+            {'op': 'delete', 'kind': kind, 'at': at, 'changes': deleted} if deleted else None,
+            {'op': 'edit', 'kind': kind, 'at': at, 'changes': edited} if edited else None,
+            {'op': 'add', 'kind': kind, 'at': at, 'rows': added} if added else None
+        ) if entry]
+        if entries and not self._write_entries(entries):
+            st.error("Error saving data: could not write the constraint journal")
+            return None
+        st.success(success_message)
+        return dict(enumerate(keys))
+    
+    def _consume_journal(self, consumed: int):
+        """Drop the first consumed bytes of the journal (entries appended meanwhile are kept). Call with the lock held."""
+        rest = self._read_journal()[consumed:]
+        if rest:
+            with open(self.journal_path + '.tmp', 'wb') as f:
+                f.write(rest)
+            os.replace(self.journal_path + '.tmp', self.journal_path)
+        elif os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.registry['entries'][self.key] = rest.count(b'\n')
+    
+    def compact(self) -> bool:
+        """
+        Fold the journal into the workbook.
+        
+        The journal is only replayed: rows are neither deduplicated nor
+        merged here, that happens on an explicit save or merge where the
+        report is shown. The workbook is rebuilt without holding the lock,
+        then replaced only if neither it nor the journal prefix that was
+        folded changed in the meantime (a table save or another compaction);
+        otherwise nothing is written.
+        
+        Returns:
+            False if the compaction was abandoned because the files changed
+        """
+        with self.lock:
+            journal = self._read_journal()
+            signature = self._workbook_signature()
+            base_df = _read_constraint_workbook(self.file)
+        if not journal:
+            return True
+        
+        compacted_df = _replay_constraint_journal(base_df, journal)
+        
+        os.makedirs(os.path.dirname(os.path.abspath(self.file)), exist_ok=True)
+        tmp_path = f"{self.file}.{uuid.uuid4().hex[:8]}.compact.xlsx"
+        compacted_df.to_excel(tmp_path, index=False)
+        with self.lock:
+            if self._workbook_signature() != signature or not self._read_journal().startswith(journal):
+                os.remove(tmp_path)
+                return False
+            os.replace(tmp_path, self.file)
+            self._consume_journal(len(journal))
+            invalidate_cached_loaders(self.file)
+        return True
+    
+    def compact_in_background(self):
+        """Compact in a daemon thread unless a compaction of this file is already running."""
+        with self.registry['lock']:
+            if self.key in self.registry['compacting']:
+                return
+            self.registry['compacting'].add(self.key)
+        
+        def run():
+            try:
+                self.compact()
+            except Exception as e:
+                # No script context in this thread: the next journal write shows it
+                self.registry['errors'][self.key] = str(e)
+            finally:
+                with self.registry['lock']:
+                    self.registry['compacting'].discard(self.key)
+        
+        threading.Thread(target=run, daemon=True).start()
+    
+    def export(self, df: pd.DataFrame, success_message: str) -> bool:
+        """Save a whole table as the workbook; it already contains the journaled changes."""
+        with self.lock:
+            consumed = len(self._read_journal())
+            if not save_dataframe(df, self.file, success_message):
+                return False
+            self._consume_journal(consumed)
+        return True
+
+def flush_constraint_journals(*constraint_files):
+    """Compact the journals of the given constraints files so readers of the xlsx see every row."""
+    for constraint_file in constraint_files:
+        if not constraint_file:
+            continue
+        store = ConstraintStore(constraint_file)
+        for _ in range(CONSTRAINT_COMPACT_ATTEMPTS):
+            if not store.has_pending() or store.compact():
+                break
+
+# =============================================================================
+# CONSTRAINT LOADING FUNCTIONS - DYNAMIC LOADING FROM ACTUAL CONSTRAINT CLASSES
+# =============================================================================
+
+# Signatures computed during the current script run. Module globals are reset on
+# every rerun, so this only saves re-walking the core folder within one run.
+_CORE_SIGNATURE_MEMO = {}
+
+def _scan_core_modules(core_path):
+    """Return sorted (relative path, mtime, size) for every .py file under the core folder."""
+    signature = []
+    if core_path and os.path.isdir(core_path):
+        for root, dirs, files in os.walk(core_path):
+            dirs[:] = [d for d in dirs if d != '__pycache__']
+            for name in files:
+                if name.endswith('.py'):
+                    full_path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(full_path)
+                    except OSError:
+                        continue
+                    signature.append((os.path.relpath(full_path, core_path), stat.st_mtime_ns, stat.st_size))
+    return tuple(sorted(signature))
+
+def _core_modules_signature(core_path):
+    """Core folder signature, scanned at most once per script run."""
+    if core_path not in _CORE_SIGNATURE_MEMO:
+        _CORE_SIGNATURE_MEMO[core_path] = _scan_core_modules(core_path)
+    return _CORE_SIGNATURE_MEMO[core_path]
+
+def _iter_required_params(required_params):
+    """Yield every parameter name from a list or a dict of alternative parameter lists."""
+    if isinstance(required_params, dict):
+        for alternative in required_params.values():
+            yield from (alternative or [])
+    elif required_params:
+        yield from required_params
+
+def reload_core_modules(core_path):
+    """
+    Make the next import of any core module read its current source.
+    
+    Every module loaded from the core folder is dropped from sys.modules and
+    the loader classes are imported again. importlib.reload of the loader
+    modules alone would keep the constraint modules they import at their old
+    versions.
+    """
+    if not core_path:
+        return
+    core_root = os.path.abspath(core_path) + os.sep
+    this_file = os.path.abspath(__file__)
+    for name, module in list(sys.modules.items()):
+        module_file = getattr(module, '__file__', None)
+        if (name != '__main__' and isinstance(module_file, str) and os.path.abspath(module_file) != this_file
+                and os.path.abspath(module_file).startswith(core_root)):
+            del sys.modules[name]
+    importlib.invalidate_caches()
+    import_core_modules()
+
+@st.cache_resource(max_entries=4)
+def _build_constraint_catalog(core_path, modules_signature):
+    """
+    Build the constraint catalog once per core folder and core module version.
+    
+    The core modules are reloaded first, so a changed signature introspects
+    the changed classes. The loaders are only instantiated here, to read
+    their constraint_types dictionaries; the arguments are the cache key.
+    """
+    reload_core_modules(core_path)
+    
+    # We use dummy paths since we only need access to the constraint type definitions
+    hard_types = dict(HardConstraintLoader("dummy_path").constraint_types)
+    soft_types = dict(getattr(SoftConstraintLoader("dummy_path"), 'constraint_types', {}))
+    
+    by_name = {}
+    by_param = {}
+    for types in (hard_types, soft_types):
+        for name, (class_obj, required_params) in types.items():
+            # Hard constraints take precedence when a name exists in both
+            by_name.setdefault(name, (class_obj, required_params))
+            for param in _iter_required_params(required_params):
+                by_param.setdefault(param, set()).add(name)
+    
+    return {
+        'hard': hard_types,
+        'soft': soft_types,
+        'by_name': by_name,
+        'by_param': {param: sorted(names) for param, names in by_param.items()},
+        'presolve_roles': {name: role for name, (class_obj, required_params) in hard_types.items()
+                           if (role := constraint_presolve_role(name, class_obj, required_params))}
+    }
+
+def get_constraint_catalog():
+    """
+    Return the process-wide constraint catalog.
+    
+    Returns:
+        dict: 'hard' and 'soft' (name -> (class, required_params)), 'by_name'
+              (name -> (class, required_params)), 'by_param' (parameter
+              name -> sorted list of constraint names using it) and
+              'presolve_roles' (hard constraint name -> constraint_presolve_role)
+    """
+    core_path = get_core_folder_path() or ""
+    return _build_constraint_catalog(core_path, _core_modules_signature(core_path))
+
+def load_available_constraints():
+    """
+    Dynamically load available constraints from the actual constraint loader classes.
+    
+    The constraint types are read from the loaders' constraint_types dictionaries
+    through the memoized constraint catalog. This ensures the UI automatically
+    stays in sync with constraint definitions without requiring manual updates.
+    
+    Returns:
+        dict: Dictionary with 'hard' and 'soft' keys containing constraint type mappings
+    """
+    try:
+        catalog = get_constraint_catalog()
+        return {
+            'hard': catalog['hard'],
+            'soft': catalog['soft']
+        }
+    
+    except Exception as e:
+        st.error(f"Error loading constraint types: {e}")
+        return {'hard': {}, 'soft': {}}
+
+# List of constraints to hide from the UI - you can modify this list as needed
+# These are typically system-level constraints that should always be active
+HIDDEN_CONSTRAINTS = {}
+
+def filter_constraints_for_ui(constraint_types, constraint_category):
+    """
+    Filter out constraints that should be hidden from the UI.
+    
+    This allows you to hide system-level or automatically-applied constraints
+    while still showing user-configurable constraints in the interface.
+    
+    Args:
+        constraint_types: Dictionary of constraint types from loader
+        constraint_category: 'hard' or 'soft' constraint category
+        
+    Returns:
+        dict: Filtered constraint types suitable for UI display
+    """
+    filtered = {}
     for name, (class_obj, required_params) in constraint_types.items():
         if name not in HIDDEN_CONSTRAINTS:
             filtered[name] = (class_obj, required_params)
@@ -1067,6 +2394,7 @@ def show_employees_tab(lang):
     
     # Better session state initialization and management
     if 'employees_df' not in st.session_state or st.session_state.employees_df.empty:
+        remember_project_rows(employees_file, employees_df)
         st.session_state.employees_df = employees_df.copy()
         st.session_state.employees_df = ensure_proper_employee_data_types(st.session_state.employees_df)
     
@@ -1105,6 +2433,7 @@ def show_employees_tab(lang):
         # FIXED: Add a button to discard unsaved changes
         if st.button("Discard Changes" if lang == 'en' else "Fortryd Ændringer"):
             st.session_state.employees_df = load_employees(employees_file)
+            remember_project_rows(employees_file, st.session_state.employees_df)
             st.session_state.employees_df = ensure_proper_employee_data_types(st.session_state.employees_df)
             # Clear the editor state
             if 'employees_editor' in st.session_state:
@@ -1389,55 +2718,24 @@ def apply_editor_changes_to_dataframe(base_df, editor_state):
     Returns:
         Updated dataframe with changes applied
     """
-    result_df = base_df.copy()
-    
-    # Apply edited rows
-    if 'edited_rows' in editor_state:
-        for row_idx, changes in editor_state['edited_rows'].items():
-            for col, new_value in changes.items():
-                if row_idx < len(result_df):
-                    result_df.iloc[row_idx, result_df.columns.get_loc(col)] = new_value
-    
-    # Apply added rows
-    if 'added_rows' in editor_state:
-        new_rows = []
-        for new_row in editor_state['added_rows']:
-            # Ensure the new row has all required columns
-            complete_row = {}
-            for col in result_df.columns:
-                complete_row[col] = new_row.get(col, pd.NA)
-            new_rows.append(complete_row)
-        
-        if new_rows:
-            new_rows_df = pd.DataFrame(new_rows)
-            # Ensure proper data types for new rows
-            new_rows_df = ensure_proper_employee_data_types(new_rows_df)
-            result_df = pd.concat([result_df, new_rows_df], ignore_index=True)
-    
-    # Apply deleted rows
-    if 'deleted_rows' in editor_state:
-        # Sort in reverse order to delete from the end first
-        rows_to_delete = sorted(editor_state['deleted_rows'], reverse=True)
-        for row_idx in rows_to_delete:
-            if row_idx < len(result_df):
-                result_df = result_df.drop(result_df.index[row_idx]).reset_index(drop=True)
-    
-    # Ensure proper data types after all changes
-    result_df = ensure_proper_employee_data_types(result_df)
-    
-    return result_df
+    return apply_data_editor_changes(base_df, editor_state, ensure_proper_employee_data_types)
 
-def ensure_proper_employee_data_types(df):
-    """Ensure employee DataFrame has proper data types to avoid Streamlit compatibility issues."""
+def ensure_proper_employee_data_types(df, columns=None):
+    """
+    Ensure employee DataFrame has proper data types to avoid Streamlit compatibility issues.
+    
+    If columns is given, only those columns are normalized.
+    """
     if df.empty:
         return df
     
     df = df.copy()
+    selected = set(df.columns) if columns is None else set(columns) & set(df.columns)
     
     # FIXED: More careful handling of text columns to avoid losing user input
     text_columns = ['ID', 'nickname', 'title', 'shift_types']
     for col in text_columns:
-        if col in df.columns:
+        if col in selected:
             # Convert to object type first to handle mixed types
             df[col] = df[col].astype('object')
             # Only replace actual NaN/None values, not existing strings
@@ -1450,13 +2748,13 @@ def ensure_proper_employee_data_types(df):
     numeric_columns = ['weekly_hours', 'hourly_wage', 'hour_deficit', 
                        'current_night_shifts', 'current_evening_night_shifts']
     for col in numeric_columns:
-        if col in df.columns:
+        if col in selected:
             df[col] = pd.to_numeric(df[col], errors='coerce')
     
     # Ensure date columns are datetime
     date_columns = ['norm_period_start', 'norm_period_end']
     for col in date_columns:
-        if col in df.columns:
+        if col in selected:
             df[col] = pd.to_datetime(df[col], errors='coerce')
     
     return df
@@ -1792,12 +3090,16 @@ def show_shifts_tab(lang):
     
     # Better session state initialization and management
     if 'shifts_df' not in st.session_state or st.session_state.shifts_df.empty:
+        remember_project_rows(shifts_file, shifts_df)
         st.session_state.shifts_df = shifts_df.copy()
         st.session_state.shifts_df = ensure_proper_shift_data_types(st.session_state.shifts_df)
     
     # Initialize show_all_columns for shifts if not exists
     if 'show_all_shift_columns' not in st.session_state:
         st.session_state.show_all_shift_columns = False
+    
+    # Report time cells that could not be parsed by the last save/upload
+    show_unparseable_time_warning(st.session_state.pop('unparseable_shift_times', None), lang)
 
     # Enhanced action buttons - NOW WITH 5 BUTTONS LIKE EMPLOYEE TAB
     col1, col2, col3, col4, col5 = st.columns(5)
@@ -1813,14 +3115,17 @@ def show_shifts_tab(lang):
                 edited_data = st.session_state.shifts_editor
                 if 'edited_rows' in edited_data or 'added_rows' in edited_data or 'deleted_rows' in edited_data:
                     # Apply edits to the base dataframe
+                    invalid_times = []
                     updated_df = apply_shift_editor_changes_to_dataframe(
                         st.session_state.shifts_df.copy(), 
-                        edited_data
+                        edited_data,
+                        invalid_times
                     )
                     
                     if save_dataframe(updated_df, shifts_file, get_text('data_saved', lang)):
                         # Update session state with the saved data
                         st.session_state.shifts_df = updated_df.copy()
+                        st.session_state.unparseable_shift_times = invalid_times
                         st.rerun()
                 else:
                     st.info("No changes to save" if lang == 'en' else "Ingen ændringer at gemme")
@@ -1831,6 +3136,7 @@ def show_shifts_tab(lang):
         # NEW: Add a button to discard unsaved changes
         if st.button("↩️ Discard Changes" if lang == 'en' else "↩️ Fortryd Ændringer", key="discard_shifts_button"):
             st.session_state.shifts_df = load_shifts(shifts_file)
+            remember_project_rows(shifts_file, st.session_state.shifts_df)
             st.session_state.shifts_df = ensure_proper_shift_data_types(st.session_state.shifts_df)
             # Clear the editor state
             if 'shifts_editor' in st.session_state:
@@ -2363,6 +3669,216 @@ class ConstraintUIConfig:
         #self.PARAMETER_WIDGETS = get_enhanced_parameter_widgets(lang)
 
 
+# =============================================================================
+# SET-VALUED CONSTRAINT ROWS
+# A constraint selected for many employees, dates or shifts can be stored as
+# one row whose ID, day and shift_ID cells hold comma separated lists. The
+# set_valued column names the list-valued columns of such a row, so existing
+# comma separated parameters keep their meaning. Cores whose core.main sets
+# SUPPORTS_SET_VALUED_ROWS = True read the config key set_valued_columns and
+# post a set-valued row as one aggregated constraint; for older cores solver
+# jobs, constraint tests and conflict isolation all
+# expand the rows first (constraints_input_for_core), so a set-valued row
+# means the same thing everywhere.
+# =============================================================================
+
+SET_VALUED_MARKER = 'set_valued'
+SET_VALUED_COLUMNS = ('ID', 'day', 'shift_ID')
+CORE_SET_VALUED_CAPABILITY = 'SUPPORTS_SET_VALUED_ROWS'
+SET_VALUED_EXPANSION_DIR = os.path.join(WORKBOOK_CACHE_DIR, "expanded")
+
+def has_set_valued_rows(df: pd.DataFrame) -> bool:
+    """True if any row of a constraint frame is marked set-valued."""
+    if SET_VALUED_MARKER not in df.columns:
+        return False
+    markers = df[SET_VALUED_MARKER].fillna('').astype(str).str.strip()
+    return bool((~markers.isin(['', 'nan'])).any())
+
+def expand_set_valued_constraints(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Expand set-valued rows into one row per combination of their list values.
+    
+    Plain rows are returned unchanged; the output keeps the original row order
+    and has no set_valued column.
+    """
+    if not has_set_valued_rows(df):
+        return df.drop(columns=[SET_VALUED_MARKER], errors='ignore')
+    
+    markers = df[SET_VALUED_MARKER].fillna('').astype(str).str.strip()
+    is_set = ~markers.isin(['', 'nan'])
+    expanded = df[is_set].copy()
+    listed = markers[is_set].str.split(',').map(lambda columns: {column.strip() for column in columns})
+    
+    # Split every listed column first, then explode them one after another
+    columns = [column for column in SET_VALUED_COLUMNS if column in expanded.columns]
+    for column in columns:
+        expanded[column] = [
+            [item.strip() for item in str(value).split(',') if item.strip()] or [value] if column in names else value
+            for value, names in zip(expanded[column], listed)
+        ]
+    for column in columns:
+        expanded = expanded.explode(column)
+    
+    combined = pd.concat([df[~is_set], expanded]).sort_index(kind='stable')
+    return combined.drop(columns=[SET_VALUED_MARKER]).reset_index(drop=True)
+
+def core_supports_set_valued_rows() -> bool:
+    """
+    True if the imported core declares that it reads set-valued rows.
+    
+    Reads the SUPPORTS_SET_VALUED_ROWS constant of core.main as loaded by
+    import_core_modules, so a reloaded core is picked up; False before the
+    core is imported and for cores that do not export it.
+    """
+    return getattr(sys.modules.get('core.main'), CORE_SET_VALUED_CAPABILITY, False) is True
+
+def constraints_input_for_core(constraints_file, target_dir=SET_VALUED_EXPANSION_DIR) -> Optional[str]:
+    """
+    Constraints workbook to hand to the core.
+    
+    Returns constraints_file itself, or an expanded copy in target_dir when
+    it has set-valued rows and the core does not read them. The copy is
+    named by content, so it is reused while the file does not change.
+    """
+    if not constraints_file or not os.path.exists(constraints_file) or core_supports_set_valued_rows():
+        return constraints_file
+    stem = os.path.splitext(os.path.basename(constraints_file))[0]
+    expanded_file = os.path.join(target_dir, f"{stem}_{_file_content_hash(constraints_file)[:16]}_expanded.xlsx")
+    if os.path.exists(expanded_file):
+        return expanded_file
+    
+    constraints_df = pd.read_excel(constraints_file)
+    if not has_set_valued_rows(constraints_df):
+        return constraints_file
+    os.makedirs(target_dir, exist_ok=True)
+    expand_set_valued_constraints(constraints_df).to_excel(expanded_file + '.tmp.xlsx', index=False)
+    os.replace(expanded_file + '.tmp.xlsx', expanded_file)
+    return expanded_file
+
+# =============================================================================
+# CONSTRAINT CANONICALIZATION
+# Rows are compared on their normalized (constraint_type, parameters) key:
+# exact duplicates (weight included) are dropped, hard rows whose
+# ID/day/shift_ID selection is contained in another row of the same constraint
+# are dropped as subsumed, and soft rows that differ only in weight are folded
+# into one row with the summed weight (posting both would add both penalties).
+# Comma lists keep their order unless the row marks the column set-valued.
+# =============================================================================
+
+def _normalize_constraint_value(value, as_set=False) -> str:
+    """Canonical text of a constraint cell; empty for blanks. Items of a set-valued cell are sorted."""
+    if value is None or (not isinstance(value, (list, tuple, set)) and pd.isna(value)):
+        return ''
+    text = str(value).strip()
+    if text.lower() in ('', 'nan', '<na>', 'none'):
+        return ''
+    if ',' in text:
+        items = [item for item in (_normalize_constraint_value(item) for item in text.split(',')) if item]
+        return ','.join(sorted(set(items)) if as_set else items)
+    if text.endswith(' 00:00:00'):
+        text = text[:-len(' 00:00:00')]
+    try:
+        number = float(text)
+        return str(int(number)) if number.is_integer() else repr(number)
+    except ValueError:
+        return text
+
+def canonicalize_constraints(df: pd.DataFrame, constraint_kind: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Remove redundant constraint rows.
+    
+    Args:
+        df: Constraint rows
+        constraint_kind: 'hard' or 'soft'
+        
+    Returns:
+        Tuple of (remaining rows in original order, report dict with duplicates,
+        subsumed and folded counts and removed: DataFrame of dropped rows with
+        their original index and a reason column)
+    """
+    report = {'duplicates': 0, 'subsumed': 0, 'folded': 0, 'removed': pd.DataFrame()}
+    if df.empty or 'constraint_type' not in df.columns:
+        return df, report
+    
+    parameter_columns = [column for column in df.columns
+                         if column not in ('constraint_type', 'weight', SET_VALUED_MARKER)]
+    markers = (df[SET_VALUED_MARKER].map(lambda value: set(_split_list(value)))
+               if SET_VALUED_MARKER in df.columns else pd.Series([set()] * len(df), index=df.index))
+    normalized = pd.DataFrame({column: [_normalize_constraint_value(value, column in marker)
+                                        for value, marker in zip(df[column], markers)]
+                               for column in ['constraint_type'] + parameter_columns}, index=df.index)
+    keys = normalized.apply(tuple, axis=1)
+    reasons = {}
+    result = df.copy()
+    
+    # Exact duplicates (a weight column, if present, is part of the key): a repeated row adds nothing
+    full_keys = (keys + df['weight'].map(lambda value: (_normalize_constraint_value(value),))
+                 if 'weight' in df.columns else keys)
+    for index in full_keys[full_keys.duplicated(keep='first')].index:
+        reasons[index] = 'duplicate'
+    
+    if constraint_kind == 'soft' and 'weight' in df.columns:
+        # Same constraint, different weight: keep the first row with the summed weight
+        distinct = ~df.index.isin(list(reasons))
+        weights = pd.to_numeric(df['weight'], errors='coerce')[distinct]
+        for _, group in weights.groupby(keys[distinct], sort=False):
+            if len(group) > 1:
+                result.loc[group.index[0], 'weight'] = group.sum(min_count=1)
+                for index in group.index[1:]:
+                    reasons[index] = 'folded'
+    
+    if constraint_kind == 'hard':
+        # A row whose employee/day/shift selection lies inside another row's selection adds nothing.
+        # Only single values and set-valued lists are compared: a plain comma list (e.g. a group of
+        # employees that must not work together) is one constraint, not one per item.
+        scope_columns = [column for column in SET_VALUED_COLUMNS if column in normalized.columns]
+        other_columns = [column for column in normalized.columns if column not in scope_columns]
+        remaining = normalized.drop(index=list(reasons))
+        for _, group in remaining.groupby(other_columns, sort=False, dropna=False):
+            if len(group) < 2:
+                continue
+            scopes = {}
+            for index, row in group.iterrows():
+                scope = [(column, set(_split_list(row[column]))) for column in scope_columns]
+                if all(len(values) <= 1 or column in markers[index] for column, values in scope):
+                    scopes[index] = scope
+            for index, scope in scopes.items():
+                for other_index, other_scope in scopes.items():
+                    if other_index == index or other_index in reasons:
+                        continue
+                    if all(bool(values) == bool(other_values) and values <= other_values
+                           for (_, values), (_, other_values) in zip(scope, other_scope)):
+                        reasons[index] = 'subsumed'
+                        break
+    
+    if not reasons:
+        return df, report
+    
+    removed = df.loc[list(reasons)].copy()
+    removed.insert(0, 'reason', [reasons[index] for index in removed.index])
+    report.update({
+        'duplicates': sum(reason == 'duplicate' for reason in reasons.values()),
+        'subsumed': sum(reason == 'subsumed' for reason in reasons.values()),
+        'folded': sum(reason == 'folded' for reason in reasons.values()),
+        'removed': removed.sort_index()
+    })
+    return result.drop(index=list(reasons)).reset_index(drop=True), report
+
+def show_constraint_dedup_report(report: Dict[str, Any], lang):
+    """Show which constraint rows canonicalization removed, if any."""
+    removed = report['removed']
+    if removed.empty:
+        return
+    st.info(
+        f"🧹 {len(removed)} overflødige rækker fjernet: {report['duplicates']} dubletter, "
+        f"{report['subsumed']} dækket af andre rækker, {report['folded']} vægte lagt sammen"
+        if lang == 'da' else
+        f"🧹 Removed {len(removed)} redundant rows: {report['duplicates']} duplicates, "
+        f"{report['subsumed']} covered by other rows, {report['folded']} weights folded"
+    )
+    with st.expander("Fjernede rækker" if lang == 'da' else "Removed rows"):
+        st.dataframe(removed, width='stretch')
+
 # =============================================================================
 # CONSTRAINT MANAGEMENT CLASSES
 # =============================================================================
@@ -2571,19 +4087,9 @@ class ConstraintParameterHandler:
     
     def _get_constraint_class(self, constraint_name: str):
         """Get the constraint class object."""
-        try:           
-            hard_loader = HardConstraintLoader("dummy")
-            soft_loader = SoftConstraintLoader("dummy")
-            
-            hard_types = hard_loader.constraint_types
-            soft_types = getattr(soft_loader, 'constraint_types', {})
-            
-            if constraint_name in hard_types:
-                return hard_types[constraint_name][0]
-            elif constraint_name in soft_types:
-                return soft_types[constraint_name][0]
-            
-            return None
+        try:
+            entry = get_constraint_catalog()['by_name'].get(constraint_name)
+            return entry[0] if entry else None
         except Exception:
             return None
 
@@ -3230,7 +4736,7 @@ class ConstraintParameterHandler:
             if data_manager.save_constraint({}, constraint_name, is_hard):
                 st.success(f"Constraint added: {constraint_name}")
     
-    def _show_combination_preview(self, parameters: Dict[str, Any]) -> None:
+    def _show_combination_preview(self, parameters: Dict[str, Any], set_valued: bool = False) -> None:
         """Show preview of parameter combinations for multi-value parameters."""
         multi_params = {k: v for k, v in parameters.items() 
                        if isinstance(v, list) and len(v) > 1}
@@ -3247,9 +4753,15 @@ class ConstraintParameterHandler:
                 else:
                     st.write(f"- **{param}:** {len(values)} values")
             st.write(f"**Total combinations:** {total_combinations}")
+            if set_valued:
+                rows = total_combinations
+                for param, values in multi_params.items():
+                    if param in SET_VALUED_COLUMNS:
+                        rows //= len(values)
+                st.write(f"**Rows to save:** {rows}" if self.lang == 'en' else f"**Rækker der gemmes:** {rows}")
     
     def _process_form_submission(self, parameters: Dict[str, Any], required_params: List[str], 
-                                constraint_name: str, is_hard: bool) -> None:
+                                constraint_name: str, is_hard: bool, set_valued: bool = False) -> None:
         """Process form submission with validation and constraint generation."""
         # Validate parameters
         is_valid, errors = self.validate_parameters(parameters, required_params)
@@ -3261,7 +4773,7 @@ class ConstraintParameterHandler:
             return
         
         # Generate constraint combinations
-        constraints_to_add = self._generate_constraint_combinations(parameters)
+        constraints_to_add = self._generate_constraint_combinations(parameters, set_valued=set_valued)
         
         # Access data_manager
         data_manager = ConstraintDataManager(self.lang)
@@ -3282,10 +4794,25 @@ class ConstraintParameterHandler:
                 if len(constraints_to_add) > 5:
                     st.write(f"... and {len(constraints_to_add) - 5} more")
     
-    def _generate_constraint_combinations(self, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Generate all constraint combinations from multi-value parameters."""
+    def _generate_constraint_combinations(self, parameters: Dict[str, Any],
+                                          set_valued: bool = False) -> List[Dict[str, Any]]:
+        """
+        Generate all constraint combinations from multi-value parameters.
+        
+        With set_valued, multi-value ID, day and shift_ID selections stay
+        lists in a single row marked in the set_valued column instead of
+        being multiplied out.
+        """
         import itertools
         
+        set_params = {}
+        if set_valued:
+            set_params = {param: value for param, value in parameters.items()
+                          if param in SET_VALUED_COLUMNS and isinstance(value, list) and len(value) > 1}
+            parameters = {param: value for param, value in parameters.items() if param not in set_params}
+            if set_params:
+                set_params[SET_VALUED_MARKER] = list(set_params)
+        
         # Separate single and multi-value parameters
         single_params = {}
         multi_params = {}
@@ -3299,6 +4826,7 @@ class ConstraintParameterHandler:
                 single_params[param] = value[0]
             else:
                 single_params[param] = value
+        single_params.update(set_params)
         
         # Generate combinations
         if not multi_params:
@@ -3326,15 +4854,12 @@ class ConstraintDataManager:
         self.lang = lang
     
     def load_available_constraints(self) -> Dict[str, Dict]:
-        """Load available constraints from constraint loader classes."""
+        """Load available constraints from the memoized constraint catalog."""
         try:
-            
-            hard_loader = HardConstraintLoader("dummy_path")
-            soft_loader = SoftConstraintLoader("dummy_path")
-            
+            catalog = get_constraint_catalog()
             return {
-                'hard': hard_loader.constraint_types,
-                'soft': soft_loader.constraint_types
+                'hard': catalog['hard'],
+                'soft': catalog['soft']
             }
         except Exception as e:
             st.error(f"Error loading constraint types: {e}")
@@ -3345,27 +4870,7 @@ class ConstraintDataManager:
         converted_params = self._convert_parameters_to_strings(parameters)
         converted_params['constraint_type'] = constraint_name
         
-        # Get file path
-        file_paths = get_file_paths()
-        constraint_file = file_paths['hard_constraints'] if is_hard else file_paths['soft_constraints']
-        
-        # Load existing constraints
-        existing_df = load_constraints(constraint_file)
-        
-        # Add new constraint
-        new_constraint_df = pd.DataFrame([converted_params])
-        updated_df = pd.concat([existing_df, new_constraint_df], ignore_index=True)
-        
-        # Save to file
-        success = save_dataframe(updated_df, constraint_file, "Constraint added successfully")
-        
-        # NEW: Update session state to refresh the display automatically
-        if success:
-            constraint_type = 'hard' if is_hard else 'soft'
-            session_key = f"{constraint_type}_constraints_df"
-            st.session_state[session_key] = updated_df
-        
-        return success
+        return self._append_constraints([converted_params], is_hard, "Constraint added successfully")
     
     def save_multiple_constraints(self, constraints_list: List[Dict[str, Any]], 
                                 constraint_name: str, is_hard: bool) -> bool:
@@ -3380,26 +4885,104 @@ class ConstraintDataManager:
             converted_params['constraint_type'] = constraint_name
             converted_constraints.append(converted_params)
         
+        return self._append_constraints(converted_constraints, is_hard,
+                                        f"{len(constraints_list)} constraints added successfully")
+    
+    def _load_session_constraints(self, constraint_file: str, constraint_type: str) -> pd.DataFrame:
+        """Load a constraints table into session state and remember its rows as the saved state."""
+        constraints_df = load_constraints(constraint_file)
+        remember_project_rows(constraint_file, constraints_df)
+        constraints_df = constraints_df.reset_index(drop=True)
+        st.session_state[f"{constraint_type}_constraints_df"] = constraints_df
+        st.session_state[f"{constraint_type}_constraints_saved"] = {
+            'file': constraint_file, 'keys': constraint_row_keys(constraints_df)
+        }
+        st.session_state.pop(f"{constraint_type}_constraints_index", None)
+        return constraints_df
+    
+    @staticmethod
+    def _session_constraints(constraint_type: str) -> pd.DataFrame:
+        """The table in session state with the rows added since it was last shown appended (one concat)."""
+        session_key = f"{constraint_type}_constraints_df"
+        constraints_df = st.session_state[session_key]
+        index = st.session_state.get(f"{constraint_type}_constraints_index")
+        if index is None or index['df'] is not constraints_df or not index['pending']:
+            return constraints_df
+        labels, rows = zip(*index['pending'])
+        new_df = ensure_proper_constraint_data_types(pd.DataFrame(list(rows), index=list(labels)))
+        constraints_df = pd.concat([constraints_df, new_df])
+        st.session_state[session_key] = constraints_df
+        index['df'], index['pending'] = constraints_df, []
+        return constraints_df
+    
+    @staticmethod
+    def _saved_constraint_keys(constraint_file: str, constraint_type: str) -> Optional[Dict[Any, tuple]]:
+        """Keys of the table as last loaded or saved, if they belong to constraint_file."""
+        saved = st.session_state.get(f"{constraint_type}_constraints_saved")
+        return saved['keys'] if saved and saved['file'] == constraint_file else None
+    
+    def _append_constraints(self, converted_constraints: List[Dict[str, Any]], is_hard: bool,
+                            success_message: str) -> bool:
+        """
+        Journal new rows for the constraints file and append them to the table in session state.
+        
+        Only the new rows are checked: a row whose key is already in the
+        table is dropped as a duplicate. The rows are kept as pending in the
+        table's index and appended to the frame when the table is next shown,
+        so an addition does not copy the table.
+        """
         # Get file path
         file_paths = get_file_paths()
         constraint_file = file_paths['hard_constraints'] if is_hard else file_paths['soft_constraints']
-        
-        # Load existing constraints
-        existing_df = load_constraints(constraint_file)
-        
-        # Add new constraints
-        new_constraints_df = pd.DataFrame(converted_constraints)
-        updated_df = pd.concat([existing_df, new_constraints_df], ignore_index=True)
-        
-        # Save to file
-        success = save_dataframe(updated_df, constraint_file, 
-                            f"{len(constraints_list)} constraints added successfully")
-        
-        # NEW: Update session state to refresh the display automatically
+        constraint_type = 'hard' if is_hard else 'soft'
+        session_key = f"{constraint_type}_constraints_df"
+        index_key = f"{constraint_type}_constraints_index"
+        store = ConstraintStore(constraint_file)
+        
+        # Current constraints: the table on screen, or workbook plus journal
+        existing_df = st.session_state.get(session_key)
+        if existing_df is None:
+            existing_df = self._load_session_constraints(constraint_file, constraint_type)
+        
+        # Keys of the rows on screen (pending ones included), rebuilt only when the table was replaced (e.g. edited)
+        index = st.session_state.get(index_key)
+        if index is None or index['df'] is not existing_df:
+            index = {'df': existing_df, 'keys': set(constraint_row_keys(existing_df).values()), 'pending': [],
+                     'next_label': int(existing_df.index.max()) + 1 if len(existing_df) else 0}
+        
+        new_rows, duplicate_rows = [], []
+        for row in converted_constraints:
+            key = constraint_row_key(row)
+            if key in index['keys']:
+                duplicate_rows.append(row)
+            else:
+                index['keys'].add(key)
+                new_rows.append((key, row))
+        if duplicate_rows:
+            removed = pd.DataFrame(duplicate_rows)
+            removed.insert(0, 'reason', 'duplicate')
+            show_constraint_dedup_report({'duplicates': len(duplicate_rows), 'subsumed': 0, 'folded': 0,
+                                          'removed': removed}, self.lang)
+        if not new_rows:
+            st.session_state[index_key] = index
+            return True
+        
+        # Append to the journal; the workbook is rewritten only on compaction
+        success = store.append([row for _, row in new_rows], constraint_type)
         if success:
-            constraint_type = 'hard' if is_hard else 'soft'
-            session_key = f"{constraint_type}_constraints_df"
-            st.session_state[session_key] = updated_df
+            st.success(success_message)
+            # Continue the labels so the saved state of the existing rows stays valid
+            labels = range(index['next_label'], index['next_label'] + len(new_rows))
+            index['next_label'] += len(new_rows)
+            index['pending'].extend(zip(labels, (row for _, row in new_rows)))
+            saved_keys = self._saved_constraint_keys(constraint_file, constraint_type)
+            if saved_keys is not None:
+                saved_keys.update(zip(labels, (key for key, _ in new_rows)))
+            st.session_state[index_key] = index
+        else:
+            for key, _ in new_rows:
+                index['keys'].discard(key)
+            st.error("Error saving data: could not write the constraint journal")
         
         return success
     
@@ -3426,9 +5009,9 @@ class ConstraintDataManager:
         # Initialize session state
         session_key = f"{constraint_type}_constraints_df"
         if session_key not in st.session_state:
-            st.session_state[session_key] = load_constraints(constraint_file)
+            self._load_session_constraints(constraint_file, constraint_type)
         
-        constraints_df = st.session_state[session_key]
+        constraints_df = self._session_constraints(constraint_type)
         
         if not constraints_df.empty:
             # Action buttons
@@ -3436,13 +5019,22 @@ class ConstraintDataManager:
             
             with col1:
                 if st.button(f"Save {constraint_type.title()}", key=f"save_{constraint_type}"):
-                    if save_dataframe(st.session_state[session_key], constraint_file, 
-                                    "Data saved successfully"):
+                    # Only the changed rows are journaled; the workbook is rewritten on compaction
+                    saved_keys = ConstraintStore(constraint_file).save_changes(
+                        st.session_state[session_key],
+                        self._saved_constraint_keys(constraint_file, constraint_type),
+                        constraint_type, "Data saved successfully"
+                    )
+                    if saved_keys is not None:
+                        st.session_state[session_key] = st.session_state[session_key].reset_index(drop=True)
+                        st.session_state[f"{constraint_type}_constraints_saved"] = {
+                            'file': constraint_file, 'keys': saved_keys
+                        }
                         st.success(f"{constraint_type.title()} constraints saved!")
             
             with col2:
                 if st.button(f"Refresh {constraint_type.title()}", key=f"refresh_{constraint_type}"):
-                    st.session_state[session_key] = load_constraints(constraint_file)
+                    self._load_session_constraints(constraint_file, constraint_type)
                     st.success("Data refreshed!")
                     st.rerun()
             
@@ -3453,6 +5045,25 @@ class ConstraintDataManager:
                         st.success("Cleared! Don't forget to save.")
                         st.rerun()
             
+            # Rows found by the conflict isolation in the run tab
+            conflict = st.session_state.get('conflicting_hard_constraints')
+            if constraint_type == 'hard' and conflict and os.path.abspath(constraint_file) in conflict.get('files', ()):
+                # Matched by content, so rows found in a merged set map back to this file's rows
+                conflict_rows = [label for label, key in constraint_row_keys(constraints_df).items()
+                                 if key in conflict['keys']]
+                elsewhere = len(conflict['keys'] - {constraint_row_key(row) for row in
+                                                    constraints_df.loc[conflict_rows].to_dict('records')})
+                st.error(f"❌ {len(conflict_rows)} rows conflict with each other (rows {', '.join(map(str, conflict_rows))})"
+                         if self.lang == 'en' else
+                         f"❌ {len(conflict_rows)} rækker er i konflikt med hinanden (rækker {', '.join(map(str, conflict_rows))})")
+                if elsewhere:
+                    st.caption(f"{elsewhere} further conflicting rows are in the other merged file" if self.lang == 'en'
+                               else f"{elsewhere} yderligere modstridende rækker findes i den anden sammenføjede fil")
+                st.dataframe(constraints_df.loc[conflict_rows], width='stretch')
+                if st.button("Skjul konflikt" if self.lang == 'da' else "Dismiss conflict", key="dismiss_hard_conflict"):
+                    st.session_state.pop('conflicting_hard_constraints', None)
+                    st.rerun()
+            
             # Editable dataframe
             edited_df = st.data_editor(
                 constraints_df,
@@ -3469,8 +5080,9 @@ class ConstraintDataManager:
             st.info("No constraints defined" if self.lang == 'en' else "Ingen begrænsninger defineret")
             if st.button(f"Create Empty {constraint_type.title()} File", key=f"create_{constraint_type}"):
                 empty_df = pd.DataFrame(columns=['constraint_type'])
-                if save_dataframe(empty_df, constraint_file, f"Empty {constraint_type} file created"):
+                if ConstraintStore(constraint_file).export(empty_df, f"Empty {constraint_type} file created"):
                     st.session_state[session_key] = empty_df
+                    st.session_state[f"{constraint_type}_constraints_saved"] = {'file': constraint_file, 'keys': {}}
                     st.rerun()
     
     def _convert_parameters_to_strings(self, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -3483,7 +5095,10 @@ class ConstraintDataManager:
                 else:  # Date object
                     converted[param] = value.strftime('%Y-%m-%d')
             elif isinstance(value, list):
-                converted[param] = ','.join(map(str, value))
+                converted[param] = ','.join(
+                    item.strftime('%H:%M' if hasattr(item, 'hour') else '%Y-%m-%d') if hasattr(item, 'strftime') else str(item)
+                    for item in value
+                )
             else:
                 converted[param] = value
         return converted
@@ -3536,8 +5151,20 @@ class ConstraintFormManager:
         # Render ALL parameters outside of forms
         all_parameters = self.parameter_handler.render_parameters(method_params, constraint_name, employees_df)
         
+        # Offer a single set-valued row instead of one row per employee/date/shift combination
+        set_valued = False
+        if any(isinstance(all_parameters.get(param), list) and len(all_parameters[param]) > 1
+               for param in SET_VALUED_COLUMNS):
+            set_valued = st.checkbox(
+                "Gem som én række med lister" if self.lang == 'da' else "Save as one row with lists",
+                value=False,
+                key=f"set_valued_{constraint_name}",
+                help="Medarbejdere, datoer og vagter gemmes samlet i én række i stedet for én række pr. kombination" if self.lang == 'da'
+                     else "Employees, dates and shifts are stored together in one row instead of one row per combination"
+            )
+        
         # Show combination preview
-        self._show_combination_preview(all_parameters)
+        self._show_combination_preview(all_parameters, set_valued)
         
         # Submit button (no form needed)
         if st.button(
@@ -3545,7 +5172,7 @@ class ConstraintFormManager:
             type="primary",
             key=f"submit_{constraint_name}"
         ):
-            self._process_form_submission(all_parameters, method_params, constraint_name, is_hard)
+            self._process_form_submission(all_parameters, method_params, constraint_name, is_hard, set_valued)
 
     def _render_no_parameters_form(self, constraint_name: str, is_hard: bool) -> None:
         """Render form for constraints that don't need parameters."""
@@ -3569,7 +5196,7 @@ class ConstraintFormManager:
                 if self.data_manager.save_constraint({}, constraint_name, is_hard):
                     st.success(f"Constraint added: {constraint_name}")
     
-    def _show_combination_preview(self, parameters: Dict[str, Any]) -> None:
+    def _show_combination_preview(self, parameters: Dict[str, Any], set_valued: bool = False) -> None:
         """Show preview of parameter combinations for multi-value parameters."""
         multi_params = {k: v for k, v in parameters.items() 
                        if isinstance(v, list) and len(v) > 1}
@@ -3586,9 +5213,15 @@ class ConstraintFormManager:
                 else:
                     st.write(f"- **{param}:** {len(values)} values")
             st.write(f"**Total combinations:** {total_combinations}")
+            if set_valued:
+                rows = total_combinations
+                for param, values in multi_params.items():
+                    if param in SET_VALUED_COLUMNS:
+                        rows //= len(values)
+                st.write(f"**Rows to save:** {rows}" if self.lang == 'en' else f"**Rækker der gemmes:** {rows}")
     
     def _process_form_submission(self, parameters: Dict[str, Any], required_params: List[str], 
-                                constraint_name: str, is_hard: bool) -> None:
+                                constraint_name: str, is_hard: bool, set_valued: bool = False) -> None:
         """Process form submission with validation and constraint generation."""
         # Validate parameters
         is_valid, errors = self.parameter_handler.validate_parameters(parameters, required_params)
@@ -3600,7 +5233,7 @@ class ConstraintFormManager:
             return
         
         # Generate constraint combinations
-        constraints_to_add = self._generate_constraint_combinations(parameters)
+        constraints_to_add = self._generate_constraint_combinations(parameters, set_valued=set_valued)
         
         # Save constraints
         if len(constraints_to_add) == 1:
@@ -3618,8 +5251,23 @@ class ConstraintFormManager:
                 if len(constraints_to_add) > 5:
                     st.write(f"... and {len(constraints_to_add) - 5} more")
     
-    def _generate_constraint_combinations(self, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Generate all constraint combinations from multi-value parameters."""
+    def _generate_constraint_combinations(self, parameters: Dict[str, Any],
+                                          set_valued: bool = False) -> List[Dict[str, Any]]:
+        """
+        Generate all constraint combinations from multi-value parameters.
+        
+        With set_valued, multi-value ID, day and shift_ID selections stay
+        lists in a single row marked in the set_valued column instead of
+        being multiplied out.
+        """
+        set_params = {}
+        if set_valued:
+            set_params = {param: value for param, value in parameters.items()
+                          if param in SET_VALUED_COLUMNS and isinstance(value, list) and len(value) > 1}
+            parameters = {param: value for param, value in parameters.items() if param not in set_params}
+            if set_params:
+                set_params[SET_VALUED_MARKER] = list(set_params)
+        
         # Separate single and multi-value parameters
         single_params = {}
         multi_params = {}
@@ -3633,6 +5281,7 @@ class ConstraintFormManager:
                 single_params[param] = value[0]
             else:
                 single_params[param] = value
+        single_params.update(set_params)
         
         # Generate combinations
         if not multi_params:
@@ -3736,20 +5385,22 @@ def merge_constraint_files(primary_file_path, additional_file_path, constraint_t
     """
     Merge two constraint files of the same type, handling different columns and orders.
     
+    Duplicate and redundant rows are removed with canonicalize_constraints;
+    the caller shows the report with show_constraint_dedup_report.
+    
     Args:
         primary_file_path: Path to the primary constraints file
         additional_file_path: Path to the additional constraints file
         constraint_type: 'hard' or 'soft' for error messaging
         
     Returns:
-        pandas.DataFrame: Merged constraints dataframe
+        Tuple of (merged constraints dataframe, canonicalize_constraints report)
     """
-    import pandas as pd
-    import os
+    no_report = {'duplicates': 0, 'subsumed': 0, 'folded': 0, 'removed': pd.DataFrame()}
     
     # Load primary file
     try:
-        if os.path.exists(primary_file_path):
+        if dataset_exists(primary_file_path):
             primary_df = load_constraints(primary_file_path)
         else:
             primary_df = pd.DataFrame(columns=['constraint_type'])
@@ -3759,22 +5410,22 @@ def merge_constraint_files(primary_file_path, additional_file_path, constraint_t
     
     # Load additional file
     try:
-        if os.path.exists(additional_file_path):
+        if dataset_exists(additional_file_path):
             additional_df = load_constraints(additional_file_path)
         else:
             st.info(f"Additional {constraint_type} constraints file not found, using primary only")
-            return primary_df
+            return primary_df, no_report
     except Exception as e:
         st.warning(f"Could not load additional {constraint_type} constraints file: {e}")
-        return primary_df
+        return primary_df, no_report
     
     # Handle empty dataframes
     if primary_df.empty and additional_df.empty:
-        return pd.DataFrame(columns=['constraint_type'])
+        return pd.DataFrame(columns=['constraint_type']), no_report
     elif primary_df.empty:
-        return additional_df
+        return additional_df, no_report
     elif additional_df.empty:
-        return primary_df
+        return primary_df, no_report
     
     # Get all unique columns from both dataframes
     all_columns = list(set(primary_df.columns.tolist() + additional_df.columns.tolist()))
@@ -3798,10 +5449,13 @@ def merge_constraint_files(primary_file_path, additional_file_path, constraint_t
     # Merge the dataframes
     merged_df = pd.concat([primary_df, additional_df], ignore_index=True)
     
+    # Drop rows the other file already covers
+    merged_df, dedup_report = canonicalize_constraints(merged_df, constraint_type)
+    
     # Ensure proper data types
     merged_df = ensure_proper_constraint_data_types(merged_df)
     
-    return merged_df
+    return merged_df, dedup_report
 
 def show_constraint_file_merger_ui(lang):
     """
@@ -3908,7 +5562,8 @@ def show_constraint_file_merger_ui(lang):
                 if st.button("🔍 " + ("Forhåndsvis sammenføjning (hård)" if lang == 'da' else "Preview merge (hard)"), 
                            key="preview_hard_merge"):
                     try:
-                        merged_hard = merge_constraint_files(primary_hard_path, additional_hard_path, "hard")
+                        merged_hard, dedup_report = merge_constraint_files(primary_hard_path, additional_hard_path, "hard")
+                        show_constraint_dedup_report(dedup_report, lang)
                         if not merged_hard.empty:
                             st.write("**" + ("Sammenføjet resultat:" if lang == 'da' else "Merged result:") + "**")
                             st.dataframe(merged_hard, width='stretch')
@@ -4002,7 +5657,8 @@ def show_constraint_file_merger_ui(lang):
                 if st.button("🔍 " + ("Forhåndsvis sammenføjning (blød)" if lang == 'da' else "Preview merge (soft)"), 
                            key="preview_soft_merge"):
                     try:
-                        merged_soft = merge_constraint_files(primary_soft_path, additional_soft_path, "soft")
+                        merged_soft, dedup_report = merge_constraint_files(primary_soft_path, additional_soft_path, "soft")
+                        show_constraint_dedup_report(dedup_report, lang)
                         if not merged_soft.empty:
                             st.write("**" + ("Sammenføjet resultat:" if lang == 'da' else "Merged result:") + "**")
                             st.dataframe(merged_soft, width='stretch')
@@ -4046,9 +5702,128 @@ def show_constraint_file_merger_ui(lang):
     
     return merged_file_paths if use_constraint_merging else {}
 
+# =============================================================================
+# MERGED CONSTRAINT SETS
+# A merged base + specific constraint set is materialized once per pair of
+# input contents under ./.ui_cache/merged/: a pickled frame, which the solver
+# reads through the *_constraints_frame config keys, and an xlsx copy for
+# cores and tools that read workbooks. A .sources.json next to them lists the
+# two input files. Entries unused for a week and the *_merged_*.xlsx temp
+# files left by older versions are removed.
+# =============================================================================
+
+MERGED_CONSTRAINTS_DIR = os.path.join(WORKBOOK_CACHE_DIR, "merged")
+MERGED_CONSTRAINTS_VERSION = 2  # Bump when merge_constraint_files or canonicalization changes
+MERGED_CONSTRAINTS_MAX_AGE = timedelta(days=7)
+LEGACY_MERGED_TEMP_MAX_AGE = timedelta(hours=1)
+
+def _merged_constraints_paths(primary_file_path, additional_file_path, constraint_type) -> Tuple[str, str]:
+    """(xlsx path, frame path) of a merged set, keyed by the contents of both inputs."""
+    parts = [str(MERGED_CONSTRAINTS_VERSION), constraint_type]
+    for path in (primary_file_path, additional_file_path):
+        parts.append(_file_content_hash(path) if os.path.exists(path) else f"missing:{os.path.abspath(path)}")
+    key = hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()[:16]
+    base = os.path.join(MERGED_CONSTRAINTS_DIR, f"{constraint_type}_{key}")
+    return base + ".xlsx", base + ".pkl"
+
+def materialize_merged_constraints(primary_file_path, additional_file_path, constraint_type) -> Dict[str, Any]:
+    """
+    Merge two constraint files once and reuse the result while neither input changes.
+    
+    Returns:
+        Dict with file (xlsx), frame (pickle), rows, cached (True if the set
+        was already materialized) and report (the canonicalize_constraints
+        report of a new merge, None when cached)
+    """
+    xlsx_path, frame_path = _merged_constraints_paths(primary_file_path, additional_file_path, constraint_type)
+    _write_merged_constraint_sources(xlsx_path, primary_file_path, additional_file_path)
+    if os.path.exists(xlsx_path) and os.path.exists(frame_path):
+        try:
+            with open(frame_path, 'rb') as f:
+                rows = len(pickle.load(f))
+            for path in (xlsx_path, frame_path, _merged_sources_path(xlsx_path)):
+                os.utime(path)  # keeps the entry out of garbage collection
+            return {'file': xlsx_path, 'frame': frame_path, 'rows': rows, 'cached': True, 'report': None}
+        except Exception:
+            pass  # A broken entry is rebuilt
+    
+    merged_df, dedup_report = merge_constraint_files(primary_file_path, additional_file_path, constraint_type)
+    os.makedirs(MERGED_CONSTRAINTS_DIR, exist_ok=True)
+    with open(frame_path + '.tmp', 'wb') as f:
+        pickle.dump(merged_df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    merged_df.to_excel(xlsx_path + '.tmp.xlsx', index=False)
+    os.replace(frame_path + '.tmp', frame_path)
+    os.replace(xlsx_path + '.tmp.xlsx', xlsx_path)
+    
+    # Readers going through load_constraints get the frame without parsing the xlsx
+    store_cached_frame(xlsx_path, 'constraints', merged_df)
+    return {'file': xlsx_path, 'frame': frame_path, 'rows': len(merged_df), 'cached': False, 'report': dedup_report}
+
+def _merged_sources_path(xlsx_path) -> str:
+    return xlsx_path[:-len('.xlsx')] + '.sources.json'
+
+def _write_merged_constraint_sources(xlsx_path, primary_file_path, additional_file_path):
+    """Record the input files of a merged set next to it."""
+    os.makedirs(MERGED_CONSTRAINTS_DIR, exist_ok=True)
+    sources_path = _merged_sources_path(xlsx_path)
+    with open(sources_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump([os.path.abspath(primary_file_path), os.path.abspath(additional_file_path)], f)
+    os.replace(sources_path + '.tmp', sources_path)
+
+def constraint_source_files(constraints_file) -> List[str]:
+    """The files whose rows make up constraints_file: the inputs of a merged set, else the file itself."""
+    if merged_constraints_frame(constraints_file) is None:
+        return [constraints_file]
+    try:
+        with open(_merged_sources_path(os.path.abspath(constraints_file)), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return [constraints_file]
+
+def load_constraint_source_rows(constraints_file) -> pd.DataFrame:
+    """Rows of every source file of constraints_file, before merging and deduplication."""
+    frames = [load_constraints(path) for path in constraint_source_files(constraints_file) if dataset_exists(path)]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=['constraint_type'])
+    return pd.concat(frames, ignore_index=True)
+
+def merged_constraints_frame(constraints_file) -> Optional[str]:
+    """Frame path of a materialized merged constraints xlsx, or None for other files."""
+    if not constraints_file:
+        return None
+    xlsx_path = os.path.abspath(constraints_file)
+    if os.path.dirname(xlsx_path) != os.path.abspath(MERGED_CONSTRAINTS_DIR) or not xlsx_path.endswith('.xlsx'):
+        return None
+    frame_path = xlsx_path[:-len('.xlsx')] + '.pkl'
+    return frame_path if os.path.exists(frame_path) else None
+
+def collect_stale_merged_constraints():
+    """Remove merged sets unused for MERGED_CONSTRAINTS_MAX_AGE and legacy merged temp workbooks."""
+    now = datetime.now().timestamp()
+    candidates = []
+    if os.path.isdir(MERGED_CONSTRAINTS_DIR):
+        candidates += [(os.path.join(MERGED_CONSTRAINTS_DIR, name), MERGED_CONSTRAINTS_MAX_AGE)
+                       for name in os.listdir(MERGED_CONSTRAINTS_DIR)]
+    temp_dir = tempfile.gettempdir()
+    candidates += [(os.path.join(temp_dir, name), LEGACY_MERGED_TEMP_MAX_AGE) for name in os.listdir(temp_dir)
+                   if name.endswith(('_merged_hard.xlsx', '_merged_soft.xlsx'))]
+    
+    for path, max_age in candidates:
+        try:
+            if now - os.path.getmtime(path) > max_age.total_seconds():
+                os.remove(path)
+                if path.endswith('.xlsx'):
+                    for sidecar in _workbook_cache_paths(path, 'constraints'):
+                        if os.path.exists(sidecar):
+                            os.remove(sidecar)
+        except OSError:
+            pass
+
 def create_merged_constraint_files(merged_file_paths, lang):
     """
-    Create temporary merged constraint files and return their paths.
+    Resolve the constraint files to use, materializing merged sets when both
+    a base and a specific file are given.
     
     Args:
         merged_file_paths: Dictionary with primary and additional file paths
@@ -4057,68 +5832,41 @@ def create_merged_constraint_files(merged_file_paths, lang):
     Returns:
         dict: Dictionary with paths to merged constraint files
     """
-    import tempfile
-    import os
+    # Stale merged sets are cleaned up once per session
+    if not st.session_state.get('merged_constraints_gc_done'):
+        collect_stale_merged_constraints()
+        st.session_state.merged_constraints_gc_done = True
     
     result_paths = {}
     
-    # Handle hard constraints merging
-    if merged_file_paths.get('hard_primary') or merged_file_paths.get('hard_additional'):
-        primary_hard = merged_file_paths.get('hard_primary', "")
-        additional_hard = merged_file_paths.get('hard_additional', "")
-        
-        if primary_hard and additional_hard:
-            # Both files specified - merge them
-            merged_hard = merge_constraint_files(primary_hard, additional_hard, "hard")
-            
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='_merged_hard.xlsx') as tmp_file:
-                merged_hard.to_excel(tmp_file.name, index=False)
-                result_paths['hard_constraints'] = tmp_file.name
-            
-            st.success(f"✅ " + (f"Sammenføjede {len(merged_hard)} hårde begrænsninger" if lang == 'da' 
-                               else f"Merged {len(merged_hard)} hard constraints"))
-        
-        elif primary_hard:
-            # Only primary file specified
-            result_paths['hard_constraints'] = primary_hard
-            st.info("ℹ️ " + ("Bruger kun base hårde begrænsninger" if lang == 'da' 
-                           else "Using only base hard constraints"))
-        
-        elif additional_hard:
-            # Only additional file specified
-            result_paths['hard_constraints'] = additional_hard
-            st.info("ℹ️ " + ("Bruger kun specifikke hårde begrænsninger" if lang == 'da' 
-                           else "Using only specific hard constraints"))
-    
-    # Handle soft constraints merging
-    if merged_file_paths.get('soft_primary') or merged_file_paths.get('soft_additional'):
-        primary_soft = merged_file_paths.get('soft_primary', "")
-        additional_soft = merged_file_paths.get('soft_additional', "")
+    for constraint_type in ('hard', 'soft'):
+        primary = merged_file_paths.get(f'{constraint_type}_primary', "")
+        additional = merged_file_paths.get(f'{constraint_type}_additional', "")
+        label_da = 'hårde' if constraint_type == 'hard' else 'bløde'
         
-        if primary_soft and additional_soft:
-            # Both files specified - merge them
-            merged_soft = merge_constraint_files(primary_soft, additional_soft, "soft")
-            
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='_merged_soft.xlsx') as tmp_file:
-                merged_soft.to_excel(tmp_file.name, index=False)
-                result_paths['soft_constraints'] = tmp_file.name
+        if primary and additional:
+            # Both files specified - merge them (reused while neither input changes)
+            flush_constraint_journals(primary, additional)
+            primary, additional = solver_input_path(primary), solver_input_path(additional)
+            merged = materialize_merged_constraints(primary, additional, constraint_type)
+            result_paths[f'{constraint_type}_constraints'] = merged['file']
+            if merged['report'] is not None:
+                show_constraint_dedup_report(merged['report'], lang)
             
-            st.success(f"✅ " + (f"Sammenføjede {len(merged_soft)} bløde begrænsninger" if lang == 'da' 
-                               else f"Merged {len(merged_soft)} soft constraints"))
+            st.success(f"✅ " + (f"Sammenføjede {merged['rows']} {label_da} begrænsninger" if lang == 'da' 
+                               else f"Merged {merged['rows']} {constraint_type} constraints"))
         
-        elif primary_soft:
+        elif primary:
             # Only primary file specified
-            result_paths['soft_constraints'] = primary_soft
-            st.info("ℹ️ " + ("Bruger kun base bløde begrænsninger" if lang == 'da' 
-                           else "Using only base soft constraints"))
+            result_paths[f'{constraint_type}_constraints'] = primary
+            st.info("ℹ️ " + (f"Bruger kun base {label_da} begrænsninger" if lang == 'da' 
+                           else f"Using only base {constraint_type} constraints"))
         
-        elif additional_soft:
+        elif additional:
             # Only additional file specified
-            result_paths['soft_constraints'] = additional_soft
-            st.info("ℹ️ " + ("Bruger kun specifikke bløde begrænsninger" if lang == 'da' 
-                           else "Using only specific soft constraints"))
+            result_paths[f'{constraint_type}_constraints'] = additional
+            st.info("ℹ️ " + (f"Bruger kun specifikke {label_da} begrænsninger" if lang == 'da' 
+                           else f"Using only specific {constraint_type} constraints"))
     
     return result_paths
 
@@ -4127,8 +5875,11 @@ def create_merged_constraint_files(merged_file_paths, lang):
 # =============================================================================
 
 def load_holidays_from_json(filename="holidays.json"):
-    """Load holidays from JSON file, return empty list if file doesn't exist"""
+    """Load holidays from JSON file (or the active project database), return empty list if file doesn't exist"""
     try:
+        project_db = active_project_db()
+        if project_db:
+            return load_project_holidays(project_db)
         with open(filename, 'r') as f:
             data = json.load(f)
             # Convert string dates back to date objects
@@ -4143,8 +5894,12 @@ def load_holidays_from_json(filename="holidays.json"):
         return []
 
 def save_holidays_to_json(holiday_list, filename="holidays.json"):
-    """Save holidays to JSON file"""
+    """Save holidays to JSON file (or the active project database)"""
     try:
+        project_db = active_project_db()
+        if project_db:
+            save_project_holidays(project_db, holiday_list)
+            return True
         # Convert date objects to strings for JSON storage
         date_strings = [holiday.strftime('%Y-%m-%d') for holiday in holiday_list]
         with open(filename, 'w') as f:
@@ -4154,69 +5909,781 @@ def save_holidays_to_json(holiday_list, filename="holidays.json"):
         st.error(f"Error saving holidays to {filename}: {e}")
         return False
 
-def run_constraint_testing_simple(test_start_date, test_end_date, max_test_time, historical_file_path, lang, test_hard_constraints=None):
-    """Simple constraint testing using your elegant approach."""
+# =============================================================================
+# PRE-SOLVE ANALYZER
+# Cheap pandas checks that catch the most common causes of infeasibility in
+# seconds, before any solver time is spent. Every finding is a diagnostic
+# dict (check, severity, constraint_row, constraint_type, employee, date,
+# shift, message) so it can be filtered and shown as a table.
+# =============================================================================
+
+# Words of a registered hard constraint name that mark it as forcing or forbidding work,
+# used when the constraint class does not declare presolve_role itself
+FIXED_ASSIGNMENT_KEYWORDS = ('fixed', 'must_work', 'force', 'preassign')
+UNAVAILABILITY_KEYWORDS = ('vacation', 'unavailable', 'absence', 'day_off', 'not_work', 'leave', 'ferie')
+PRESOLVE_ROLES = ('fixed_assignment', 'unavailability')
+SHIFT_DEMAND_COLUMNS = ('required_staff', 'min_staff', 'staff_required', 'demand')
+
+def constraint_presolve_role(name, class_obj, required_params) -> Optional[str]:
+    """
+    Role of a constraint catalog entry in the pre-solve checks.
     
-    # Get file paths
-    file_paths = get_file_paths()
+    A presolve_role attribute on the constraint class wins. Otherwise the
+    role follows from the registered name's words together with the
+    parameters: a fixed assignment takes ID and shift_ID, an unavailability
+    takes ID but no shift_ID.
     
-    # Use provided test_hard_constraints if available, otherwise fall back to default
-    hard_constraints_file = test_hard_constraints if test_hard_constraints else file_paths['hard_constraints']
+    Returns:
+        'fixed_assignment', 'unavailability' or None
+    """
+    import re
     
-    # Show a spinner while running
-    with st.spinner("Tester begrænsninger..." if lang == 'da' else "Testing constraints..."):
-        
-        # Capture output in a container for real-time updates
-        output_container = st.container()
-        
-        # Redirect print statements to capture them
-        import io
-        import sys
-        from contextlib import redirect_stdout
-        
-        f = io.StringIO()
+    declared = getattr(class_obj, 'presolve_role', None)
+    if declared is not None:
+        return declared if declared in PRESOLVE_ROLES else None
+    
+    params = set(_iter_required_params(required_params))
+    words = '_' + '_'.join(re.findall(r'[a-z0-9]+', str(name).lower())) + '_'
+    
+    def named(keywords):
+        return any(f"_{keyword}_" in words for keyword in keywords)
+    
+    if 'ID' not in params:
+        return None
+    if 'shift_ID' not in params and named(UNAVAILABILITY_KEYWORDS):
+        return 'unavailability'
+    if 'shift_ID' in params and named(FIXED_ASSIGNMENT_KEYWORDS):
+        return 'fixed_assignment'
+    return None
+
+def _split_list(value) -> List[str]:
+    """Split a comma separated cell into stripped, non-empty items."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return []
+    return [item.strip() for item in str(value).split(',') if item.strip() and item.strip().lower() != 'nan']
+
+def _shift_hours(start, end) -> float:
+    """Length of a shift in hours; shifts ending at or before their start run past midnight."""
+    if not isinstance(start, time) or not isinstance(end, time):
+        return 0.0
+    minutes = (end.hour * 60 + end.minute) - (start.hour * 60 + start.minute)
+    return (minutes if minutes > 0 else minutes + 24 * 60) / 60
+
+def _constraint_dates(row, all_dates) -> List:
+    """Dates a constraint row applies to (day or a list of days, or start_day..end_day), or every date in the window."""
+    days = pd.to_datetime(pd.Series(_split_list(row.get('day', '')), dtype=object), errors='coerce').dropna()
+    if not days.empty:
+        return sorted({day.date() for day in days} & set(all_dates))
+    start = pd.to_datetime(str(row.get('start_day', '') or ''), errors='coerce')
+    end = pd.to_datetime(str(row.get('end_day', '') or ''), errors='coerce')
+    if pd.isna(start) and pd.isna(end):
+        return list(all_dates)
+    start = start.date() if not pd.isna(start) else min(all_dates)
+    end = end.date() if not pd.isna(end) else max(all_dates)
+    return [d for d in all_dates if start <= d <= end]
+
+def _diagnostic(check, severity, message, constraint_row=None, constraint_type=None,
+                employee=None, day=None, shift=None) -> Dict[str, Any]:
+    return {
+        'check': check,
+        'severity': severity,
+        'constraint_row': constraint_row,
+        'constraint_type': constraint_type,
+        'employee': employee,
+        'date': day,
+        'shift': shift,
+        'message': message
+    }
+
+def analyze_presolve_feasibility(employees_df: pd.DataFrame, shifts_df: pd.DataFrame,
+                                 hard_constraints_df: pd.DataFrame, start_date, end_date,
+                                 constraint_roles: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+    """
+    Run the pre-solve feasibility checks.
+    
+    Checks:
+        coverage: every shift on every day has enough qualified, available staff
+                  (an employee qualifies when their shift_types overlap the shift's)
+        hour_capacity: weekly_hours over the window cover the demanded shift hours,
+                       and no employee is fixed to more hours than they have
+        fixed_conflict: fixed assignments to unknown employees/shifts, to shifts the
+                        employee is not qualified for, on unavailable days, or to two
+                        shifts on the same day
+    
+    Args:
+        employees_df, shifts_df, hard_constraints_df: Normalized input frames
+        start_date, end_date: Planning window
+        constraint_roles: constraint_type -> presolve role, from the constraint
+                          catalog; rows of other types are not fixed assignments
+                          or unavailability
         
-        try:
-            with redirect_stdout(f):
-                # Import your elegant function (assuming it's in constraint_testing.py)
-                
-                result = run_constraints_test(
-                    test_start_date,
-                    test_end_date,
-                    file_paths['employees'],
-                    file_paths['shifts'],
-                    hard_constraints_file,  # Use the selected hard constraints file
-                    historical_file_path
-                )
-            
-            # Show the captured output
-            output = f.getvalue()
-            if output:
-                with output_container:
-                    st.subheader("🔍 " + ("Test Resultater:" if lang == 'da' else "Test Results:"))
-                    
-                    # Parse and display results nicely
-                    lines = output.split('\n')
-                    for line in lines:
-                        if '❌' in line:
-                            st.error(line)
-                        elif '✅' in line:
-                            st.success(line)
-                        elif line.strip() and not line.startswith('Loaded'):
-                            st.info(line)
-            
-            if result:
-                st.success("🎉 " + ("Test fuldført succesfuldt!" if lang == 'da' else "Testing completed successfully!"))
-                
-                # Show which constraints file was used
-                if test_hard_constraints:
-                    st.info("ℹ️ " + ("Brugte sammenføjede begrænsninger" if lang == 'da' else "Used merged constraints"))
-                else:
-                    st.info("ℹ️ " + ("Brugte standard begrænsninger" if lang == 'da' else "Used default constraints"))
-            else:
-                st.error("❌ " + ("Test fejlede!" if lang == 'da' else "Testing failed!"))
+    Returns:
+        List of diagnostic dicts, errors first
+    """
+    diagnostics = []
+    all_dates = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    
+    employees = employees_df.assign(_id=employees_df['ID'].astype(str).str.strip())
+    employees = employees[employees['_id'] != '']
+    shifts = shifts_df.assign(_id=shifts_df['shift_ID'].astype(str).str.strip())
+    shifts = shifts[shifts['_id'] != '']
+    if employees.empty or shifts.empty:
+        return [_diagnostic('coverage', 'error', "No employees or no shifts defined")]
+    
+    employee_types = {row_id: set(_split_list(types)) for row_id, types in zip(employees['_id'], employees['shift_types'])}
+    shift_types = {row_id: set(_split_list(types)) for row_id, types in zip(shifts['_id'], shifts['shift_types'])}
+    qualified = {shift_id: {employee for employee, types in employee_types.items() if types & required}
+                 for shift_id, required in shift_types.items()}
+    shift_hours = {row_id: _shift_hours(start, end)
+                   for row_id, start, end in zip(shifts['_id'], shifts['start_time'], shifts['end_time'])}
+    demand_column = next((column for column in SHIFT_DEMAND_COLUMNS if column in shifts.columns), None)
+    demand = ({row_id: int(value) if not pd.isna(value) else 1
+               for row_id, value in zip(shifts['_id'], pd.to_numeric(shifts[demand_column], errors='coerce'))}
+              if demand_column else {row_id: 1 for row_id in shifts['_id']})
+    
+    # Classify hard constraint rows into fixed assignments and unavailability
+    unavailable = {}   # (employee, date) -> constraint row
+    fixed = []         # (row index, constraint_type, employee, date, shift)
+    constraint_roles = constraint_roles or {}
+    hard = hard_constraints_df if hard_constraints_df is not None else pd.DataFrame(columns=['constraint_type'])
+    for index, row in hard.iterrows():
+        constraint_type = str(row.get('constraint_type', '') or '').strip()
+        role = constraint_roles.get(constraint_type)
+        employee_ids = _split_list(row.get('ID', ''))
+        if not employee_ids or role is None:
+            continue
+        if role == 'unavailability':
+            for day in _constraint_dates(row, all_dates):
+                for employee in employee_ids:
+                    unavailable.setdefault((employee, day), index)
+        else:
+            for day in _constraint_dates(row, all_dates):
+                for employee in employee_ids:
+                    for shift_id in _split_list(row.get('shift_ID', '')) or [None]:
+                        fixed.append((index, constraint_type, employee, day, shift_id))
+    
+    # Fixed assignment conflicts
+    fixed_per_day = {}
+    fixed_hours = {}
+    for index, constraint_type, employee, day, shift_id in fixed:
+        context = {'constraint_row': index, 'constraint_type': constraint_type,
+                   'employee': employee, 'day': day, 'shift': shift_id}
+        if employee not in employee_types:
+            diagnostics.append(_diagnostic('fixed_conflict', 'error', f"Unknown employee {employee}", **context))
+            continue
+        if shift_id is not None and shift_id not in shift_types:
+            diagnostics.append(_diagnostic('fixed_conflict', 'error', f"Unknown shift {shift_id}", **context))
+            continue
+        if shift_id is not None and employee not in qualified[shift_id]:
+            diagnostics.append(_diagnostic('fixed_conflict', 'error',
+                                           f"{employee} is not qualified for {shift_id}", **context))
+        if (employee, day) in unavailable:
+            diagnostics.append(_diagnostic('fixed_conflict', 'error',
+                                           f"{employee} is fixed to work but unavailable "
+                                           f"(row {unavailable[(employee, day)]})", **context))
+        if shift_id is not None:
+            fixed_per_day.setdefault((employee, day), []).append((index, shift_id))
+            fixed_hours[employee] = fixed_hours.get(employee, 0.0) + shift_hours.get(shift_id, 0.0)
+    
+    for (employee, day), assignments in fixed_per_day.items():
+        if len({shift_id for _, shift_id in assignments}) > 1:
+            diagnostics.append(_diagnostic(
+                'fixed_conflict', 'error',
+                f"{employee} is fixed to {', '.join(sorted({shift_id for _, shift_id in assignments}))} on the same day",
+                constraint_row=assignments[-1][0], employee=employee, day=day))
+    
+    # Per-day coverage against qualified, available staff
+    for day in all_dates:
+        available = {employee for employee in employee_types if (employee, day) not in unavailable}
+        for shift_id, required in demand.items():
+            candidates = len(qualified[shift_id] & available)
+            if candidates < required:
+                diagnostics.append(_diagnostic(
+                    'coverage', 'error',
+                    f"{shift_id} needs {required} but only {candidates} qualified employee(s) are available",
+                    day=day, shift=shift_id))
+        day_demand = sum(demand.values())
+        if day_demand > len(available):
+            diagnostics.append(_diagnostic(
+                'coverage', 'warning',
+                f"{day_demand} shift slots but only {len(available)} employee(s) available (one shift per day)",
+                day=day))
+    
+    # Hour capacity from weekly_hours
+    if 'weekly_hours' in employees.columns:
+        weeks = len(all_dates) / 7
+        weekly_hours = pd.to_numeric(employees['weekly_hours'], errors='coerce')
+        capacity = dict(zip(employees['_id'], weekly_hours * weeks))
+        demanded_hours = sum(shift_hours[shift_id] * required for shift_id, required in demand.items()) * len(all_dates)
+        total_capacity = weekly_hours.fillna(0).sum() * weeks
+        if weekly_hours.notna().any() and demanded_hours > total_capacity:
+            diagnostics.append(_diagnostic(
+                'hour_capacity', 'warning',
+                f"Shifts demand {demanded_hours:,.0f} hours but contracted capacity is {total_capacity:,.0f} hours"))
+        for employee, hours in fixed_hours.items():
+            limit = capacity.get(employee)
+            if limit is not None and not pd.isna(limit) and hours > limit:
+                diagnostics.append(_diagnostic(
+                    'hour_capacity', 'error',
+                    f"{employee} is fixed to {hours:.1f} hours but has {limit:.1f} contracted hours",
+                    employee=employee))
+    
+    severity_order = {'error': 0, 'warning': 1}
+    return sorted(diagnostics, key=lambda item: severity_order.get(item['severity'], 2))
+
+def show_presolve_analyzer(lang, start_date, end_date, final_file_paths):
+    """Display the pre-solve check button and its diagnostics table."""
+    if not st.button("🩺 " + ("Hurtigt forhåndstjek" if lang == 'da' else "Quick pre-solve check"),
+                     help="Finder åbenlyse umuligheder på få sekunder uden at starte solveren" if lang == 'da'
+                          else "Finds obvious infeasibilities in seconds without starting the solver"):
+        return
+    
+    try:
+        diagnostics = analyze_presolve_feasibility(
+            load_employees(final_file_paths['employees']),
+            load_shifts(final_file_paths['shifts']),
+            load_constraints(final_file_paths['hard_constraints']),
+            start_date, end_date,
+            constraint_roles=get_constraint_catalog()['presolve_roles']
+        )
+    except Exception as e:
+        st.error(f"Forhåndstjek fejlede: {e}" if lang == 'da' else f"Pre-solve check failed: {e}")
+        return
+    
+    if not diagnostics:
+        st.success("✅ " + ("Ingen åbenlyse problemer fundet" if lang == 'da' else "No obvious problems found"))
+        return
+    
+    errors = sum(1 for item in diagnostics if item['severity'] == 'error')
+    warnings = len(diagnostics) - errors
+    message = (f"{errors} fejl og {warnings} advarsler fundet" if lang == 'da'
+               else f"{errors} errors and {warnings} warnings found")
+    (st.error if errors else st.warning)(("❌ " if errors else "⚠️ ") + message)
+    st.dataframe(pd.DataFrame(diagnostics), width='stretch', hide_index=True)
+
+# =============================================================================
+# CONFLICT ISOLATION
+# Core test functions run in separate Python processes so several candidate
+# sub-solves can run in parallel, each with its own time limit, without
+# touching the Streamlit process. An isolation runs on a background thread
+# owned by a process-wide registry, like solver jobs, so reruns neither block
+# on it nor orphan its sub-solves. Conflicts are recorded as row keys per
+# source file, so the editor finds them in the file the rows came from even
+# when the test ran on a merged set.
+# =============================================================================
+
+CONFLICT_ISOLATION_DIR = os.path.join(WORKBOOK_CACHE_DIR, "isolation")
+CORE_PROCESS_STARTUP_GRACE = 30
+CONFLICT_ISOLATION_KEEP_RUNS = 10
+
+_CORE_FUNCTION_DRIVER = '''
+import contextlib, importlib, inspect, io, json, sys
+from datetime import date
+
+def decode(value):
+    if isinstance(value, dict) and '__date__' in value:
+        return date.fromisoformat(value['__date__'])
+    return value
+
+request = json.loads(sys.stdin.read())
+function = getattr(importlib.import_module(request['module']), request['function'])
+parameters = inspect.signature(function).parameters
+optional = {key: value for key, value in request['optional_kwargs'].items() if key in parameters}
+captured = io.StringIO()
+with contextlib.redirect_stdout(captured):
+    result = function(*[decode(arg) for arg in request['args']],
+                      **{key: decode(value) for key, value in request['kwargs'].items()}, **optional)
+print('__RESULT__' + json.dumps({'result': result, 'output': captured.getvalue()}, default=str))
+'''
+
+def _encode_core_argument(value):
+    """JSON-safe form of a core function argument (dates are tagged)."""
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return {'__date__': value.isoformat()}
+    return value
+
+def _run_core_function_subprocess(module_name: str, function_name: str, args=(), kwargs=None,
+                                  optional_kwargs=None, timeout: Optional[float] = None,
+                                  cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """
+    Call a core function in a fresh Python process.
+    
+    Args:
+        module_name, function_name: e.g. 'core.main', 'run_constraints_test'
+        args, kwargs: Arguments (JSON types or dates)
+        optional_kwargs: Passed only if the function's signature accepts them
+        timeout: Seconds before the process is killed
+        cancel_event: The process is killed as soon as this is set
+        
+    Returns:
+        Dict with result, output (captured stdout), timed_out and error
+    """
+    request = {
+        'module': module_name,
+        'function': function_name,
+        'args': [_encode_core_argument(arg) for arg in args],
+        'kwargs': {key: _encode_core_argument(value) for key, value in (kwargs or {}).items()},
+        'optional_kwargs': optional_kwargs or {}
+    }
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(path for path in sys.path if isinstance(path, str) and path)
+    
+    process = subprocess.Popen(
+        [sys.executable, "-c", _CORE_FUNCTION_DRIVER],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        env=env,
+        cwd=os.getcwd()
+    )
+    deadline = None if timeout is None else _monotonic() + timeout
+    pending_input = json.dumps(request)
+    while True:
+        try:
+            stdout, stderr = process.communicate(pending_input, timeout=0.5)
+            break
+        except subprocess.TimeoutExpired:
+            pending_input = None  # already sent
+            cancelled = cancel_event is not None and cancel_event.is_set()
+            if cancelled or (deadline is not None and _monotonic() > deadline):
+                process.kill()
+                stdout, _ = process.communicate()
+                return {'result': None, 'output': stdout or '', 'timed_out': not cancelled,
+                        'error': "cancelled" if cancelled else None}
+    
+    for line in reversed(stdout.splitlines()):
+        if line.startswith('__RESULT__'):
+            payload = json.loads(line[len('__RESULT__'):])
+            return {'result': payload['result'], 'output': payload['output'], 'timed_out': False, 'error': None}
+    return {'result': None, 'output': stdout, 'timed_out': False,
+            'error': stderr.strip() or f"exit code {process.returncode}"}
+
+def constraint_test_failed(report: Dict[str, Any]) -> Optional[bool]:
+    """
+    Interpret a run_constraints_test report: True if infeasible, False if
+    feasible, None if the test timed out or crashed.
+    """
+    if report['timed_out'] or report['error']:
+        return None
+    return (not report['result']) or ('❌' in (report['output'] or ''))
+
+def isolate_conflicting_constraints(hard_df: pd.DataFrame, test_start_date, test_end_date, employees_file,
+                                    shifts_file, historical_file_path, max_test_time,
+                                    max_workers: Optional[int] = None, progress_callback=None,
+                                    cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """
+    Find a small conflicting subset of hard constraint rows.
+    
+    Parallel chunked deletion filter: the rows are split into chunks and the
+    set without each chunk is tested concurrently. Chunks whose removal keeps
+    the set infeasible are dropped (all of them at once when a combined test
+    confirms it). When no chunk can be dropped, the chunks are halved, down
+    to single rows. Tests that time out count as "needed", so the result is
+    always a confirmed conflict, if not necessarily a minimal one.
+    
+    Args:
+        hard_df: Hard constraints to search
+        test_start_date, test_end_date: Test window
+        employees_file, shifts_file, historical_file_path: Other test inputs
+        max_test_time: Time limit per sub-solve in seconds
+        max_workers: Parallel sub-solves (default: CPU count)
+        progress_callback: Called with (tests run, rows remaining)
+        cancel_event: Stops the search and kills running sub-solves when set
+        
+    Returns:
+        Dict with status ('feasible', 'base_infeasible', 'isolated',
+        'undecided' or 'cancelled'), rows (index labels of hard_df) and
+        tests (count)
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    max_workers = max_workers or os.cpu_count() or 1
+    work_dir = os.path.join(CONFLICT_ISOLATION_DIR, uuid.uuid4().hex)
+    os.makedirs(work_dir, exist_ok=True)
+    state = {'tests': 0, 'lock': threading.Lock()}
+    # Candidate rows stay set-valued; each subset is expanded like a solver input
+    expand = not core_supports_set_valued_rows()
+    
+    def cancelled():
+        return cancel_event is not None and cancel_event.is_set()
+    
+    def is_infeasible(rows):
+        if cancelled():
+            return None
+        subset_path = os.path.join(work_dir, f"subset_{uuid.uuid4().hex}.xlsx")
+        subset_df = hard_df.loc[list(rows)]
+        if expand:
+            subset_df = expand_set_valued_constraints(subset_df)
+        subset_df.to_excel(subset_path, index=False)
+        try:
+            report = _run_core_function_subprocess(
+                'core.main', 'run_constraints_test',
+                args=(test_start_date, test_end_date, employees_file, shifts_file, subset_path, historical_file_path),
+                optional_kwargs={'max_time': max_test_time, 'time_limit': max_test_time,
+                                 'max_test_time': max_test_time},
+                timeout=max_test_time + CORE_PROCESS_STARTUP_GRACE,
+                cancel_event=cancel_event
+            )
+        finally:
+            try:
+                os.remove(subset_path)
+            except OSError:
+                pass
+        with state['lock']:
+            state['tests'] += 1
+        return constraint_test_failed(report)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            remaining = list(hard_df.index)
+            full, empty = pool.map(is_infeasible, [remaining, []])
+            if cancelled():
+                return {'status': 'cancelled', 'rows': remaining, 'tests': state['tests']}
+            if full is False:
+                return {'status': 'feasible', 'rows': [], 'tests': state['tests']}
+            if full is None:
+                return {'status': 'undecided', 'rows': remaining, 'tests': state['tests']}
+            if empty:
+                return {'status': 'base_infeasible', 'rows': [], 'tests': state['tests']}
+            
+            chunk_count = min(max_workers, len(remaining))
+            while remaining:
+                chunk_size = max(1, -(-len(remaining) // chunk_count))
+                chunks = [remaining[i:i + chunk_size] for i in range(0, len(remaining), chunk_size)]
+                candidates = [[row for row in remaining if row not in chunk_rows]
+                              for chunk_rows in map(set, chunks)]
+                results = list(pool.map(is_infeasible, candidates))
+                if cancelled():
+                    return {'status': 'cancelled', 'rows': remaining, 'tests': state['tests']}
+                removable = [chunk for chunk, infeasible in zip(chunks, results) if infeasible]
+                
+                if removable:
+                    dropped = set(removable[0])
+                    if len(removable) > 1:
+                        combined = set(row for chunk in removable for row in chunk)
+                        if is_infeasible([row for row in remaining if row not in combined]):
+                            dropped = combined
+                    remaining = [row for row in remaining if row not in dropped]
+                    chunk_count = min(chunk_count, max(1, len(remaining)))
+                elif chunk_size == 1:
+                    break  # every single row is needed
+                else:
+                    chunk_count = min(len(remaining), chunk_count * 2)
+                
+                if progress_callback:
+                    progress_callback(state['tests'], len(remaining))
+            
+            return {'status': 'isolated', 'rows': remaining, 'tests': state['tests']}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+@st.cache_resource
+def _get_conflict_isolation_runs():
+    """Process-wide {run id: isolation run state}; a run outlives the script run that started it."""
+    return {}
+
+def start_conflict_isolation(hard_df: pd.DataFrame, source_files: List[str], *args) -> str:
+    """
+    Run isolate_conflicting_constraints on a background thread.
+    
+    Args:
+        hard_df: Hard constraints to search
+        source_files: Constraint files the rows of hard_df came from
+        *args: The remaining isolate_conflicting_constraints arguments
+        
+    Returns:
+        Id of the run in _get_conflict_isolation_runs()
+    """
+    runs = _get_conflict_isolation_runs()
+    finished = [run_id for run_id, run in runs.items() if run['status'] != 'running']
+    for run_id in finished[:max(0, len(finished) - CONFLICT_ISOLATION_KEEP_RUNS)]:
+        runs.pop(run_id, None)
+    
+    run_id = uuid.uuid4().hex
+    run = {'status': 'running', 'tests': 0, 'rows_left': len(hard_df), 'total': len(hard_df),
+           'outcome': None, 'error': None, 'cancel': threading.Event(), 'hard_df': hard_df,
+           'files': [os.path.abspath(path) for path in source_files]}
+    
+    def on_progress(tests, rows_left):
+        run['tests'], run['rows_left'] = tests, rows_left
+    
+    def work():
+        try:
+            run['outcome'] = isolate_conflicting_constraints(hard_df, *args, progress_callback=on_progress,
+                                                             cancel_event=run['cancel'])
+            run['status'] = 'cancelled' if run['outcome']['status'] == 'cancelled' else 'finished'
+        except Exception as e:
+            run['error'] = f"{type(e).__name__}: {e}"
+            run['status'] = 'failed'
+    
+    runs[run_id] = run
+    threading.Thread(target=work, daemon=True).start()
+    return run_id
+
+def show_conflict_isolation_ui(lang, test_start_date, test_end_date, max_test_time, historical_file_path,
+                               merged_file_paths=None):
+    """Display the isolation button and progress, and store the conflicting rows for the hard constraints editor."""
+    runs = _get_conflict_isolation_runs()
+    run_id = st.session_state.get('conflict_isolation_run')
+    run = runs.get(run_id)
+    
+    if (run is None or run['status'] != 'running') and st.button(
+            "🔬 " + ("Find modstridende begrænsninger" if lang == 'da' else "Isolate conflicting constraints"),
+            help="Finder automatisk en lille mængde hårde begrænsninger, der tilsammen er umulige" if lang == 'da'
+                 else "Automatically finds a small set of hard constraints that are infeasible together"):
+        # Use merged constraints if available, like the constraint test
+        hard_constraints_file = None
+        source_files = []
+        if merged_file_paths:
+            hard_constraints_file = create_merged_constraint_files(merged_file_paths, lang).get('hard_constraints')
+            source_files = [path for path in (merged_file_paths.get('hard_primary'),
+                                              merged_file_paths.get('hard_additional')) if path]
+        if not hard_constraints_file:
+            hard_constraints_file = get_file_paths()['hard_constraints']
+            source_files = [hard_constraints_file]
+        
+        hard_df = load_constraints(hard_constraints_file)
+        if hard_df.empty:
+            st.info("Ingen hårde begrænsninger at teste" if lang == 'da' else "No hard constraints to test")
+            return
+        
+        file_paths = get_file_paths()
+        st.session_state.conflict_isolation_run = start_conflict_isolation(
+            hard_df, source_files, test_start_date, test_end_date,
+            solver_input_path(file_paths['employees']), solver_input_path(file_paths['shifts']),
+            historical_file_path, max_test_time
+        )
+        st.rerun()
+    
+    if run is None:
+        return
+    
+    def isolation_panel():
+        if run['status'] == 'running':
+            total = run['total']
+            st.progress(int(100 * (1 - run['rows_left'] / total)) if total else 100)
+            st.text(f"{run['tests']} tests, {run['rows_left']} rækker tilbage" if lang == 'da'
+                    else f"{run['tests']} tests, {run['rows_left']} rows left")
+            if st.button("⏹️ " + ("Annuller isolering" if lang == 'da' else "Cancel isolation"),
+                         key=f"cancel_isolation_{run_id}", disabled=run['cancel'].is_set()):
+                run['cancel'].set()
+            return
+        
+        if st.session_state.get('_conflict_isolation_polling') == run_id:
+            # Leave fragment polling and redraw the full page once
+            st.session_state._conflict_isolation_polling = None
+            st.rerun()
+        render_conflict_isolation_result(run, run_id, lang)
+    
+    if run['status'] == 'running':
+        st.session_state._conflict_isolation_polling = run_id
+        st.fragment(isolation_panel, run_every=1.0)()
+    else:
+        isolation_panel()
+
+def render_conflict_isolation_result(run, run_id, lang):
+    """Show a finished isolation run; an isolated conflict is handed to the editor once per run."""
+    outcome = run['outcome']
+    if run['status'] == 'failed':
+        st.error(f"❌ {run['error']}")
+    elif run['status'] == 'cancelled':
+        st.info("Isolering annulleret" if lang == 'da' else "Isolation cancelled")
+    elif outcome['status'] == 'feasible':
+        st.success("✅ " + ("De hårde begrænsninger er ikke i konflikt" if lang == 'da' else "The hard constraints are not in conflict"))
+        if st.session_state.get('conflict_isolation_applied') != run_id:
+            st.session_state.conflict_isolation_applied = run_id
+            st.session_state.pop('conflicting_hard_constraints', None)
+    elif outcome['status'] == 'base_infeasible':
+        st.error("❌ " + ("Modellen er umulig selv uden hårde begrænsninger (tjek medarbejdere/vagter)" if lang == 'da'
+                          else "The model is infeasible even without hard constraints (check employees/shifts)"))
+    elif outcome['status'] == 'undecided':
+        st.warning("⚠️ " + ("Testen nåede ikke en afgørelse inden for tidsgrænsen" if lang == 'da'
+                            else "The test did not reach a decision within the time limit"))
+    else:
+        conflict_df = run['hard_df'].loc[outcome['rows']]
+        if st.session_state.get('conflict_isolation_applied') != run_id:
+            st.session_state.conflict_isolation_applied = run_id
+            st.session_state.conflicting_hard_constraints = {
+                'files': run['files'],
+                'keys': set(constraint_row_keys(conflict_df).values())
+            }
+        st.error(f"❌ {len(outcome['rows'])} modstridende rækker fundet ({outcome['tests']} tests)" if lang == 'da'
+                 else f"❌ {len(outcome['rows'])} conflicting rows found ({outcome['tests']} tests)")
+        st.dataframe(conflict_df, width='stretch')
+
+# =============================================================================
+# CONSTRAINT TEST REPORT
+# run_constraints_test results as one table: constraint, status, duration_s,
+# violated (entities) and message. Cores that accept a report argument return
+# the rows directly; otherwise the printed output is captured once and parsed.
+# =============================================================================
+
+CONSTRAINT_REPORT_COLUMNS = ['constraint', 'status', 'duration_s', 'violated', 'message']
+CONSTRAINT_REPORT_PAGE_SIZE = 200
+
+def _normalize_report_rows(rows) -> pd.DataFrame:
+    """Structured rows from the core (list of dicts or {'constraints': [...]}) as a report frame."""
+    if isinstance(rows, dict):
+        rows = rows.get('constraints', rows.get('results', []))
+    report = pd.DataFrame(list(rows or []))
+    renames = {'name': 'constraint', 'constraint_type': 'constraint', 'elapsed': 'duration_s',
+               'duration': 'duration_s', 'time': 'duration_s', 'entities': 'violated', 'violations': 'violated'}
+    report = report.rename(columns={key: value for key, value in renames.items()
+                                    if key in report.columns and value not in report.columns})
+    for column in CONSTRAINT_REPORT_COLUMNS:
+        if column not in report.columns:
+            report[column] = None
+    report['status'] = report['status'].astype(str).str.lower().replace({'true': 'passed', 'false': 'failed'})
+    report['violated'] = report['violated'].map(
+        lambda value: ', '.join(map(str, value)) if isinstance(value, (list, tuple, set)) else value)
+    return report[CONSTRAINT_REPORT_COLUMNS]
+
+def parse_constraint_test_output(output: str) -> pd.DataFrame:
+    """
+    Parse captured run_constraints_test output into a report frame in one pass.
+    
+    Lines with ❌ are failed, lines with ✅ passed, everything else info
+    (blank lines and "Loaded ..." lines are dropped). A leading
+    "<constraint>:" becomes the constraint name, "(1.2s)" the duration.
+    """
+    import re
+    
+    lines = pd.Series(output.splitlines(), dtype=object).str.strip()
+    lines = lines[(lines != '') & ~lines.str.startswith('Loaded')]
+    if lines.empty:
+        return pd.DataFrame(columns=CONSTRAINT_REPORT_COLUMNS)
+    
+    status = pd.Series('info', index=lines.index)
+    status[lines.str.contains('✅', regex=False)] = 'passed'
+    status[lines.str.contains('❌', regex=False)] = 'failed'
+    
+    text = lines.str.replace('❌', '', regex=False).str.replace('✅', '', regex=False).str.strip()
+    constraint = text.str.extract(r'^([A-Za-z0-9_ .\-]+?):\s', expand=False)
+    duration = pd.to_numeric(text.str.extract(r'\((\d+(?:\.\d+)?)\s*s\)', expand=False), errors='coerce')
+    violated = text.str.extract(r'(?:violat\w*|entities)\s*[:=]\s*(.+)$', flags=re.IGNORECASE, expand=False)
+    
+    return pd.DataFrame({
+        'constraint': constraint,
+        'status': status,
+        'duration_s': duration,
+        'violated': violated,
+        'message': text
+    }).reset_index(drop=True)
+
+def run_constraints_test_report(test_start_date, test_end_date, employees_file, shifts_file,
+                                hard_constraints_file, historical_file_path, max_test_time=None) -> Dict[str, Any]:
+    """
+    Run run_constraints_test and return a report instead of printed lines.
+    
+    Returns:
+        Dict with result (the core's return value), report (DataFrame with
+        CONSTRAINT_REPORT_COLUMNS), elapsed (seconds) and source
+        ('structured' or 'parsed')
+    """
+    import inspect
+    import io
+    import time
+    from contextlib import redirect_stdout
+    
+    # The core reads workbooks, so pending journal rows must be in them and
+    # project datasets are exported
+    flush_constraint_journals(hard_constraints_file)
+    employees_file, shifts_file, hard_constraints_file = (
+        solver_input_path(path) for path in (employees_file, shifts_file, hard_constraints_file)
+    )
+    hard_constraints_file = constraints_input_for_core(hard_constraints_file)
+    
+    try:
+        parameters = inspect.signature(run_constraints_test).parameters
+    except (TypeError, ValueError):
+        parameters = {}
+    optional = {}
+    for name in ('max_time', 'time_limit', 'max_test_time'):
+        if name in parameters and max_test_time is not None:
+            optional[name] = max_test_time
+    structured = 'report' in parameters
+    if structured:
+        optional['report'] = True
+    
+    started = time.monotonic()
+    captured = io.StringIO()
+    with redirect_stdout(captured):
+        result = run_constraints_test(test_start_date, test_end_date, employees_file, shifts_file,
+                                      hard_constraints_file, historical_file_path, **optional)
+    elapsed = time.monotonic() - started
+    
+    if structured and isinstance(result, (list, dict)):
+        report = _normalize_report_rows(result)
+        passed = not (report['status'] == 'failed').any()
+        return {'result': passed, 'report': report, 'elapsed': elapsed, 'source': 'structured'}
+    
+    return {'result': result, 'report': parse_constraint_test_output(captured.getvalue()),
+            'elapsed': elapsed, 'source': 'parsed'}
+
+def show_constraint_test_report(test_report, lang):
+    """Render a constraint test report as one filterable, paged table."""
+    report = test_report['report']
+    
+    st.subheader("🔍 " + ("Test Resultater:" if lang == 'da' else "Test Results:"))
+    col1, col2, col3 = st.columns(3)
+    col1.metric("✅ " + ("Bestået" if lang == 'da' else "Passed"), int((report['status'] == 'passed').sum()))
+    col2.metric("❌ " + ("Fejlet" if lang == 'da' else "Failed"), int((report['status'] == 'failed').sum()))
+    col3.metric("⏱️ " + ("Tid" if lang == 'da' else "Time"), f"{test_report['elapsed']:.1f}s")
+    
+    if report.empty:
+        st.info("Testen gav intet output" if lang == 'da' else "The test produced no output")
+        return
+    
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        statuses = sorted(report['status'].dropna().unique())
+        selected = st.multiselect("Status", statuses,
+                                  default=[status for status in statuses if status != 'info'] or statuses,
+                                  key="constraint_report_status")
+    with col2:
+        search = st.text_input("Søg" if lang == 'da' else "Search", key="constraint_report_search")
+    
+    filtered = report[report['status'].isin(selected)]
+    if search:
+        haystack = filtered[['constraint', 'message', 'violated']].astype(str).agg(' '.join, axis=1)
+        filtered = filtered[haystack.str.contains(search, case=False, regex=False)]
+    
+    pages = max(1, -(-len(filtered) // CONSTRAINT_REPORT_PAGE_SIZE))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Side (af {pages})" if lang == 'da' else f"Page (of {pages})",
+                               min_value=1, max_value=pages, value=1, key="constraint_report_page")
+    start = (page - 1) * CONSTRAINT_REPORT_PAGE_SIZE
+    st.dataframe(filtered.iloc[start:start + CONSTRAINT_REPORT_PAGE_SIZE], width='stretch', hide_index=True)
+    st.caption(f"{len(filtered)} af {len(report)} rækker" if lang == 'da' else f"{len(filtered)} of {len(report)} rows")
+
+def run_constraint_testing_simple(test_start_date, test_end_date, max_test_time, historical_file_path, lang, test_hard_constraints=None):
+    """Run the constraint test and keep its report in session state for show_constraint_test_report."""
+    
+    # Get file paths
+    file_paths = get_file_paths()
+    
+    # Use provided test_hard_constraints if available, otherwise fall back to default
+    hard_constraints_file = test_hard_constraints if test_hard_constraints else file_paths['hard_constraints']
+    
+    # Show a spinner while running
+    with st.spinner("Tester begrænsninger..." if lang == 'da' else "Testing constraints..."):
+        try:
+            test_report = run_constraints_test_report(
+                test_start_date,
+                test_end_date,
+                file_paths['employees'],
+                file_paths['shifts'],
+                hard_constraints_file,  # Use the selected hard constraints file
+                historical_file_path,
+                max_test_time=max_test_time
+            )
+            test_report['merged'] = bool(test_hard_constraints and test_hard_constraints != file_paths['hard_constraints'])
+            st.session_state.constraint_test_report = test_report
                 
         except Exception as e:
+            st.session_state.pop('constraint_test_report', None)
             st.error(f"Fejl under test: {e}" if lang == 'da' else f"Error during testing: {e}")
             
             # Show traceback for debugging
@@ -4224,6 +6691,25 @@ def run_constraint_testing_simple(test_start_date, test_end_date, max_test_time,
             with st.expander("Debug Information"):
                 st.text(traceback.format_exc())
 
+def show_constraint_test_result(lang):
+    """Show the last constraint test report (kept across reruns so filters and paging work)."""
+    test_report = st.session_state.get('constraint_test_report')
+    if not test_report:
+        return
+    
+    show_constraint_test_report(test_report, lang)
+    
+    if test_report['result']:
+        st.success("🎉 " + ("Test fuldført succesfuldt!" if lang == 'da' else "Testing completed successfully!"))
+        
+        # Show which constraints file was used
+        if test_report['merged']:
+            st.info("ℹ️ " + ("Brugte sammenføjede begrænsninger" if lang == 'da' else "Used merged constraints"))
+        else:
+            st.info("ℹ️ " + ("Brugte standard begrænsninger" if lang == 'da' else "Used default constraints"))
+    else:
+        st.error("❌ " + ("Test fejlede!" if lang == 'da' else "Testing failed!"))
+
 def show_run_model_tab(lang):
     """Display the enhanced model running interface with constraint file merging capability."""
     import os
@@ -4287,12 +6773,16 @@ def show_run_model_tab(lang):
         upload_method = st.radio(
             "Vælg indlæsningsmetode:" if lang == 'da' else "Choose upload method:",
             ["Upload fil" if lang == 'da' else "Upload file", 
-             "Angiv sti" if lang == 'da' else "Specify path"],
+             "Angiv sti" if lang == 'da' else "Specify path",
+             "Seneste uger fra historik" if lang == 'da' else "Last weeks from history store"],
             horizontal=True,
             key="historical_upload_method"
         )
         
-        if upload_method == ("Upload fil" if lang == 'da' else "Upload file"):
+        if upload_method == ("Seneste uger fra historik" if lang == 'da' else "Last weeks from history store"):
+            historical_file_path = show_history_store_source(lang)
+        
+        elif upload_method == ("Upload fil" if lang == 'da' else "Upload file"):
             # File uploader
             uploaded_file = st.file_uploader(
                 "Vælg Excel fil med historisk vagtplan" if lang == 'da' else "Choose Excel file with historical schedule",
@@ -4310,38 +6800,26 @@ def show_run_model_tab(lang):
                 
                 st.success("✅ " + ("Fil uploadet succesfuldt" if lang == 'da' else "File uploaded successfully"))
 
-                # Preview the file
+                # Preview the file (header and first rows only)
                 try:
-                    preview_df = pd.read_excel(historical_file_path)
+                    preview_df, total_rows = probe_schedule_workbook(historical_file_path)
                     st.write("**" + ("Forhåndsvisning af fil:" if lang == 'da' else "File preview:") + "**")
-                    st.dataframe(preview_df.head(), width='stretch')
+                    st.dataframe(preview_df, width='stretch')
                     
                     # Extract some basic info
-                    num_employees = len(preview_df)
-                    date_columns = [col for col in preview_df.columns[1:] 
-                                  if col != preview_df.columns[0]]
-                    
-                    if date_columns:
-                        try:
-                            start_date = pd.to_datetime(date_columns[0]).date()
-                            end_date = pd.to_datetime(date_columns[-1]).date()
-                            historical_info = {
-                                'num_employees': num_employees,
-                                'start_date': start_date,
-                                'end_date': end_date,
-                                'num_days': len(date_columns)
-                            }
-                            
+                    try:
+                        historical_info = describe_historical_workbook(preview_df, total_rows)
+                        if historical_info:
                             st.info(
-                                f"**Historisk data:** {num_employees} medarbejdere, "
-                                f"{len(date_columns)} dage ({start_date} til {end_date})"
+                                f"**Historisk data:** {historical_info['num_employees']} medarbejdere, "
+                                f"{historical_info['num_days']} dage ({historical_info['start_date']} til {historical_info['end_date']})"
                                 if lang == 'da' else
-                                f"**Historical data:** {num_employees} employees, "
-                                f"{len(date_columns)} days ({start_date} to {end_date})"
+                                f"**Historical data:** {historical_info['num_employees']} employees, "
+                                f"{historical_info['num_days']} days ({historical_info['start_date']} to {historical_info['end_date']})"
                             )
-                        except:
-                            st.warning("Kunne ikke parse datokolonner" if lang == 'da' 
-                                     else "Could not parse date columns")
+                    except:
+                        st.warning("Kunne ikke parse datokolonner" if lang == 'da' 
+                                 else "Could not parse date columns")
                     
                 except Exception as e:
                     st.error(f"Fejl ved læsning af fil: {e}" if lang == 'da' 
@@ -4361,11 +6839,15 @@ def show_run_model_tab(lang):
             if historical_file_path and os.path.exists(historical_file_path):
                 st.success("✅ " + ("Fil fundet" if lang == 'da' else "File found"))
                 
-                # Preview the file
+                # Preview the file (header and first rows only)
                 try:
-                    preview_df = pd.read_excel(historical_file_path)
+                    preview_df, total_rows = probe_schedule_workbook(historical_file_path)
+                    try:
+                        historical_info = describe_historical_workbook(preview_df, total_rows)
+                    except (ValueError, TypeError):
+                        historical_info = None
                     with st.expander("Vis forhåndsvisning" if lang == 'da' else "Show preview"):
-                        st.dataframe(preview_df.head(), width='stretch')
+                        st.dataframe(preview_df, width='stretch')
                 except Exception as e:
                     st.warning(f"Kunne ikke læse fil: {e}" if lang == 'da' 
                              else f"Could not read file: {e}")
@@ -4458,6 +6940,16 @@ def show_run_model_tab(lang):
                     lang,
                     test_hard_constraints  # Pass the merged constraints file
                 )
+            show_constraint_test_result(lang)
+            
+            show_conflict_isolation_ui(
+                lang,
+                test_start_date,
+                test_end_date,
+                max_test_time,
+                historical_file_path if use_historical else None,
+                merged_file_paths
+            )
 
     # Show information about date range impact when historical data is used
     if use_historical and historical_info:
@@ -4523,6 +7015,8 @@ def show_run_model_tab(lang):
         help="Maksimal tid i sekunder for modellen at køre" if lang == 'da' else "Maximum time in seconds for the model to run"
     )
     
+    stopping = show_stopping_policy_ui(lang)
+    
     # ENHANCED: Data Files Section - now simplified when using constraint merging
     st.subheader("" + get_text('data_files', lang))
     
@@ -4627,13 +7121,14 @@ def show_run_model_tab(lang):
 
                     # Show file preview
                     try:
-                        preview_df = pd.read_excel(temp_path)
+                        preview_df, total_rows = probe_schedule_workbook(temp_path)
                         st.write("**" + ("Forhåndsvisning:" if lang == 'da' else "Preview:") + "**")
-                        st.dataframe(preview_df.head(), width='stretch')
+                        st.dataframe(preview_df, width='stretch')
                         
                         # Show basic info
-                        st.info(f"📊 {len(preview_df)} rækker, {len(preview_df.columns)} kolonner" if lang == 'da' 
-                               else f"📊 {len(preview_df)} rows, {len(preview_df.columns)} columns")
+                        num_rows = total_rows if total_rows is not None else f"{len(preview_df)}+"
+                        st.info(f"📊 {num_rows} rækker, {len(preview_df.columns)} kolonner" if lang == 'da' 
+                               else f"📊 {num_rows} rows, {len(preview_df.columns)} columns")
                         
                     except Exception as e:
                         st.warning(f"Kunne ikke forhåndsvise fil: {e}" if lang == 'da' 
@@ -4656,16 +7151,17 @@ def show_run_model_tab(lang):
                 final_file_paths[config['key']] = file_path
                 
                 # Validate file path
-                if file_path and os.path.exists(file_path):
+                if file_path and dataset_exists(file_path):
                     st.success("✅ " + ("Fil fundet" if lang == 'da' else "File found"))
                     
                     # Show file preview
                     try:
-                        preview_df = pd.read_excel(file_path)
+                        preview_df, total_rows = probe_schedule_workbook(file_path)
+                        num_rows = total_rows if total_rows is not None else f"{len(preview_df)}+"
                         with st.expander("Vis forhåndsvisning" if lang == 'da' else "Show preview"):
-                            st.dataframe(preview_df.head(), width='stretch')
-                            st.info(f"📊 {len(preview_df)} rækker, {len(preview_df.columns)} kolonner" if lang == 'da' 
-                                   else f"📊 {len(preview_df)} rows, {len(preview_df.columns)} columns")
+                            st.dataframe(preview_df, width='stretch')
+                            st.info(f"📊 {num_rows} rækker, {len(preview_df.columns)} kolonner" if lang == 'da' 
+                                   else f"📊 {num_rows} rows, {len(preview_df.columns)} columns")
                     except Exception as e:
                         st.warning(f"Kunne ikke læse fil: {e}" if lang == 'da' 
                                  else f"Could not read file: {e}")
@@ -4716,11 +7212,26 @@ def show_run_model_tab(lang):
                 elif file_path in st.session_state.uploaded_data_files.values():
                     st.write(f"• **{label}:** 📤 Uploaded file")
                 else:
-                    file_status = "✅ Found" if os.path.exists(file_path) else "❌ Not found"
+                    file_status = "✅ Found" if dataset_exists(file_path) else "❌ Not found"
                     st.write(f"• **{label}:** {file_path} ({file_status})")
     
+    # Optional warm start from a previous schedule
+    warm_start_file = None
+    if all(dataset_exists(final_file_paths[key]) for key in ('employees', 'shifts')):
+        warm_start_file = show_warm_start_ui(lang, start_date, end_date,
+                                             final_file_paths['employees'], final_file_paths['shifts'])
+    
+    # Cheap feasibility checks before spending solver time
+    if all(dataset_exists(final_file_paths[key]) for key in ('employees', 'shifts', 'hard_constraints')):
+        show_presolve_analyzer(lang, start_date, end_date, final_file_paths)
+    
+    # Optional change-aware run against the last successful run
+    incremental = None
+    if all(dataset_exists(final_file_paths[key]) for key in RUN_INPUT_KINDS):
+        incremental = show_incremental_ui(lang, start_date, end_date, final_file_paths)
+    
     # Run button (only enabled if date range is valid and all files exist)
-    all_files_exist = all(os.path.exists(final_file_paths[key]) for key in final_file_paths)
+    all_files_exist = all(dataset_exists(final_file_paths[key]) for key in final_file_paths)
     
     run_button_text = get_text('run_model', lang)
     if use_historical:
@@ -4731,6 +7242,15 @@ def show_run_model_tab(lang):
     if not all_files_exist:
         st.error("❌ " + ("Nogle filer eksisterer ikke" if lang == 'da' else "Some files do not exist"))
     
+    use_worker = st.checkbox(
+        "Hold solveren varm mellem kørsler" if lang == 'da' else "Keep the solver warm between runs",
+        value=solver_worker_supported(),
+        disabled=not solver_worker_supported(),
+        key="use_solver_worker",
+        help="Genbruger en baggrundsproces med indlæste moduler og data, så kørsler starter med det samme" if lang == 'da'
+             else "Reuses a background process with modules and data already loaded, so runs start immediately"
+    )
+    
     if st.button(run_button_text, type="primary", disabled=not (is_valid and all_files_exist)):
         if is_valid and all_files_exist:
             holidays = load_holidays_from_json("holidays.json")
@@ -4745,18 +7265,66 @@ def show_run_model_tab(lang):
                 final_file_paths['soft_constraints'],
                 historical_file_path if use_historical else None,
                 lang,
-                holidays=holidays
+                holidays=holidays,
+                warm_start_file=warm_start_file,
+                use_worker=use_worker,
+                stopping=stopping,
+                incremental=incremental
             )
         elif not is_valid:
             st.error(get_text('invalid_date_range', lang))
         else:
             st.error("❌ " + ("Alle filer skal eksistere før kørsel" if lang == 'da' else "All files must exist before running"))
+    
+    # Progress and result of the current background run (survives reruns)
+    show_solver_job_panel(lang)
+    
+    st.markdown("---")
+    show_scenario_batch_ui(lang, start_date, end_date, max_time, final_file_paths,
+                           historical_file_path if use_historical else None, stopping=stopping)
 
 # =============================================================================
 # TOOLS TAB IMPLEMENTATION
 # Add this to your UI.py file
 # =============================================================================
 
+def map_nicknames_to_ids(converted_df: pd.DataFrame, employees_df: pd.DataFrame):
+    """
+    Replace employee nicknames by IDs in every column but the first.
+    
+    The date columns are stripped once and mapped with a single dictionary
+    lookup; cells without a matching nickname are left unchanged.
+    
+    Args:
+        converted_df: Output of convert_schedule_format
+        employees_df: Employees with nickname and ID columns
+        
+    Returns:
+        Tuple of (mapped DataFrame, number of replacements,
+        dict column -> sorted list of unmatched non-empty values)
+    """
+    if 'nickname' not in employees_df.columns or 'ID' not in employees_df.columns:
+        return converted_df.copy(), 0, {}
+    
+    pairs = employees_df[['nickname', 'ID']].dropna()
+    nickname_to_id = dict(zip(pairs['nickname'].astype(str).str.strip(), pairs['ID'].astype(str).str.strip()))
+    
+    mapped_df = converted_df.copy()
+    date_columns = list(converted_df.columns[1:])
+    if not nickname_to_id or not date_columns:
+        return mapped_df, 0, {}
+    
+    cells = converted_df[date_columns]
+    stripped = cells.astype(str).apply(lambda column: column.str.strip())
+    ids = stripped.apply(lambda column: column.map(nickname_to_id))
+    matched = ids.notna()
+    mapped_df[date_columns] = cells.where(~matched, ids)
+    
+    unmatched_mask = ~matched & cells.notna() & (stripped != '')
+    unmatched = {column: sorted(stripped.loc[unmatched_mask[column], column].unique())
+                 for column in date_columns if unmatched_mask[column].any()}
+    return mapped_df, int(matched.to_numpy().sum()), unmatched
+
 def show_tools_tab(lang):
     """Display the tools interface with schedule converter functionality."""
     st.header("Tools" if lang == 'en' else "Værktøjer")
@@ -4823,29 +7391,29 @@ def show_tools_tab(lang):
                             employees_df = load_employees(employees_file)
                             
                             if not employees_df.empty:
-                                # Create nickname to ID mapping
-                                nickname_to_id = {}
-                                if 'nickname' in employees_df.columns and 'ID' in employees_df.columns:
-                                    for _, row in employees_df.iterrows():
-                                        if pd.notna(row['nickname']) and pd.notna(row['ID']):
-                                            nickname_to_id[str(row['nickname']).strip()] = str(row['ID']).strip()
+                                has_nicknames = ('nickname' in employees_df.columns and 'ID' in employees_df.columns
+                                                 and employees_df[['nickname', 'ID']].dropna().shape[0] > 0)
                                 
-                                if nickname_to_id:
+                                if has_nicknames:
                                     # Replace nicknames with IDs in all columns except the first (employee names)
-                                    modified_df = converted_df.copy()
-                                    date_columns = [col for col in converted_df.columns if col != converted_df.columns[0]]
-                                    
-                                    replacements_made = 0
-                                    for col in date_columns:
-                                        for nickname, emp_id in nickname_to_id.items():
-                                            mask = modified_df[col].astype(str).str.strip() == nickname
-                                            if mask.any():
-                                                modified_df.loc[mask, col] = emp_id
-                                                replacements_made += mask.sum()
+                                    modified_df, replacements_made, unmatched = map_nicknames_to_ids(converted_df, employees_df)
                                     
                                     st.info(f"📝 Made {replacements_made} nickname → ID replacements" if lang == 'en' 
                                            else f"📝 Foretog {replacements_made} kaldenavn → ID erstatninger")
                                     
+                                    if unmatched:
+                                        unmatched_values = sorted({value for values in unmatched.values() for value in values})
+                                        st.warning("⚠️ " + (
+                                            f"{len(unmatched_values)} values without a matching nickname in {len(unmatched)} columns"
+                                            if lang == 'en' else
+                                            f"{len(unmatched_values)} værdier uden matchende kaldenavn i {len(unmatched)} kolonner"
+                                        ))
+                                        with st.expander("Unmatched nicknames" if lang == 'en' else "Kaldenavne uden match"):
+                                            st.dataframe(pd.DataFrame({
+                                                ('Column' if lang == 'en' else 'Kolonne'): [str(column) for column in unmatched],
+                                                ('Values' if lang == 'en' else 'Værdier'): [", ".join(values) for values in unmatched.values()]
+                                            }), hide_index=True, width='stretch')
+                                    
                                     # Preview the changes
                                     st.markdown("**Preview with ID replacements:**")
                                     st.dataframe(modified_df.head())
@@ -4871,6 +7439,16 @@ def show_tools_tab(lang):
                                                 # Save the modified dataframe
                                                 modified_df.to_excel(output_filename, index=False)
                                                 
+                                                # Keep the converted schedule in the historical store
+                                                try:
+                                                    ingest_history_assignments(
+                                                        schedule_frame_to_assignments(modified_df, include_empty=True),
+                                                        f"converter:{os.path.basename(output_filename)}"
+                                                    )
+                                                except Exception as e:
+                                                    st.warning("⚠️ " + ("Could not add the schedule to the history store:" if lang == 'en'
+                                                                       else "Kunne ikke tilføje vagtplanen til historiklageret:") + f" {e}")
+                                                
                                                 st.success(f"✅ " + (f"File saved as: {output_filename}" if lang == 'en' 
                                                                    else f"Fil gemt som: {output_filename}"))
                                                 
@@ -4931,204 +7509,2493 @@ def show_tools_tab(lang):
                         os.unlink(temp_output_path)
                 except:
                     pass  # Ignore cleanup errors
+    
+    st.markdown("---")
+    
+    # Batch Converter Section
+    st.subheader("📚 " + ("Batch Converter" if lang == 'en' else "Batch Konverter"))
+    
+    if st.checkbox(
+        "Use Batch Converter" if lang == 'en' else "Brug Batch Konverter",
+        help="Convert a folder or several uploaded schedules in parallel and merge them into one historical dataset" if lang == 'en'
+             else "Konverter en mappe eller flere uploadede vagtplaner parallelt og saml dem til ét historisk datasæt"
+    ):
+        show_schedule_batch_converter(lang)
+    
+    st.markdown("---")
+    
+    # Project Database Section
+    st.subheader("🗃️ " + ("Project Database" if lang == 'en' else "Projektdatabase"))
+    
+    if st.checkbox(
+        "Manage Project Database" if lang == 'en' else "Administrer Projektdatabase",
+        value=bool(active_project_db()),
+        help="Keep employees, shifts, constraints and holidays in one SQLite file instead of Excel files" if lang == 'en'
+             else "Gem medarbejdere, vagter, begrænsninger og helligdage i én SQLite-fil i stedet for Excel-filer"
+    ):
+        show_project_database_tools(lang)
 
-def run_enhanced_scheduling_model_with_historical(start_date, end_date, max_time, employees_file, shifts_file, 
-                                                hard_constraints_file, soft_constraints_file, historical_file_path, lang, holidays=None):
-    """Run the enhanced scheduling model by calling main.py with real-time progress updates."""
-    import os
-    import tempfile
-    import json
-    import subprocess
-    import time
+# =============================================================================
+# BATCH SCHEDULE CONVERSION
+# Backfill many finished schedules at once: every file is converted by
+# core.schedule_converter in its own worker process, nicknames are mapped to
+# IDs and the results are merged into one historical dataset sorted by date.
+# The merged workbook is exported on request into a per-session folder under
+# ./.ui_cache/schedule_batch/, named by the content of the merged data.
+# =============================================================================
+
+SCHEDULE_FILE_SUFFIXES = ('.xlsx', '.xls')
+SCHEDULE_CONVERSION_TIMEOUT = 300
+SCHEDULE_BATCH_EXPORT_DIR = os.path.join(WORKBOOK_CACHE_DIR, "schedule_batch")
+SCHEDULE_BATCH_EXPORT_MAX_AGE = timedelta(days=1)
+
+def _convert_one_schedule(input_path, output_path) -> Optional[str]:
+    """Convert one schedule in a separate process. Returns an error message or None."""
+    report = _run_core_function_subprocess('core.schedule_converter', 'convert_schedule_format',
+                                           args=(input_path, output_path), timeout=SCHEDULE_CONVERSION_TIMEOUT)
+    if report['timed_out']:
+        return f"conversion timed out after {SCHEDULE_CONVERSION_TIMEOUT} s"
+    if report['error']:
+        return report['error'].splitlines()[-1]
+    if not report['result'] or not os.path.exists(output_path):
+        output_lines = (report['output'] or '').strip().splitlines()
+        return output_lines[-1] if output_lines else "conversion failed"
+    return None
+
+def convert_schedules_batch(sources, employees_df: pd.DataFrame, max_workers: Optional[int] = None,
+                            progress_callback=None) -> Dict[str, Any]:
+    """
+    Convert several finished schedules and merge them into one historical dataset.
     
-    # Create configuration file with all parameters
-    config = {
-        'start_date': start_date.isoformat(),
-        'end_date': end_date.isoformat(),
-        'employees_file': employees_file,
-        'shifts_file': shifts_file,
-        'hard_constraints_file': hard_constraints_file,
-        'soft_constraints_file': soft_constraints_file,
-        'historical_file_path': historical_file_path,
-        'max_time': max_time,
-        'holidays': holidays
-    }
+    Args:
+        sources: List of (display name, file path)
+        employees_df: Employees used for the nickname -> ID mapping
+        max_workers: Concurrent converter processes, defaults to the core count
+        progress_callback: Called with (files done, files total)
+        
+    Returns:
+        Dict with files (one status row per input), assignments (merged long
+        frame with a source column, sorted by date), overlaps (dates covered
+        by more than one file), conflicts (cells with differing shifts) and
+        key (hash of the assignments, None if there are none)
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
     
-    # Write config to temporary file
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-        json.dump(config, f)
-        config_file = f.name
+    work_dir = tempfile.mkdtemp(prefix='schedule_batch_')
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(sources) or 1))
+    file_rows, frames = [], []
     
-    # Create UI elements for progress tracking
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    time_remaining_container = st.empty()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {}
+            for index, (name, path) in enumerate(sources):
+                output_path = os.path.join(work_dir, f"{index:04d}_converted.xlsx")
+                futures[pool.submit(_convert_one_schedule, path, output_path)] = (index, name, output_path)
+            
+            for done, future in enumerate(as_completed(futures), start=1):
+                index, name, output_path = futures[future]
+                row = {'index': index, 'file': name, 'error': None, 'rows': 0, 'first_date': None,
+                       'last_date': None, 'replacements': 0, 'unmatched': 0}
+                try:
+                    error = future.result()
+                    if error:
+                        row['error'] = error
+                    else:
+                        mapped_df, row['replacements'], unmatched = map_nicknames_to_ids(pd.read_excel(output_path), employees_df)
+                        row['unmatched'] = len({value for values in unmatched.values() for value in values})
+                        assignments = schedule_frame_to_assignments(mapped_df, include_empty=True)
+                        if assignments.empty:
+                            row['error'] = "no date columns in converted schedule"
+                        else:
+                            assignments['source'] = name
+                            assignments['file_index'] = index
+                            row['rows'] = len(assignments)
+                            row['first_date'] = assignments['date'].min()
+                            row['last_date'] = assignments['date'].max()
+                            frames.append(assignments)
+                except Exception as e:
+                    row['error'] = str(e)
+                file_rows.append(row)
+                if progress_callback:
+                    progress_callback(done, len(sources))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    files = pd.DataFrame(file_rows).sort_values('index').drop(columns='index').reset_index(drop=True) \
+        if file_rows else pd.DataFrame()
+    if not frames:
+        empty = pd.DataFrame(columns=['employee_id', 'date', 'shift_id', 'source'])
+        return {'files': files, 'assignments': empty, 'overlaps': pd.DataFrame(), 'conflicts': pd.DataFrame(),
+                'key': None}
+    
+    combined = pd.concat(frames, ignore_index=True)
+    
+    # Dates present in more than one file
+    sources_per_date = combined.groupby('date')['source'].agg(lambda names: sorted(set(names)))
+    overlapping = sources_per_date[sources_per_date.map(len) > 1]
+    overlaps = pd.DataFrame({'date': overlapping.index, 'files': overlapping.map(", ".join).values})
+    
+    # Cells whose shift differs between the files covering them
+    shifts_per_cell = combined.groupby(['employee_id', 'date'])['shift_id'].nunique()
+    conflicting_cells = shifts_per_cell[shifts_per_cell > 1].index.to_frame(index=False)
+    conflicts = (combined.merge(conflicting_cells, on=['employee_id', 'date'])
+                 [['employee_id', 'date', 'shift_id', 'source']]
+                 .sort_values(['date', 'employee_id'])
+                 .reset_index(drop=True))
+    
+    # The file listed last wins where files overlap
+    merged = (combined.sort_values(['date', 'file_index'], kind='stable')
+              .drop_duplicates(['employee_id', 'date'], keep='last')
+              .drop(columns='file_index')
+              .sort_values(['date', 'employee_id'])
+              .reset_index(drop=True))
+    key = hashlib.sha256(pd.util.hash_pandas_object(merged.astype(str), index=False).values.tobytes()).hexdigest()[:16]
+    return {'files': files, 'assignments': merged, 'overlaps': overlaps, 'conflicts': conflicts, 'key': key}
+
+def export_schedule_batch(result: Dict[str, Any]) -> str:
+    """
+    Export the merged assignments of a batch to this session's export folder.
     
-    # Container for detailed output (initially hidden)
-    output_container = st.empty()
+    The file is named by result['key'], so an unchanged result is exported
+    once. Other exports of the session and folders of sessions idle for
+    SCHEDULE_BATCH_EXPORT_MAX_AGE are removed.
+    """
+    if 'schedule_batch_session' not in st.session_state:
+        st.session_state.schedule_batch_session = uuid.uuid4().hex
+    session_dir = os.path.join(SCHEDULE_BATCH_EXPORT_DIR, st.session_state.schedule_batch_session)
+    export_path = os.path.join(session_dir, f"historical_schedule_{result['key']}.xlsx")
+    if os.path.exists(export_path):
+        return export_path
+    
+    now = datetime.now().timestamp()
+    for name in os.listdir(SCHEDULE_BATCH_EXPORT_DIR) if os.path.isdir(SCHEDULE_BATCH_EXPORT_DIR) else []:
+        other_dir = os.path.join(SCHEDULE_BATCH_EXPORT_DIR, name)
+        try:
+            if now - os.path.getmtime(other_dir) > SCHEDULE_BATCH_EXPORT_MAX_AGE.total_seconds():
+                shutil.rmtree(other_dir, ignore_errors=True)
+        except OSError:
+            pass
+    shutil.rmtree(session_dir, ignore_errors=True)
+    os.makedirs(session_dir, exist_ok=True)
+    export_history_slice(result['assignments'], export_path + '.tmp.xlsx')
+    os.replace(export_path + '.tmp.xlsx', export_path)
+    return export_path
+
+def _schedule_batch_sources(lang):
+    """Collect the schedules of a batch from uploads or a folder as (display name, path) pairs."""
+    source = st.radio(
+        "Kilde:" if lang == 'da' else "Source:",
+        ["Upload filer" if lang == 'da' else "Upload files",
+         "Mappe" if lang == 'da' else "Folder"],
+        horizontal=True,
+        key="schedule_batch_source"
+    )
     
+    if source == ("Mappe" if lang == 'da' else "Folder"):
+        folder = st.text_input("Sti til mappe" if lang == 'da' else "Folder path", key="schedule_batch_folder")
+        if not folder:
+            return [], []
+        if not os.path.isdir(folder):
+            st.error("❌ " + (f"Mappen findes ikke: {folder}" if lang == 'da' else f"Folder not found: {folder}"))
+            return [], []
+        names = sorted(name for name in os.listdir(folder)
+                       if name.lower().endswith(SCHEDULE_FILE_SUFFIXES) and not name.startswith('~$'))
+        return [(name, os.path.join(folder, name)) for name in names], []
+    
+    uploaded_files = st.file_uploader(
+        "Vælg vagtplan filer" if lang == 'da' else "Choose schedule files",
+        type=['xlsx', 'xls'],
+        accept_multiple_files=True,
+        key="schedule_batch_uploads"
+    ) or []
+    sources, temp_paths = [], []
+    for uploaded_file in uploaded_files:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as tmp_file:
+            tmp_file.write(uploaded_file.getvalue())
+        sources.append((uploaded_file.name, tmp_file.name))
+        temp_paths.append(tmp_file.name)
+    return sources, temp_paths
+
+def show_schedule_batch_converter(lang):
+    """Display the batch converter in the tools tab."""
+    st.markdown("Konverter mange færdige vagtplaner på én gang og saml dem til ét historisk datasæt"
+                if lang == 'da' else
+                "Convert many finished schedules at once and merge them into one historical dataset")
+    
+    sources, temp_paths = _schedule_batch_sources(lang)
     try:
-        # Use Popen for real-time communication
-        from pathlib import Path
-        BASEDIR = Path(__file__).resolve().parent
-        core_main = BASEDIR / "core" / "main.py"
-        process = subprocess.Popen(
-            [sys.executable, "-u", str(core_main), "--config", config_file],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,
-        )
+        if sources:
+            st.caption(f"{len(sources)} filer valgt" if lang == 'da' else f"{len(sources)} files selected")
         
-        detailed_output = []  # Collect all output for final display
-        solver_started = False
-        
-        # Read output line by line in real-time
-        while True:
-            output = process.stdout.readline()
-            if output == '' and process.poll() is not None:
+        if st.button("🔄 " + ("Konverter alle" if lang == 'da' else "Convert all"),
+                     disabled=not sources, key="schedule_batch_convert"):
+            employees_df = load_employees(get_file_paths()['employees'])
+            progress_bar = st.progress(0)
+            
+            def on_progress(done, total):
+                progress_bar.progress(done / total,
+                                      text=f"{done}/{total} " + ("konverteret" if lang == 'da' else "converted"))
+            
+            st.session_state.schedule_batch_result = convert_schedules_batch(
+                sources, employees_df, progress_callback=on_progress
+            )
+    finally:
+        for path in temp_paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+    
+    result = st.session_state.get('schedule_batch_result')
+    if not result:
+        return
+    
+    files = result['files']
+    if not files.empty:
+        failed = files['error'].notna().sum()
+        if failed:
+            st.warning("⚠️ " + (f"{failed} af {len(files)} filer kunne ikke konverteres" if lang == 'da'
+                                else f"{failed} of {len(files)} files could not be converted"))
+        st.dataframe(files, hide_index=True, width='stretch')
+    
+    merged = result['assignments']
+    if merged.empty:
+        return
+    
+    st.info(
+        f"📅 {merged['date'].min()} til {merged['date'].max()}: {merged['employee_id'].nunique()} medarbejdere, "
+        f"{(merged['shift_id'] != '').sum()} vagter"
+        if lang == 'da' else
+        f"📅 {merged['date'].min()} to {merged['date'].max()}: {merged['employee_id'].nunique()} employees, "
+        f"{(merged['shift_id'] != '').sum()} shifts"
+    )
+    
+    if not result['overlaps'].empty:
+        st.warning("⚠️ " + (
+            f"{len(result['overlaps'])} datoer findes i flere filer; den sidst listede fil vinder"
+            if lang == 'da' else
+            f"{len(result['overlaps'])} dates appear in more than one file; the file listed last wins"
+        ))
+        with st.expander("Overlappende datoer" if lang == 'da' else "Overlapping dates"):
+            st.dataframe(result['overlaps'], hide_index=True, width='stretch')
+            if not result['conflicts'].empty:
+                st.markdown("**" + ("Modstridende celler" if lang == 'da' else "Conflicting cells") + "**")
+                st.dataframe(result['conflicts'], hide_index=True, width='stretch')
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.session_state.get('schedule_batch_export', {}).get('key') != result.get('key'):
+            if st.button("📦 " + ("Lav samlet fil" if lang == 'da' else "Build merged file"),
+                         key="schedule_batch_export_button"):
+                st.session_state.schedule_batch_export = {'key': result.get('key'), 'path': export_schedule_batch(result)}
+        export = st.session_state.get('schedule_batch_export')
+        if export and export['key'] == result.get('key') and os.path.exists(export['path']):
+            with open(export['path'], 'rb') as f:
+                st.download_button(
+                    label="📥 " + ("Download samlet fil" if lang == 'da' else "Download merged file"),
+                    data=f.read(),
+                    file_name=f"historical_schedule_{merged['date'].min()}_{merged['date'].max()}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    key="schedule_batch_download"
+                )
+    with col2:
+        if st.button("🗄️ " + ("Tilføj til historiklager" if lang == 'da' else "Add to history store"),
+                     key="schedule_batch_ingest"):
+            written = 0
+            for source_name, part in merged.groupby('source', sort=False):
+                written += ingest_history_assignments(part, f"converter:{source_name}")
+            st.success("✅ " + (f"{written} celler tilføjet" if lang == 'da' else f"{written} cells added"))
+
+# =============================================================================
+# SOLVER PROGRESS CHANNEL
+# core/main.py reports progress as newline-delimited JSON over a local socket.
+# The legacy "PROGRESS:pct:msg[:TIME_REMAINING:s]" stdout lines are still
+# understood, so older core folders keep working.
+# =============================================================================
+
+def parse_progress_event(line):
+    """
+    Parse one NDJSON progress line from the solver into an event dict.
+    
+    Recognized keys: phase, percent (or percentage), message, objective,
+    best_bound, gap, time_remaining and elapsed. Unknown keys are kept.
+    Returns None for blank or malformed lines.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        event = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(event, dict):
+        return None
+    if 'percent' not in event and 'percentage' in event:
+        event['percent'] = event.pop('percentage')
+    return event
+
+def parse_legacy_progress_line(line):
+    """Parse a legacy PROGRESS:percentage:message[:TIME_REMAINING:seconds] stdout line."""
+    parts = line.split(':')
+    if len(parts) < 3:
+        return None
+    try:
+        event = {'percent': int(parts[1]), 'message': parts[2]}
+        if len(parts) >= 5 and parts[3] == 'TIME_REMAINING':
+            event['phase'] = 'solve'
+            event['time_remaining'] = int(parts[4])
+        return event
+    except ValueError:
+        return None
+
+class SolverProgressChannel:
+    """
+    Local TCP endpoint that receives newline-delimited JSON progress events.
+    
+    The solver connects to the address given in the config under
+    'progress_channel' and writes one JSON object per line. Events are put
+    on a queue so the Streamlit script thread never blocks on the solver.
+    """
+    
+    def __init__(self, events: "queue.Queue"):
+        self.events = events
+        self._closed = threading.Event()
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind(('127.0.0.1', 0))
+        self._server.listen(1)
+        self._server.settimeout(0.5)
+        self.host, self.port = self._server.getsockname()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+    
+    def config(self) -> Dict[str, Any]:
+        """Return the channel description written into the solver config."""
+        return {'type': 'tcp', 'host': self.host, 'port': self.port, 'format': 'ndjson'}
+    
+    def _serve(self):
+        """Accept solver connections and forward every parsed line to the event queue."""
+        while not self._closed.is_set():
+            try:
+                conn, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
                 break
-                
-            line = output.strip()
+            
+            with conn:
+                conn.settimeout(None)
+                try:
+                    for line in conn.makefile('r', encoding='utf-8', errors='replace'):
+                        event = parse_progress_event(line)
+                        if event is not None:
+                            event.setdefault('source', 'channel')
+                            self.events.put(event)
+                except OSError:
+                    pass
+    
+    def close(self):
+        """Stop accepting connections."""
+        self._closed.set()
+        try:
+            self._server.close()
+        except OSError:
+            pass
+
+def _drain_solver_stream(stream, lines, events=None, log_path=None):
+    """
+    Read a solver output stream to the end in a background thread.
+    
+    Every line is appended to lines (and to log_path when given). When events
+    is given (stdout), legacy PROGRESS lines and ✅/❌ status lines are also
+    forwarded as events.
+    """
+    log_file = None
+    try:
+        if log_path:
+            log_file = open(log_path, 'a', encoding='utf-8')
+        for raw_line in iter(stream.readline, ''):
+            line = raw_line.strip()
             if not line:
                 continue
-                
-            # Collect all output for detailed view
-            detailed_output.append(line)
-                
+            lines.append(line)
+            if log_file is not None:
+                log_file.write(line + '\n')
+                log_file.flush()
+            
+            if events is None:
+                continue
             if line.startswith('PROGRESS:'):
-                # Parse progress update: PROGRESS:percentage:message[:TIME_REMAINING:seconds]
-                parts = line.split(':')
-                if len(parts) >= 3:
-                    try:
-                        percentage = int(parts[1])
-                        message = parts[2]
-                        
-                        # Update progress bar and status
-                        progress_bar.progress(percentage)
-                        status_text.text(message)
-                        
-                        # Handle time remaining display
-                        if len(parts) >= 5 and parts[3] == 'TIME_REMAINING':
-                            solver_started = True
-                            time_remaining = int(parts[4])
-                            
-                            if time_remaining > 0:
-                                # Format time nicely
-                                minutes = time_remaining // 60
-                                seconds = time_remaining % 60
-                                
-                                if minutes > 0:
-                                    time_text = f"⏱️ {minutes}m {seconds}s remaining"
-                                else:
-                                    time_text = f"⏱️ {seconds}s remaining"
-                                    
-                                time_remaining_container.markdown(f"**{time_text}**")
-                            else:
-                                time_remaining_container.markdown("**⏱️ Finalizing solution...**")
-                                
-                        elif percentage >= 75 and not solver_started:
-                            # We're in solver phase but no specific time info yet
-                            time_remaining_container.markdown("**⏱️ Solver starting...**")
-                        elif percentage >= 95:
-                            # Clear time remaining during output generation
-                            time_remaining_container.empty()
-                            
-                    except (ValueError, IndexError) as e:
-                        # Malformed progress line, just ignore
-                        print(f"Could not parse progress line: {line}")
-                        
+                # An unparsable line is only kept in lines and the log above
+                event = parse_legacy_progress_line(line)
+                if event is not None:
+                    event['source'] = 'stdout'
+                    events.put(event)
             elif line.startswith('✅') or line.startswith('❌'):
-                # Important status messages
-                if line.startswith('✅'):
-                    status_text.text("✅ " + line.split('✅', 1)[1].strip())
-                else:
-                    status_text.text("❌ " + line.split('❌', 1)[1].strip())
+                events.put({'status_message': line, 'source': 'stdout'})
+    except (OSError, ValueError):
+        pass
+    finally:
+        if log_file is not None:
+            log_file.close()
+        try:
+            stream.close()
+        except Exception:
+            pass
+
+def format_time_remaining(seconds):
+    """Format a remaining-time countdown for the progress display."""
+    minutes = seconds // 60
+    seconds = seconds % 60
+    if minutes > 0:
+        return f"⏱️ {minutes}m {seconds}s remaining"
+    return f"⏱️ {seconds}s remaining"
+
+def format_solver_metrics(event):
+    """Format objective, best bound and gap from a progress event, or return '' if absent."""
+    parts = []
+    if event.get('objective') is not None:
+        parts.append(f"Objective: {event['objective']:,.2f}" if isinstance(event['objective'], (int, float))
+                     else f"Objective: {event['objective']}")
+    if event.get('best_bound') is not None:
+        parts.append(f"Bound: {event['best_bound']:,.2f}" if isinstance(event['best_bound'], (int, float))
+                     else f"Bound: {event['best_bound']}")
+    if event.get('gap') is not None:
+        parts.append(f"Gap: {event['gap']:.2%}" if isinstance(event['gap'], (int, float))
+                     else f"Gap: {event['gap']}")
+    return " · ".join(parts)
+
+def render_progress_event(event, progress_bar, status_text, time_remaining_container, metrics_container, state):
+    """Update the progress widgets from one progress event."""
+    if 'status_message' in event:
+        line = event['status_message']
+        if line.startswith('✅'):
+            status_text.text("✅ " + line.split('✅', 1)[1].strip())
+        else:
+            status_text.text("❌ " + line.split('❌', 1)[1].strip())
+        return
+    
+    percentage = event.get('percent')
+    if isinstance(percentage, (int, float)):
+        percentage = max(0, min(100, int(percentage)))
+        progress_bar.progress(percentage)
+    else:
+        percentage = None
+    
+    message = event.get('message')
+    if message:
+        status_text.text(f"[{event['phase']}] {message}" if event.get('phase') and event.get('source') == 'channel'
+                         else message)
+    
+    metrics = format_solver_metrics(event)
+    if metrics:
+        metrics_container.markdown(f"**📈 {metrics}**")
+    
+    # Handle time remaining display
+    time_remaining = event.get('time_remaining')
+    if time_remaining is not None:
+        state['solver_started'] = True
+        if time_remaining > 0:
+            time_remaining_container.markdown(f"**{format_time_remaining(int(time_remaining))}**")
+        else:
+            time_remaining_container.markdown("**⏱️ Finalizing solution...**")
+    elif percentage is not None and percentage >= 75 and not state.get('solver_started'):
+        # We're in solver phase but no specific time info yet
+        time_remaining_container.markdown("**⏱️ Solver starting...**")
+    elif percentage is not None and percentage >= 95:
+        # Clear time remaining during output generation
+        time_remaining_container.empty()
+
+# =============================================================================
+# PERSISTENT SOLVER WORKER
+# solver_worker.py keeps core/main.py and its dependencies imported and forks
+# a child per job, so solving starts without interpreter start-up. Jobs fall
+# back to a plain subprocess when the worker is unavailable (e.g. Windows).
+# =============================================================================
+
+SOLVER_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solver_worker.py")
+SOLVER_WORKER_START_TIMEOUT = 120
+
+def solver_worker_supported() -> bool:
+    """The worker forks per job, which needs a POSIX platform."""
+    return hasattr(os, 'fork') and os.path.exists(SOLVER_WORKER_SCRIPT)
+
+class WorkerProcessHandle:
+    """
+    Popen-like view of a job running in the persistent worker.
+    
+    stdout yields the child's output lines until the worker's exit marker;
+    stderr is written by the child straight to the job's stderr.log.
+    """
+    
+    EXIT_PREFIX = "__EXIT__:"
+    PID_PREFIX = "__PID__:"
+    
+    def __init__(self, sock: socket.socket):
+        import io
         
-        # Get final result
-        return_code = process.poll()
+        self._sock = sock
+        self._reader = sock.makefile('r', encoding='utf-8', errors='replace')
+        self.returncode = None
+        self.stderr = io.StringIO('')
+        
+        first_line = self._reader.readline()
+        if not first_line.startswith(self.PID_PREFIX):
+            sock.close()
+            raise RuntimeError(f"Unexpected worker reply: {first_line.strip()}")
+        self.pid = int(first_line[len(self.PID_PREFIX):])
+    
+    @property
+    def stdout(self):
+        return self
+    
+    def readline(self) -> str:
+        """Next output line; '' once the job has exited."""
+        if self.returncode is not None:
+            return ''
+        line = self._reader.readline()
+        if line.startswith(self.EXIT_PREFIX):
+            self.returncode = int(line[len(self.EXIT_PREFIX):].strip() or 1)
+            return ''
+        if line == '':
+            # Connection dropped without an exit marker: the worker died
+            self.returncode = 1
+        return line
+    
+    def close(self):
+        try:
+            self._reader.close()
+            self._sock.close()
+        except OSError:
+            pass
+    
+    def poll(self):
+        return self.returncode
+    
+    def wait(self, timeout=None):
+        import time
         
-        # Clear time remaining display
-        time_remaining_container.empty()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.returncode is None:
+            if deadline is not None and time.monotonic() > deadline:
+                raise subprocess.TimeoutExpired(f"worker job {self.pid}", timeout)
+            time.sleep(0.1)
+        return self.returncode
+    
+    def _signal(self, signum):
+        try:
+            os.kill(self.pid, signum)
+        except (ProcessLookupError, PermissionError):
+            pass
+    
+    def terminate(self):
+        import signal
+        self._signal(signal.SIGTERM)
+    
+    def kill(self):
+        import signal
+        self._signal(signal.SIGKILL)
+
+class SolverWorkerClient:
+    """
+    Starts and talks to the persistent solver worker.
+    
+    The worker is (re)started lazily: on first use, after it died, or when
+    any .py file in the core folder changed since it preloaded them. It is
+    stopped when the app exits, and exits by itself if the app is killed.
+    """
+    
+    def __init__(self, core_main: str, log_path: str):
+        self.core_main = core_main
+        self.core_dir = os.path.dirname(core_main)
+        self.log_path = log_path
+        self.process = None
+        self.port = None
+        self.signature = None
+        self.lock = threading.Lock()
+        atexit.register(self.stop)
+    
+    def _start(self):
+        self.stop()
+        log_file = open(self.log_path, 'a', encoding='utf-8')
+        self.process = subprocess.Popen(
+            [sys.executable, "-u", SOLVER_WORKER_SCRIPT, "--main", self.core_main,
+             "--parent-pid", str(os.getpid())],
+            stdout=subprocess.PIPE,
+            stderr=log_file,
+            text=True,
+            bufsize=1,
+        )
+        log_file.close()
+        self.signature = _scan_core_modules(self.core_dir)
+        
+        # Wait for the READY:<port> line without blocking forever on a hung preload
+        ready = queue.Queue()
+        
+        def read_ready():
+            for line in iter(self.process.stdout.readline, ''):
+                if line.startswith("READY:"):
+                    ready.put(int(line.strip().split(':', 1)[1]))
+                    return
+            ready.put(None)
+        
+        threading.Thread(target=read_ready, daemon=True).start()
+        try:
+            self.port = ready.get(timeout=SOLVER_WORKER_START_TIMEOUT)
+        except queue.Empty:
+            self.port = None
+        if self.port is None:
+            self.stop()
+            raise RuntimeError("Solver worker did not start")
+    
+    def stop(self):
+        """Terminate the worker process if it is running."""
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+        self.port = None
+    
+    def submit(self, config_file: str, stderr_log: str, cwd: Optional[str] = None) -> WorkerProcessHandle:
+        """Send a job to the worker (run in cwd), starting or restarting it first if needed."""
+        with self.lock:
+            if (self.process is None or self.process.poll() is not None
+                    or self.signature != _scan_core_modules(self.core_dir)):
+                self._start()
+            port = self.port
+        
+        sock = socket.create_connection(('127.0.0.1', port), timeout=10)
+        sock.settimeout(None)
+        request = {'config_file': os.path.abspath(config_file), 'stderr_log': os.path.abspath(stderr_log),
+                   'cwd': os.path.abspath(cwd) if cwd else None}
+        sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        return WorkerProcessHandle(sock)
+
+# =============================================================================
+# SOLVER JOB MANAGER
+# Solver subprocesses are owned by a process-wide manager instead of the
+# script run, so widget interaction or a browser refresh never orphans a
+# running solve. Each job keeps its files under ./.solver_jobs/<job id>/.
+# =============================================================================
+
+SOLVER_JOBS_DIR = "./.solver_jobs"
+SOLVER_JOB_TERMINAL_STATES = ('succeeded', 'failed', 'cancelled', 'lost')
+DEFAULT_SCHEDULE_OUTPUT = "schedule_output.xlsx"
+# Config keys holding file paths; they are made absolute because the core runs in the job folder
+SOLVER_CONFIG_PATH_KEYS = ('employees_file', 'shifts_file', 'hard_constraints_file', 'soft_constraints_file',
+                           'historical_file_path', 'warm_start_file', 'hard_constraints_frame',
+                           'soft_constraints_frame')
+
+def build_solver_config(start_date, end_date, max_time, employees_file, shifts_file,
+                        hard_constraints_file, soft_constraints_file, historical_file_path, holidays=None,
+                        warm_start_file=None, stopping=None, incremental=None):
+    """
+    Build the configuration dict passed to core/main.py via --config.
+    
+    Args:
+        stopping: Optional early termination policy (see normalize_stopping_policy)
+        incremental: Optional change-aware run block (see build_incremental_config)
+        
+    Returns:
+        Config dict; the job manager adds the job specific keys
+        (progress_channel, output_file, stop_file) when the job starts.
+    """
+    return {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'employees_file': solver_input_path(employees_file),
+        'shifts_file': solver_input_path(shifts_file),
+        'hard_constraints_file': solver_input_path(hard_constraints_file),
+        'soft_constraints_file': solver_input_path(soft_constraints_file),
+        'historical_file_path': historical_file_path,
+        'max_time': max_time,
+        'holidays': holidays,
+        'warm_start_file': warm_start_file,
+        'stopping': normalize_stopping_policy(stopping),
+        'incremental': incremental,
+        'set_valued_columns': list(SET_VALUED_COLUMNS),
+        'hard_constraints_frame': merged_constraints_frame(hard_constraints_file),
+        'soft_constraints_frame': merged_constraints_frame(soft_constraints_file)
+    }
+
+def normalize_stopping_policy(policy) -> Optional[Dict[str, Any]]:
+    """
+    Validate an early termination policy for the config.
+    
+    Keys:
+        relative_gap: Stop once (|objective - bound| / |objective|) <= this value
+        stall_seconds: Stop after this many seconds without a new incumbent
+        first_feasible: Stop at the first feasible solution
+        
+    Returns:
+        Policy dict with disabled rules removed, or None if no rule is active
+    """
+    if not policy:
+        return None
+    normalized = {}
+    if policy.get('relative_gap') is not None and float(policy['relative_gap']) > 0:
+        normalized['relative_gap'] = float(policy['relative_gap'])
+    if policy.get('stall_seconds') is not None and float(policy['stall_seconds']) > 0:
+        normalized['stall_seconds'] = float(policy['stall_seconds'])
+    if policy.get('first_feasible'):
+        normalized['first_feasible'] = True
+    return normalized or None
+
+def _relative_gap(event) -> Optional[float]:
+    """Relative gap of a progress event, as reported or computed from objective and bound."""
+    if isinstance(event.get('gap'), (int, float)):
+        return float(event['gap'])
+    objective, bound = event.get('objective'), event.get('best_bound')
+    if isinstance(objective, (int, float)) and isinstance(bound, (int, float)):
+        return abs(objective - bound) / max(abs(objective), 1e-9)
+    return None
+
+def track_incumbent(incumbent: Optional[Dict[str, Any]], event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Fold a progress event into the incumbent summary the stopping policy reads.
+    
+    Args:
+        incumbent: {'event': latest event with an objective, 'best_objective',
+            'last_improvement': received_elapsed of the last objective change},
+            or None before the first incumbent
+        event: Progress event with received_elapsed set
+        
+    Returns:
+        The updated summary (incumbent itself if the event has no objective)
+    """
+    objective = event.get('objective')
+    if not isinstance(objective, (int, float)):
+        return incumbent
+    if incumbent is None:
+        return {'event': event, 'best_objective': objective,
+                'last_improvement': event.get('received_elapsed') or 0.0}
+    incumbent['event'] = event
+    if objective != incumbent['best_objective']:
+        incumbent['best_objective'] = objective
+        incumbent['last_improvement'] = event.get('received_elapsed') or incumbent['last_improvement']
+    return incumbent
+
+def evaluate_stopping_policy(policy, incumbent, elapsed) -> Optional[str]:
+    """
+    Check a stopping policy against the incumbent received so far.
+    
+    Args:
+        policy: Normalized stopping policy (or None)
+        incumbent: Summary kept by track_incumbent (or None)
+        elapsed: Seconds since the job started, on the UI clock
+        
+    Returns:
+        Name of the rule that triggered, or None to keep solving
+    """
+    if not policy or incumbent is None:
+        return None
+    
+    if policy.get('first_feasible'):
+        return 'first_feasible'
+    
+    gap = _relative_gap(incumbent['event'])
+    if policy.get('relative_gap') is not None and gap is not None and gap <= policy['relative_gap']:
+        return 'relative_gap'
+    
+    # Both sides on the UI clock: the core's own 'elapsed' starts later and drifts
+    if policy.get('stall_seconds') is not None and elapsed - incumbent['last_improvement'] >= policy['stall_seconds']:
+        return 'stall_seconds'
+    return None
+
+def _monotonic():
+    """Monotonic clock (the module-level name time refers to datetime.time)."""
+    import time
+    return time.monotonic()
+
+class SolverJob:
+    """
+    One solver run: its config, subprocess, captured output and live progress.
+    
+    The watcher thread owned by SolverJobManager is the only writer; the
+    script thread reads a consistent copy through snapshot().
+    """
+    
+    def __init__(self, job_id: str, config: Dict[str, Any], label: str = "",
+                 temp_files: Optional[List[str]] = None, publish_output: bool = True,
+                 batch_id: Optional[str] = None, use_worker: bool = False):
+        self.id = job_id
+        self.label = label or job_id[:8]
+        self.batch_id = batch_id
+        self.dir = os.path.join(SOLVER_JOBS_DIR, job_id)
+        self.config = dict(config)
+        self.temp_files = list(temp_files or [])
+        self.publish_output = publish_output
+        self.use_worker = use_worker
+        self.runner = None
+        self.output_file = os.path.abspath(os.path.join(self.dir, DEFAULT_SCHEDULE_OUTPUT))
+        self.stop_file = os.path.abspath(os.path.join(self.dir, 'STOP'))
+        self.stop_requested = False
+        self.stop_reason = None
+        self.status = 'queued'
+        self.progress = {}
+        self.status_message = ""
+        self.events = []
+        self.incumbent = None
+        self.stdout_lines = []
+        self.stderr_lines = []
+        self.return_code = None
+        self.error = None
+        self.history_cells = 0
+        self.input_hashes = set()
+        self.created_at = datetime.now().isoformat(timespec='seconds')
+        self.started_at = None
+        self.finished_at = None
+        self.process = None
+        self._started_monotonic = None
+        self.lock = threading.Lock()
+    
+    @property
+    def stdout_log(self):
+        return os.path.join(self.dir, 'stdout.log')
+    
+    @property
+    def stderr_log(self):
+        return os.path.join(self.dir, 'stderr.log')
+    
+    def is_finished(self) -> bool:
+        return self.status in SOLVER_JOB_TERMINAL_STATES
+    
+    def to_status(self) -> Dict[str, Any]:
+        """Serializable status written to status.json."""
+        return {
+            'id': self.id,
+            'label': self.label,
+            'batch_id': self.batch_id,
+            'status': self.status,
+            'runner': self.runner,
+            'stop_requested': self.stop_requested,
+            'stop_reason': self.stop_reason,
+            'progress': self.progress,
+            'status_message': self.status_message,
+            'return_code': self.return_code,
+            'error': self.error,
+            'history_cells': self.history_cells,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'output_file': self.output_file,
+            'pid': self.process.pid if self.process is not None else None
+        }
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Copy of the current status including captured output, taken under the job lock."""
+        with self.lock:
+            status = self.to_status()
+            status['stdout_lines'] = list(self.stdout_lines)
+            status['stderr_lines'] = list(self.stderr_lines)
+            status['events'] = list(self.events)
+            status['config'] = dict(self.config)
+        return status
+    
+    def persist_status(self):
+        """Write status.json atomically; failures are ignored."""
+        try:
+            status_path = os.path.join(self.dir, 'status.json')
+            with open(status_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(self.to_status(), f, default=str)
+            os.replace(status_path + '.tmp', status_path)
+        except (OSError, TypeError, ValueError):
+            pass
+
+class SolverJobManager:
+    """
+    Process-wide owner of solver subprocesses.
+    
+    Jobs are started immediately on submit; a watcher thread per job drains
+    output, applies progress events and persists status, and temporary input
+    files are removed once the job ends.
+    """
+    
+    def __init__(self, jobs_dir: str = SOLVER_JOBS_DIR):
+        self.jobs_dir = jobs_dir
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.worker = None
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self._load_persisted_jobs()
+    
+    def _load_persisted_jobs(self):
+        """Restore finished jobs from disk; jobs that were running when the server stopped are marked lost."""
+        for job_id in os.listdir(self.jobs_dir):
+            status_path = os.path.join(self.jobs_dir, job_id, 'status.json')
+            try:
+                with open(status_path, 'r', encoding='utf-8') as f:
+                    status = json.load(f)
+            except (OSError, ValueError):
+                continue
+            
+            job = SolverJob(job_id, {}, label=status.get('label', ''), batch_id=status.get('batch_id'))
+            for key in ('progress', 'status_message', 'return_code', 'error', 'runner', 'stop_reason',
+                        'history_cells', 'created_at', 'started_at', 'finished_at', 'output_file'):
+                if key in status:
+                    setattr(job, key, status[key])
+            job.status = status.get('status', 'lost')
+            if not job.is_finished():
+                job.status = 'lost'
+                job.persist_status()
+            job.stdout_lines = self._read_log(job.stdout_log)
+            job.stderr_lines = self._read_log(job.stderr_log)
+            self.jobs[job_id] = job
+    
+    @staticmethod
+    def _read_log(log_path):
+        try:
+            with open(log_path, 'r', encoding='utf-8') as f:
+                return [line.rstrip('\n') for line in f]
+        except OSError:
+            return []
+    
+    def submit(self, config: Dict[str, Any], label: str = "", temp_files: Optional[List[str]] = None,
+               publish_output: bool = True, use_worker: bool = False) -> SolverJob:
+        """
+        Create a job for config and start it.
+        
+        Args:
+            config: Solver config as built by build_solver_config
+            label: Display name of the job
+            temp_files: Files to delete once the job has finished
+            publish_output: Copy the result to ./schedule_output.xlsx on success
+            use_worker: Run in the persistent solver worker when available
+        """
+        job = SolverJob(uuid.uuid4().hex, config, label=label, temp_files=temp_files,
+                        publish_output=publish_output, use_worker=use_worker)
+        os.makedirs(job.dir, exist_ok=True)
+        with self.lock:
+            self.jobs[job.id] = job
+        job.persist_status()
+        self.start(job)
+        return job
+    
+    def submit_batch(self, scenarios: List[Tuple[str, Dict[str, Any]]],
+                     max_parallel: Optional[int] = None, use_worker: bool = False) -> str:
+        """
+        Queue several scenarios and run at most max_parallel of them at a time.
+        
+        Args:
+            scenarios: (label, config) pairs
+            max_parallel: Concurrent solver processes, defaults to default_batch_parallelism()
+            use_worker: Run in the persistent solver worker when available
+            
+        Returns:
+            The batch id shared by the scenario jobs
+        """
+        batch_id = uuid.uuid4().hex
+        max_parallel = max_parallel or default_batch_parallelism(len(scenarios))
+        slots = threading.BoundedSemaphore(max_parallel)
+        
+        # Share the machine between the concurrent solves instead of oversubscribing it
+        workers_per_job = max(1, (os.cpu_count() or 1) // max_parallel)
+        
+        for label, config in scenarios:
+            config = dict(config)
+            config.setdefault('num_workers', workers_per_job)
+            job = SolverJob(uuid.uuid4().hex, config, label=label, publish_output=False, batch_id=batch_id,
+                            use_worker=use_worker)
+            os.makedirs(job.dir, exist_ok=True)
+            with self.lock:
+                self.jobs[job.id] = job
+            job.persist_status()
+            self.start(job, slots)
+        return batch_id
+    
+    def batch_jobs(self, batch_id: str) -> List[SolverJob]:
+        """Jobs of a batch in submission order."""
+        with self.lock:
+            jobs = [job for job in self.jobs.values() if job.batch_id == batch_id]
+        return sorted(jobs, key=lambda job: job.created_at)
+    
+    def start(self, job: SolverJob, slots: Optional[threading.BoundedSemaphore] = None):
+        """Launch the watcher thread of a queued job, optionally waiting for a free batch slot."""
+        threading.Thread(target=self._watch, args=(job, slots), daemon=True).start()
+    
+    def get(self, job_id: Optional[str]) -> Optional[SolverJob]:
+        with self.lock:
+            return self.jobs.get(job_id)
+    
+    def list_jobs(self) -> List[SolverJob]:
+        """All known jobs, newest first."""
+        with self.lock:
+            jobs = list(self.jobs.values())
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+    
+    def cancel(self, job_id: str) -> bool:
+        """Terminate a running job. Returns True if a process was signalled."""
+        job = self.get(job_id)
+        if job is None or job.is_finished():
+            return False
+        with job.lock:
+            job.status = 'cancelled'
+            process = job.process
+        job.persist_status()
+        if process is None or process.poll() is not None:
+            return False
+        try:
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        except OSError:
+            pass
+        return True
+    
+    def request_stop(self, job_id: str, reason: str = 'user') -> bool:
+        """
+        Ask a running job to stop searching and write its incumbent schedule.
+        
+        Creates the job's stop file (config['stop_file']); the core polls for
+        it and ends the search gracefully, unlike cancel() which kills it.
+        """
+        job = self.get(job_id)
+        if job is None or job.is_finished():
+            return False
+        try:
+            with open(job.stop_file, 'w', encoding='utf-8') as f:
+                f.write(datetime.now().isoformat(timespec='seconds'))
+        except OSError:
+            return False
+        with job.lock:
+            job.stop_requested = True
+            job.stop_reason = reason
+        job.persist_status()
+        return True
+    
+    def _apply_event(self, job: SolverJob, event: Dict[str, Any]):
+        with job.lock:
+            event = dict(event)
+            if job._started_monotonic is not None:
+                event['received_elapsed'] = round(_monotonic() - job._started_monotonic, 3)
+                event.setdefault('elapsed', event['received_elapsed'])
+            job.events.append(event)
+            job.incumbent = track_incumbent(job.incumbent, event)
+            if 'status_message' in event:
+                job.status_message = event['status_message']
+            else:
+                job.progress.update({key: value for key, value in event.items() if key not in ('source', 'received_elapsed')})
+    
+    def _watch(self, job: SolverJob, slots: Optional[threading.BoundedSemaphore] = None):
+        """Run the solver for job and keep its status current until it ends."""
+        from pathlib import Path
         
-        # Handle final results
-        if return_code == 0:
-            # Success!
-            status_text.text("")
-            progress_bar.progress(100)
-            st.success(get_text('model_success', lang) + " 🎉")
-            
-            # Enhanced success message for historical integration
-            if historical_file_path:
-                st.success("📊 " + ("Historisk vagtplan succesfuldt integreret!" if lang == 'da' 
-                                  else "Historical schedule successfully integrated!"))
-            
-            # Show output file location
-            st.info("📄 " + ("Output gemt til schedule_output.xlsx" if lang == 'da' 
-                           else "Output saved to schedule_output.xlsx"))
-            
-            # Show detailed output in an expander
-            with st.expander("📋 " + ("Detaljeret log" if lang == 'da' else "Detailed log")):
-                # Filter out progress lines for cleaner display
-                clean_output = [line for line in detailed_output if not line.startswith('PROGRESS:')]
-                if clean_output:
-                    st.text('\n'.join(clean_output))
+        if slots is not None:
+            slots.acquire()
+        
+        events = queue.Queue()
+        channel = None
+        try:
+            channel = SolverProgressChannel(events)
+            job.config['progress_channel'] = channel.config()
+            job.config['output_file'] = job.output_file
+            job.config['stop_file'] = job.stop_file
+            
+            core_main = Path(__file__).resolve().parent / "core" / "main.py"
+            flush_constraint_journals(job.config.get('hard_constraints_file'), job.config.get('soft_constraints_file'))
+            self._snapshot_inputs(job)
+            self._expand_set_valued_inputs(job)
+            for key in SOLVER_CONFIG_PATH_KEYS:
+                if isinstance(job.config.get(key), str) and job.config[key]:
+                    job.config[key] = os.path.abspath(job.config[key])
+            
+            config_file = os.path.abspath(os.path.join(job.dir, 'config.json'))
+            with open(config_file, 'w', encoding='utf-8') as f:
+                json.dump(job.config, f, default=str)
+            
+            if job.status == 'cancelled':
+                return
+            job._started_monotonic = _monotonic()
+            job.started_at = datetime.now().isoformat(timespec='seconds')
+            
+            process = self._start_in_worker(job, str(core_main), config_file) if job.use_worker else None
+            if process is None:
+                job.runner = 'subprocess'
+                # Run in the job folder so a core writing ./schedule_output.xlsx writes this job's output
+                process = subprocess.Popen(
+                    [sys.executable, "-u", str(core_main), "--config", config_file],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    bufsize=1,
+                    cwd=job.dir,
+                )
+            with job.lock:
+                job.process = process
+                if job.status == 'cancelled':
+                    process.terminate()
                 else:
-                    st.text("No detailed output available")
-                    
-        else:
-            # Error occurred
-            status_text.text("")
-            st.error(get_text('model_error', lang))
-            
-            # Show error details
-            stderr_output = process.stderr.read()
-            if stderr_output.strip():
-                with st.expander("❌ " + ("Fejl detaljer" if lang == 'da' else "Error details")):
-                    st.text(stderr_output)
-            
-            # Also show stdout for context
-            if detailed_output:
-                with st.expander("📋 " + ("Program output" if lang == 'en' else "Program output")):
-                    clean_output = [line for line in detailed_output if not line.startswith('PROGRESS:')]
-                    st.text('\n'.join(clean_output))
-    
-    except subprocess.TimeoutExpired:
-        # This shouldn't happen since we handle timeout in main.py, but just in case
-        status_text.text("")
-        time_remaining_container.empty()
-        st.error("Model timed out unexpectedly" if lang == 'en' else "Model fik uventet timeout")
+                    job.status = 'running'
+            job.persist_status()
+            
+            process = job.process
+            drain_threads = [
+                threading.Thread(target=_drain_solver_stream,
+                                 args=(process.stdout, job.stdout_lines, events, job.stdout_log), daemon=True),
+                threading.Thread(target=_drain_solver_stream,
+                                 args=(process.stderr, job.stderr_lines, None, job.stderr_log), daemon=True)
+            ]
+            for thread in drain_threads:
+                thread.start()
+            
+            # The core applies config['stopping'] itself; this is a backstop for cores that ignore it
+            policy = job.config.get('stopping')
+            last_persist = 0.0
+            while True:
+                if policy and not job.stop_requested:
+                    reason = evaluate_stopping_policy(policy, job.incumbent, _monotonic() - job._started_monotonic)
+                    if reason:
+                        self.request_stop(job.id, reason=reason)
+                
+                try:
+                    event = events.get(timeout=0.25)
+                except queue.Empty:
+                    if process.poll() is not None and not any(thread.is_alive() for thread in drain_threads):
+                        if events.empty():
+                            break
+                    continue
+                
+                self._apply_event(job, event)
+                if _monotonic() - last_persist > 1.0:
+                    job.persist_status()
+                    last_persist = _monotonic()
+            
+            return_code = process.wait()
+            if job.runner == 'worker':
+                process.close()
+                # The worker child writes stderr straight to the log file
+                job.stderr_lines.extend(self._read_log(job.stderr_log))
+            with job.lock:
+                job.return_code = return_code
+                if job.status != 'cancelled':
+                    job.status = 'succeeded' if return_code == 0 else 'failed'
+            
+            if job.status == 'succeeded':
+                self._collect_output(job)
+        
+        except Exception as e:
+            with job.lock:
+                job.status = 'failed'
+                job.error = f"{type(e).__name__}: {e}"
+        
+        finally:
+            if slots is not None:
+                slots.release()
+            if channel is not None:
+                channel.close()
+            with job.lock:
+                job.finished_at = datetime.now().isoformat(timespec='seconds')
+            job.persist_status()
+            
+            # Temporary inputs (uploaded historical files, merged constraint files) are no longer needed
+            for temp_file in job.temp_files:
+                try:
+                    if temp_file and os.path.exists(temp_file):
+                        os.remove(temp_file)
+                except OSError:
+                    pass
+    
+    def _start_in_worker(self, job: SolverJob, core_main: str, config_file: str):
+        """Hand job to the persistent worker; returns None to fall back to a plain subprocess."""
+        if not solver_worker_supported():
+            return None
+        try:
+            with self.lock:
+                if self.worker is None or self.worker.core_main != core_main:
+                    if self.worker is not None:
+                        self.worker.stop()
+                    self.worker = SolverWorkerClient(core_main, os.path.join(self.jobs_dir, 'worker.log'))
+                worker = self.worker
+            process = worker.submit(config_file, job.stderr_log, cwd=job.dir)
+            job.runner = 'worker'
+            return process
+        except Exception as e:
+            job.stdout_lines.append(f"Solver worker unavailable, starting a new process instead: {e}")
+            return None
+    
+    def _snapshot_inputs(self, job: SolverJob):
+        """
+        Record the job's input workbooks for later change detection.
+        
+        Constraint inputs are recorded as their source files, so a merged set
+        is compared row by row with the files it was built from. Each distinct
+        content is stored once in RUN_INPUT_SNAPSHOT_DIR; <job dir>/inputs.json
+        lists the content hashes per input kind.
+        """
+        if not job.publish_output:
+            return  # only interactive runs become the base of an incremental run
+        try:
+            sources = {}
+            for kind in RUN_INPUT_KINDS:
+                source = job.config.get(f'{kind}_file')
+                paths = constraint_source_files(source) if source and kind.endswith('constraints') else [source]
+                sources[kind] = [(path, _file_content_hash(path)) for path in paths if path and os.path.exists(path)]
+            job.input_hashes = {digest for paths in sources.values() for _, digest in paths}
+            
+            os.makedirs(RUN_INPUT_SNAPSHOT_DIR, exist_ok=True)
+            for paths in sources.values():
+                for path, digest in paths:
+                    snapshot_path = os.path.join(RUN_INPUT_SNAPSHOT_DIR, f"{digest}.xlsx")
+                    if not os.path.exists(snapshot_path):
+                        shutil.copy2(path, snapshot_path + '.tmp')
+                        os.replace(snapshot_path + '.tmp', snapshot_path)
+            with open(os.path.join(job.dir, 'inputs.json'), 'w', encoding='utf-8') as f:
+                json.dump({kind: [digest for _, digest in paths] for kind, paths in sources.items()}, f)
+        except OSError:
+            pass
+    
+    def _prune_input_snapshots(self, keep: set):
+        """Remove snapshots used neither by keep (the new last successful run) nor by unfinished jobs."""
+        with self.lock:
+            for job in self.jobs.values():
+                if not job.is_finished():
+                    keep = keep | job.input_hashes
+        if not os.path.isdir(RUN_INPUT_SNAPSHOT_DIR):
+            return
+        for name in os.listdir(RUN_INPUT_SNAPSHOT_DIR):
+            if name.endswith('.xlsx') and name[:-len('.xlsx')] not in keep:
+                snapshot_path = os.path.join(RUN_INPUT_SNAPSHOT_DIR, name)
+                sidecars = [path for kind in ('employees', 'shifts', 'constraints')
+                            for path in _workbook_cache_paths(snapshot_path, kind)]
+                for path in [snapshot_path] + sidecars:
+                    try:
+                        if os.path.exists(path):
+                            os.remove(path)
+                    except OSError:
+                        pass
+    
+    def _expand_set_valued_inputs(self, job: SolverJob):
+        """Point the job at expanded copies of constraint files with set-valued rows (for cores without support)."""
+        for kind in ('hard_constraints', 'soft_constraints'):
+            source = job.config.get(f'{kind}_file')
+            try:
+                expanded_file = constraints_input_for_core(source, job.dir)
+            except Exception:
+                continue
+            if expanded_file != source:
+                job.config[f'{kind}_file'] = expanded_file
+                job.config[f'{kind}_frame'] = None
+    
+    def _collect_output(self, job: SolverJob):
+        """
+        Check that the job wrote its output file and, for interactive runs,
+        publish it as ./schedule_output.xlsx and add it to the history store.
+        
+        The core runs in the job folder, so core versions that ignore
+        config['output_file'] and write ./schedule_output.xlsx write the
+        job's own output file too. A run that exits cleanly without it fails.
+        """
+        if not os.path.exists(job.output_file):
+            with job.lock:
+                job.status = 'failed'
+                job.error = f"The solver exited without writing {job.output_file}"
+            return
+        try:
+            if job.publish_output and os.path.exists(job.output_file):
+                shutil.copy2(job.output_file, DEFAULT_SCHEDULE_OUTPUT)
+                with open(LAST_SUCCESS_FILE + '.tmp', 'w', encoding='utf-8') as f:
+                    json.dump({'job_id': job.id, 'output_file': job.output_file}, f)
+                os.replace(LAST_SUCCESS_FILE + '.tmp', LAST_SUCCESS_FILE)
+                self._prune_input_snapshots(job.input_hashes)
+        except (OSError, ValueError, TypeError):
+            pass
+        if not job.batch_id:
+            job.history_cells = ingest_job_output_into_history(job.id, job.output_file)
+    
+    def live_input_files(self) -> set:
+        """Absolute paths of the input files referenced by jobs that have not finished."""
+        with self.lock:
+            jobs = [job for job in self.jobs.values() if not job.is_finished()]
+        return {os.path.abspath(job.config[key]) for job in jobs for key in SOLVER_CONFIG_PATH_KEYS
+                if isinstance(job.config.get(key), str)}
+
+@st.cache_resource
+def get_solver_job_manager() -> SolverJobManager:
+    """Process-wide solver job manager shared by all sessions and reruns."""
+    return SolverJobManager()
+
+def run_enhanced_scheduling_model_with_historical(start_date, end_date, max_time, employees_file, shifts_file, 
+                                                hard_constraints_file, soft_constraints_file, historical_file_path, lang, holidays=None,
+                                                warm_start_file=None, use_worker=False, stopping=None,
+                                                incremental=None):
+    """
+    Start the enhanced scheduling model as a background job.
+    
+    The job is owned by the solver job manager, so it keeps running across
+    reruns; show_solver_job_panel displays its progress and result.
+    
+    Returns:
+        The started SolverJob
+    """
+    config = build_solver_config(start_date, end_date, max_time, employees_file, shifts_file,
+                                 hard_constraints_file, soft_constraints_file, historical_file_path,
+                                 holidays=holidays, warm_start_file=warm_start_file, stopping=stopping,
+                                 incremental=incremental)
+    
+    # Clean up uploaded historical and warm start files if they were temporary
+    temp_files = []
+    for input_file in (historical_file_path, warm_start_file):
+        if input_file and (input_file.startswith('/tmp') or 'temp' in input_file.lower()):
+            temp_files.append(input_file)
+    
+    label = f"{start_date.isoformat()} → {end_date.isoformat()}"
+    job = get_solver_job_manager().submit(config, label=label, temp_files=temp_files, use_worker=use_worker)
+    st.session_state.active_solver_job = job.id
+    return job
+
+def render_solver_job_result(snapshot, lang, historical=False):
+    """Show the success or error output of a finished solver job."""
+    stdout_lines = snapshot['stdout_lines']
+    clean_output = [line for line in stdout_lines if not line.startswith('PROGRESS:')]
+    
+    if snapshot['status'] == 'succeeded':
+        st.success(get_text('model_success', lang) + " 🎉")
+        
+        # Enhanced success message for historical integration
+        if historical:
+            st.success("📊 " + ("Historisk vagtplan succesfuldt integreret!" if lang == 'da' 
+                              else "Historical schedule successfully integrated!"))
+        
+        # Show output file location
+        st.info("📄 " + (f"Output gemt til {snapshot['output_file']}" if lang == 'da' 
+                       else f"Output saved to {snapshot['output_file']}"))
+        
+        if snapshot['config'].get('warm_start_file'):
+            show_warm_start_report(snapshot['events'], lang)
+        if snapshot['config'].get('incremental'):
+            show_incremental_report(snapshot['config']['incremental'], snapshot['events'], lang)
+        
+        if snapshot['stop_reason']:
+            reasons = {
+                'user': "stoppet manuelt" if lang == 'da' else "stopped manually",
+                'relative_gap': "gap-mål nået" if lang == 'da' else "gap target reached",
+                'stall_seconds': "ingen forbedring" if lang == 'da' else "no improvement",
+                'first_feasible': "første gyldige løsning" if lang == 'da' else "first feasible solution"
+            }
+            st.info("🏁 " + ("Stoppet tidligt: " if lang == 'da' else "Stopped early: ")
+                    + reasons.get(snapshot['stop_reason'], snapshot['stop_reason']))
+        
+        render_convergence_chart(snapshot, lang)
+        
+        written = snapshot.get('history_cells')
+        if written:
+            st.caption("🗄️ " + (f"{written} celler tilføjet til historiklageret" if lang == 'da'
+                               else f"{written} cells added to the history store"))
+        
+        # Show detailed output in an expander
+        with st.expander("📋 " + ("Detaljeret log" if lang == 'da' else "Detailed log")):
+            if clean_output:
+                st.text('\n'.join(clean_output))
+            else:
+                st.text("No detailed output available")
+        return
+    
+    if snapshot['status'] == 'cancelled':
+        st.warning("⏹️ " + ("Kørslen blev annulleret" if lang == 'da' else "The run was cancelled"))
+    elif snapshot['status'] == 'lost':
+        st.warning("⚠️ " + ("Kørslen blev afbrudt, da appen genstartede" if lang == 'da'
+                            else "The run was interrupted when the app restarted"))
+    else:
+        st.error(get_text('model_error', lang) + (f": {snapshot['error']}" if snapshot.get('error') else ""))
+    
+    # Show error details
+    if snapshot['stderr_lines']:
+        with st.expander("❌ " + ("Fejl detaljer" if lang == 'da' else "Error details")):
+            st.text('\n'.join(snapshot['stderr_lines']))
+    
+    # Also show stdout for context
+    if clean_output:
+        with st.expander("📋 " + ("Program output" if lang == 'en' else "Program output")):
+            st.text('\n'.join(clean_output))
+
+def show_stopping_policy_ui(lang):
+    """
+    Display the early termination settings of the run tab.
+    
+    Returns:
+        Stopping policy dict for build_solver_config, or None
+    """
+    with st.expander("🏁 " + ("Stopregler" if lang == 'da' else "Stopping policies")):
+        col1, col2 = st.columns(2)
+        with col1:
+            gap_percent = st.number_input(
+                "Mål for relativ gap (%)" if lang == 'da' else "Relative gap target (%)",
+                min_value=0.0, max_value=100.0, value=0.0, step=0.5,
+                help="0 = slået fra. Stop når løsningen er højst så langt fra den bedste grænse" if lang == 'da'
+                     else "0 = off. Stop once the incumbent is within this gap of the best bound"
+            )
+        with col2:
+            stall_seconds = st.number_input(
+                "Stop efter N sekunder uden forbedring" if lang == 'da' else "Stop after N seconds without improvement",
+                min_value=0, max_value=7200, value=0, step=30,
+                help="0 = slået fra" if lang == 'da' else "0 = off"
+            )
+        first_feasible = st.checkbox(
+            "Stop ved første gyldige løsning" if lang == 'da' else "Stop at the first feasible solution",
+            value=False
+        )
+    
+    return normalize_stopping_policy({
+        'relative_gap': gap_percent / 100,
+        'stall_seconds': stall_seconds,
+        'first_feasible': first_feasible
+    })
+
+def solver_telemetry(events) -> pd.DataFrame:
+    """
+    Convergence series of a job: elapsed seconds, incumbent objective and best bound.
+    
+    Elapsed time reported by the core wins over the time the UI received the event.
+    """
+    rows = [
+        {'elapsed': event.get('elapsed'), 'objective': event.get('objective'), 'best_bound': event.get('best_bound')}
+        for event in events
+        if isinstance(event.get('objective'), (int, float)) or isinstance(event.get('best_bound'), (int, float))
+    ]
+    telemetry = pd.DataFrame(rows, columns=['elapsed', 'objective', 'best_bound'])
+    telemetry = telemetry.dropna(subset=['elapsed']).astype(float)
+    return telemetry.sort_values('elapsed').drop_duplicates('elapsed', keep='last').reset_index(drop=True)
+
+def render_convergence_chart(snapshot, lang):
+    """Live chart of incumbent objective and best bound over elapsed time."""
+    telemetry = solver_telemetry(snapshot['events'])
+    if telemetry.empty:
+        return
+    
+    st.markdown("**📉 " + ("Konvergens" if lang == 'da' else "Convergence") + "**")
+    chart_data = telemetry.set_index('elapsed').rename(columns={
+        'objective': "Incumbent" if lang == 'en' else "Bedste løsning",
+        'best_bound': "Best bound" if lang == 'en' else "Bedste grænse"
+    })
+    st.line_chart(chart_data, x_label="s", height=220)
+
+def render_solver_job_progress(snapshot, lang):
+    """Show progress bar, status, time remaining and solver metrics of a running job."""
+    progress = snapshot['progress']
+    progress_bar = st.progress(0)
+    status_text, time_remaining_container, metrics_container = st.empty(), st.empty(), st.empty()
+    if snapshot['status'] == 'queued':
+        status_text.text("⏳ " + ("Venter på at starte..." if lang == 'da' else "Waiting to start..."))
+        return
+    
+    render_progress_event(progress, progress_bar, status_text, time_remaining_container,
+                          metrics_container, {'solver_started': progress.get('time_remaining') is not None})
+    if snapshot['status_message']:
+        render_progress_event({'status_message': snapshot['status_message']}, None, status_text,
+                              None, None, {})
+    if snapshot['stop_requested']:
+        status_text.text("⏳ " + ("Stopper og gemmer bedste løsning..." if lang == 'da'
+                                  else "Stopping and saving the incumbent..."))
+    
+    render_convergence_chart(snapshot, lang)
+
+def show_solver_job_panel(lang):
+    """
+    Display the active solver job, reattaching to it after reruns.
+    
+    When the session has no active job (e.g. after a browser refresh), the
+    most recent running job is picked up. While the job runs the panel
+    refreshes itself as a fragment.
+    """
+    manager = get_solver_job_manager()
+    jobs = manager.list_jobs()
+    if not jobs:
+        return
+    
+    job = manager.get(st.session_state.get('active_solver_job'))
+    if job is None:
+        running = [job for job in jobs if not job.is_finished() and job.batch_id is None]
+        if not running:
+            return
+        job = running[0]
+        st.session_state.active_solver_job = job.id
+    
+    def job_panel():
+        snapshot = job.snapshot()
+        runner = {'worker': " · ♨️ worker"}.get(snapshot['runner'], "")
+        st.caption(f"🧮 {snapshot['label']} · {snapshot['status']} · job {snapshot['id'][:8]}{runner}")
+        
+        if job.is_finished():
+            render_solver_job_result(snapshot, lang, historical=bool(snapshot['config'].get('historical_file_path')))
+            if st.session_state.get('_solver_job_polling') == job.id:
+                # Leave fragment polling and redraw the full page once
+                st.session_state._solver_job_polling = None
+                st.rerun()
+            return
+        
+        render_solver_job_progress(snapshot, lang)
+        col1, col2 = st.columns(2)
+        with col1:
+            has_incumbent = any(event.get('objective') is not None for event in snapshot['events'])
+            if st.button("✋ " + ("Stop nu og behold bedste løsning" if lang == 'da' else "Stop now and keep the incumbent"),
+                         key=f"stop_job_{job.id}", disabled=snapshot['stop_requested'] or not has_incumbent):
+                manager.request_stop(job.id)
+        with col2:
+            if st.button("⏹️ " + ("Annuller kørsel" if lang == 'da' else "Cancel run"), key=f"cancel_job_{job.id}"):
+                manager.cancel(job.id)
+                st.rerun()
+    
+    if job.is_finished():
+        job_panel()
+    else:
+        st.session_state._solver_job_polling = job.id
+        st.fragment(job_panel, run_every=1.0)()
+
+# =============================================================================
+# SCENARIO BATCH MODE
+# =============================================================================
+
+def default_batch_parallelism(n_scenarios: int) -> int:
+    """Number of scenarios solved concurrently: bounded by the scenario count and the machine's cores."""
+    return max(1, min(n_scenarios, os.cpu_count() or 1))
+
+def extract_objective_value(snapshot) -> Optional[float]:
+    """
+    Final objective of a finished job.
+    
+    Uses the last objective reported on the progress channel and falls back
+    to an "objective" line in the solver's stdout.
+    """
+    import re
+    
+    for event in reversed(snapshot['events']):
+        if isinstance(event.get('objective'), (int, float)):
+            return float(event['objective'])
+    
+    pattern = re.compile(r'objective[^0-9\-]*(-?\d+(?:[.,]\d+)?)', re.IGNORECASE)
+    for line in reversed(snapshot['stdout_lines']):
+        match = pattern.search(line)
+        if match:
+            try:
+                return float(match.group(1).replace(',', '.'))
+            except ValueError:
+                continue
+    return None
+
+def job_runtime_seconds(snapshot) -> Optional[float]:
+    """Wall-clock runtime of a job from its start and finish timestamps."""
+    try:
+        return (datetime.fromisoformat(snapshot['finished_at'])
+                - datetime.fromisoformat(snapshot['started_at'])).total_seconds()
+    except (TypeError, ValueError):
+        return None
+
+def build_scenario_comparison(snapshots) -> pd.DataFrame:
+    """Side-by-side table of status, objective, best bound, gap and runtime per scenario."""
+    rows = []
+    for snapshot in snapshots:
+        progress = snapshot['progress']
+        rows.append({
+            'scenario': snapshot['label'],
+            'status': snapshot['status'],
+            'objective': extract_objective_value(snapshot),
+            'best_bound': progress.get('best_bound'),
+            'gap': progress.get('gap'),
+            'runtime_s': job_runtime_seconds(snapshot),
+            'stop_reason': snapshot['stop_reason'],
+            'output_file': snapshot['output_file'] if snapshot['status'] == 'succeeded' else None
+        })
+    return pd.DataFrame(rows)
+
+def scenario_rows_to_configs(scenarios_df: pd.DataFrame, base_files: Dict[str, str],
+                             historical_file_path: Optional[str],
+                             stopping=None) -> Tuple[List[Tuple[str, Dict[str, Any]]], List[str]]:
+    """
+    Turn the rows of the scenario editor into solver configs.
+    
+    Empty file cells fall back to the files selected for the single run.
+    The holidays cell is a comma separated list of ISO dates.
+    
+    Returns:
+        Tuple of ((label, config) pairs, list of error messages)
+    """
+    scenarios = []
+    errors = []
+    for position, row in enumerate(scenarios_df.to_dict('records'), start=1):
+        label = str(row.get('name') or '').strip() or f"Scenario {position}"
+        start_date, end_date = row.get('start_date'), row.get('end_date')
+        if pd.isna(start_date) or pd.isna(end_date) or start_date > end_date:
+            errors.append(f"{label}: invalid date range")
+            continue
+        
+        files = {}
+        for key in ('hard_constraints', 'soft_constraints'):
+            value = row.get(f'{key}_file')
+            files[key] = str(value).strip() if isinstance(value, str) and value.strip() else base_files[key]
+            if not dataset_exists(files[key]):
+                errors.append(f"{label}: file not found: {files[key]}")
+        
+        holidays = []
+        for token in str(row.get('holidays') or '').split(','):
+            token = token.strip()
+            if not token:
+                continue
+            try:
+                holidays.append(date.fromisoformat(token).isoformat())
+            except ValueError:
+                errors.append(f"{label}: invalid holiday date '{token}'")
+        
+        max_time = row.get('max_time')
+        config = build_solver_config(
+            pd.Timestamp(start_date).date(), pd.Timestamp(end_date).date(),
+            int(max_time) if not pd.isna(max_time) else 300,
+            base_files['employees'], base_files['shifts'],
+            files['hard_constraints'], files['soft_constraints'],
+            historical_file_path, holidays=holidays, stopping=stopping
+        )
+        scenarios.append((label, config))
+    return scenarios, errors
+
+def show_scenario_batch_ui(lang, start_date, end_date, max_time, final_file_paths, historical_file_path,
+                           stopping=None):
+    """
+    Display scenario batch mode: edit N scenario variants, solve them in
+    parallel and compare objective values and runtimes.
+    """
+    use_batch = st.checkbox(
+        "Scenarie-batch: sammenlign flere varianter" if lang == 'da' else "Scenario batch: compare several variants",
+        help=("Kør flere konfigurationer parallelt (forskellige helligdage, begrænsningsfiler eller datoer)"
+              if lang == 'da' else
+              "Run several configurations in parallel (different holidays, constraint files or date windows)")
+    )
+    
+    if use_batch:
+        if 'scenario_batch_df' not in st.session_state:
+            holidays = ", ".join(holiday.isoformat() for holiday in load_holidays_from_json("holidays.json"))
+            st.session_state.scenario_batch_df = pd.DataFrame([{
+                'name': "Baseline",
+                'start_date': start_date,
+                'end_date': end_date,
+                'hard_constraints_file': final_file_paths.get('hard_constraints', ''),
+                'soft_constraints_file': final_file_paths.get('soft_constraints', ''),
+                'holidays': holidays,
+                'max_time': max_time
+            }])
+        
+        scenarios_df = st.data_editor(
+            st.session_state.scenario_batch_df,
+            num_rows="dynamic",
+            width='stretch',
+            key="scenario_batch_editor",
+            column_config={
+                'name': st.column_config.TextColumn("Navn" if lang == 'da' else "Name"),
+                'start_date': st.column_config.DateColumn(get_text('start_date', lang)),
+                'end_date': st.column_config.DateColumn(get_text('end_date', lang)),
+                'hard_constraints_file': st.column_config.TextColumn(
+                    get_text('hard_constraints_file', lang),
+                    help="Tom = valgt fil ovenfor" if lang == 'da' else "Empty = file selected above"),
+                'soft_constraints_file': st.column_config.TextColumn(
+                    get_text('soft_constraints_file', lang),
+                    help="Tom = valgt fil ovenfor" if lang == 'da' else "Empty = file selected above"),
+                'holidays': st.column_config.TextColumn(
+                    "Helligdage" if lang == 'da' else "Holidays",
+                    help="Kommasepareret, f.eks. 2025-12-24, 2025-12-25" if lang == 'da'
+                         else "Comma separated, e.g. 2025-12-24, 2025-12-25"),
+                'max_time': st.column_config.NumberColumn(
+                    "Maks tid (s)" if lang == 'da' else "Max time (s)", min_value=10, step=10)
+            }
+        )
+        
+        n_scenarios = len(scenarios_df)
+        parallelism = default_batch_parallelism(max(n_scenarios, 1))
+        st.caption(f"⚙️ {n_scenarios} scenarier, op til {parallelism} ad gangen" if lang == 'da'
+                   else f"⚙️ {n_scenarios} scenarios, up to {parallelism} at a time")
+        
+        if st.button("▶️ " + ("Kør scenarier" if lang == 'da' else "Run scenarios"), disabled=n_scenarios == 0):
+            st.session_state.scenario_batch_df = scenarios_df
+            base_files = {key: final_file_paths[key] for key in
+                          ('employees', 'shifts', 'hard_constraints', 'soft_constraints')}
+            scenarios, errors = scenario_rows_to_configs(scenarios_df, base_files, historical_file_path,
+                                                         stopping=stopping)
+            if errors:
+                for error in errors:
+                    st.error(f"❌ {error}")
+            else:
+                st.session_state.active_solver_batch = get_solver_job_manager().submit_batch(
+                    scenarios, use_worker=st.session_state.get('use_solver_worker', False))
+                st.rerun()
+    
+    show_scenario_batch_panel(lang)
+
+def show_scenario_batch_panel(lang):
+    """Per-scenario progress of the active batch and, once all are done, the comparison table."""
+    batch_id = st.session_state.get('active_solver_batch')
+    if not batch_id:
+        return
+    manager = get_solver_job_manager()
+    
+    def batch_panel():
+        snapshots = [job.snapshot() for job in manager.batch_jobs(batch_id)]
+        if not snapshots:
+            return
+        finished = all(snapshot['status'] in SOLVER_JOB_TERMINAL_STATES for snapshot in snapshots)
+        
+        st.markdown("**🧪 " + ("Scenarie-batch" if lang == 'da' else "Scenario batch") + "**")
+        for snapshot in snapshots:
+            progress = snapshot['progress']
+            percentage = progress.get('percent') if isinstance(progress.get('percent'), (int, float)) else 0
+            if snapshot['status'] == 'succeeded':
+                percentage = 100
+            details = format_solver_metrics(progress) or progress.get('message', '')
+            st.progress(max(0, min(100, int(percentage))),
+                        text=f"{snapshot['label']} · {snapshot['status']}" + (f" · {details}" if details else ""))
+        
+        if not finished:
+            if st.button("⏹️ " + ("Annuller batch" if lang == 'da' else "Cancel batch"), key=f"cancel_batch_{batch_id}"):
+                for snapshot in snapshots:
+                    manager.cancel(snapshot['id'])
+                st.rerun()
+            return
+        
+        st.markdown("**📊 " + ("Sammenligning" if lang == 'da' else "Comparison") + "**")
+        st.dataframe(build_scenario_comparison(snapshots), width='stretch', hide_index=True)
+        
+        for snapshot in snapshots:
+            if snapshot['status'] not in ('succeeded', 'cancelled'):
+                with st.expander(f"❌ {snapshot['label']}"):
+                    st.text('\n'.join(snapshot['stderr_lines'] or snapshot['stdout_lines'][-50:]))
+        
+        if st.session_state.get('_solver_batch_polling') == batch_id:
+            # Leave fragment polling and redraw the full page once
+            st.session_state._solver_batch_polling = None
+            st.rerun()
+    
+    if all(job.is_finished() for job in manager.batch_jobs(batch_id)):
+        batch_panel()
+    else:
+        st.session_state._solver_batch_polling = batch_id
+        st.fragment(batch_panel, run_every=1.0)()
+
+# =============================================================================
+# WARM START
+# A previous schedule is passed to the core as config['warm_start_file'] and
+# used as solution hints. The core reports how many hints it applied and how
+# many survived into the final solution as a progress event with the keys
+# hints_total, hints_applied and hints_kept. Uploaded schedules are stored
+# once per content under ./.ui_cache/warm_start/ and parsed once per version.
+# =============================================================================
+
+WARM_START_UPLOAD_DIR = os.path.join(WORKBOOK_CACHE_DIR, "warm_start")
+WARM_START_UPLOAD_MAX_AGE = timedelta(days=7)
+
+def store_warm_start_upload(data: bytes) -> str:
+    """
+    Write an uploaded warm start schedule to a path named by its content.
+    
+    The same upload maps to the same file on every rerun and is written only
+    once; uploads unused for WARM_START_UPLOAD_MAX_AGE are removed.
+    """
+    os.makedirs(WARM_START_UPLOAD_DIR, exist_ok=True)
+    file_path = os.path.abspath(os.path.join(WARM_START_UPLOAD_DIR, f"{hashlib.sha256(data).hexdigest()[:32]}.xlsx"))
+    if os.path.exists(file_path):
+        os.utime(file_path)  # keeps it out of the age-based cleanup
+        return file_path
+    
+    now = datetime.now().timestamp()
+    for name in os.listdir(WARM_START_UPLOAD_DIR):
+        old_path = os.path.join(WARM_START_UPLOAD_DIR, name)
         try:
-            process.kill()
-        except:
+            if now - os.path.getmtime(old_path) > WARM_START_UPLOAD_MAX_AGE.total_seconds():
+                os.remove(old_path)
+        except OSError:
             pass
+    with open(file_path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(file_path + '.tmp', file_path)
+    return file_path
+
+@st.cache_data(max_entries=8)
+def _warm_start_assignments(file_path, mtime_ns, size) -> pd.DataFrame:
+    """read_schedule_assignments cached per file version (mtime_ns and size are the cache key)."""
+    return read_schedule_assignments(file_path)
+
+def load_warm_start_assignments(file_path) -> pd.DataFrame:
+    """Assignments of a warm start schedule, parsed once per version of the file."""
+    stat = os.stat(file_path)
+    return _warm_start_assignments(os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+def read_schedule_assignments(file_path, include_empty: bool = False) -> pd.DataFrame:
+    """Read a schedule workbook in the historical layout into long format (see schedule_frame_to_assignments)."""
+    return schedule_frame_to_assignments(pd.read_excel(file_path), include_empty=include_empty)
+
+def schedule_frame_to_assignments(wide: pd.DataFrame, include_empty: bool = False) -> pd.DataFrame:
+    """
+    Convert a schedule in the historical layout into long format.
+    
+    The first column holds employee IDs and every column whose header parses
+    as a date holds shift IDs; other columns are ignored.
+    
+    Args:
+        wide: Schedule frame
+        include_empty: Keep empty cells (days off) with shift_id ''
         
+    Returns:
+        DataFrame with columns employee_id, date, shift_id (one row per non-empty cell)
+    """
+    if wide.empty or len(wide.columns) < 2:
+        return pd.DataFrame(columns=['employee_id', 'date', 'shift_id'])
+    
+    id_column = wide.columns[0]
+    parsed_headers = pd.to_datetime(pd.Series(wide.columns[1:], dtype=object).astype(str), errors='coerce')
+    date_columns = {column: parsed.date() for column, parsed in zip(wide.columns[1:], parsed_headers)
+                    if not pd.isna(parsed)}
+    if not date_columns:
+        return pd.DataFrame(columns=['employee_id', 'date', 'shift_id'])
+    
+    long_df = wide[[id_column] + list(date_columns)].melt(id_vars=id_column, var_name='date', value_name='shift_id')
+    long_df = long_df.rename(columns={id_column: 'employee_id'})
+    long_df['shift_id'] = long_df['shift_id'].where(long_df['shift_id'].notna(), '').astype(str).str.strip()
+    keep = long_df['employee_id'].notna() if include_empty else (long_df['shift_id'] != '') & long_df['employee_id'].notna()
+    long_df = long_df[keep].copy()
+    long_df['employee_id'] = long_df['employee_id'].astype(str).str.strip()
+    long_df['date'] = long_df['date'].map(date_columns)
+    return long_df.reset_index(drop=True)
+
+def summarize_warm_start_hints(assignments: pd.DataFrame, employees_df: pd.DataFrame, shifts_df: pd.DataFrame,
+                               start_date, end_date) -> Dict[str, Any]:
+    """
+    Estimate how much of a warm start schedule can become solution hints.
+    
+    A hint is usable when its date lies in the planning window and both the
+    employee and the shift still exist in the current data.
+    
+    Returns:
+        Dict with total, outside_window, unknown_employee, unknown_shift,
+        usable and coverage (usable hints per employee-day in the window)
+    """
+    total = len(assignments)
+    in_window = assignments[(assignments['date'] >= start_date) & (assignments['date'] <= end_date)]
+    
+    known_employees = set(employees_df['ID'].dropna().astype(str).str.strip()) if 'ID' in employees_df else set()
+    known_shifts = set(shifts_df['shift_ID'].dropna().astype(str).str.strip()) if 'shift_ID' in shifts_df else set()
+    employee_known = in_window['employee_id'].isin(known_employees)
+    shift_known = in_window['shift_id'].isin(known_shifts)
+    usable = int((employee_known & shift_known).sum())
+    
+    employee_days = len(known_employees) * ((end_date - start_date).days + 1)
+    return {
+        'total': total,
+        'outside_window': total - len(in_window),
+        'unknown_employee': int((~employee_known).sum()),
+        'unknown_shift': int((employee_known & ~shift_known).sum()),
+        'usable': usable,
+        'coverage': usable / employee_days if employee_days else 0.0
+    }
+
+def show_warm_start_report(events, lang):
+    """Show how many warm start hints the core applied and kept, if it reported it."""
+    report = {}
+    for event in events:
+        for key in ('hints_total', 'hints_applied', 'hints_kept'):
+            if event.get(key) is not None:
+                report[key] = event[key]
+    
+    if not report:
+        st.caption("ℹ️ " + ("Solveren rapporterede ikke, hvor mange hints der blev brugt" if lang == 'da'
+                            else "The solver did not report how many hints were used"))
+        return
+    
+    total = report.get('hints_total')
+    parts = []
+    if report.get('hints_applied') is not None:
+        parts.append((f"{report['hints_applied']} anvendt" if lang == 'da' else f"{report['hints_applied']} applied")
+                     + (f" / {total}" if total else ""))
+    if report.get('hints_kept') is not None:
+        kept = report['hints_kept']
+        share = f" ({kept / total:.0%})" if total else ""
+        parts.append((f"{kept} bevaret i løsningen" if lang == 'da' else f"{kept} kept in the solution") + share)
+    st.info("🔥 " + ("Warm start: " if lang == 'en' else "Varmstart: ") + ", ".join(parts))
+
+def show_warm_start_ui(lang, start_date, end_date, employees_file, shifts_file):
+    """
+    Display the warm start selection in the run tab.
+    
+    Returns:
+        Path of the warm start schedule, or None when warm start is off
+    """
+    use_warm_start = st.checkbox(
+        "Varmstart fra tidligere vagtplan" if lang == 'da' else "Warm start from a previous schedule",
+        value=False,
+        help="Brug en tidligere løsning som startgæt, så solveren hurtigere finder en gyldig plan" if lang == 'da'
+             else "Use a previous solution as hints so the solver finds a feasible plan faster"
+    )
+    if not use_warm_start:
+        return None
+    
+    source = st.radio(
+        "Kilde:" if lang == 'da' else "Source:",
+        ["Seneste output" if lang == 'da' else "Last output",
+         "Upload fil" if lang == 'da' else "Upload file"],
+        horizontal=True,
+        key="warm_start_source"
+    )
+    
+    warm_start_file = None
+    if source == ("Seneste output" if lang == 'da' else "Last output"):
+        if os.path.exists(DEFAULT_SCHEDULE_OUTPUT):
+            warm_start_file = os.path.abspath(DEFAULT_SCHEDULE_OUTPUT)
+        else:
+            st.warning("⚠️ " + (f"{DEFAULT_SCHEDULE_OUTPUT} findes ikke endnu" if lang == 'da'
+                                else f"{DEFAULT_SCHEDULE_OUTPUT} does not exist yet"))
+            return None
+    else:
+        uploaded_file = st.file_uploader(
+            "Vælg Excel fil med vagtplan" if lang == 'da' else "Choose Excel file with schedule",
+            type=['xlsx', 'xls'],
+            key="warm_start_file_uploader"
+        )
+        if uploaded_file is None:
+            return None
+        warm_start_file = store_warm_start_upload(uploaded_file.getvalue())
+    
+    try:
+        summary = summarize_warm_start_hints(
+            load_warm_start_assignments(warm_start_file),
+            load_employees(employees_file), load_shifts(shifts_file),
+            start_date, end_date
+        )
+        st.info(
+            f"🔥 {summary['usable']} af {summary['total']} tildelinger kan bruges som hints "
+            f"({summary['coverage']:.0%} af medarbejder-dage i perioden)"
+            if lang == 'da' else
+            f"🔥 {summary['usable']} of {summary['total']} assignments usable as hints "
+            f"({summary['coverage']:.0%} of employee-days in the window)"
+        )
+        dropped = summary['outside_window'] + summary['unknown_employee'] + summary['unknown_shift']
+        if dropped:
+            st.caption(
+                f"Udeladt: {summary['outside_window']} uden for perioden, "
+                f"{summary['unknown_employee']} ukendte medarbejdere, {summary['unknown_shift']} ukendte vagter"
+                if lang == 'da' else
+                f"Dropped: {summary['outside_window']} outside the window, "
+                f"{summary['unknown_employee']} unknown employees, {summary['unknown_shift']} unknown shifts"
+            )
     except Exception as e:
-        # Unexpected error in UI code
-        status_text.text("")
-        time_remaining_container.empty()
-        st.error(f"{get_text('model_error', lang)}: {e}")
+        st.warning(f"Kunne ikke læse varmstart-fil: {e}" if lang == 'da' else f"Could not read warm start file: {e}")
+    
+    return warm_start_file
+
+# =============================================================================
+# INCREMENTAL RE-SOLVE
+# Every interactive job records its input files (constraints as the source
+# files of a merged set) in a content-addressed snapshot store; the last
+# successful interactive run is recorded in .solver_jobs/last_success.json.
+# A change-aware run diffs the current source rows against that snapshot and
+# passes the previous schedule plus the affected (employee, date) cells to the
+# core as config['incremental']; all other assignments are pinned.
+# =============================================================================
+
+RUN_INPUT_KINDS = ('employees', 'shifts', 'hard_constraints', 'soft_constraints')
+LAST_SUCCESS_FILE = os.path.join(SOLVER_JOBS_DIR, 'last_success.json')
+RUN_INPUT_SNAPSHOT_DIR = os.path.join(WORKBOOK_CACHE_DIR, "run_inputs")
+
+def _last_run_input_paths(job_id) -> Optional[Dict[str, List[str]]]:
+    """Snapshot files per input kind of a job, or None if any are missing (older jobs kept copies in inputs/)."""
+    try:
+        with open(os.path.join(SOLVER_JOBS_DIR, job_id, 'inputs.json'), 'r', encoding='utf-8') as f:
+            hashes = json.load(f)
+        paths = {kind: [os.path.join(RUN_INPUT_SNAPSHOT_DIR, f"{digest}.xlsx") for digest in hashes.get(kind, [])]
+                 for kind in RUN_INPUT_KINDS}
+    except (OSError, ValueError):
+        inputs_dir = os.path.join(SOLVER_JOBS_DIR, job_id, 'inputs')
+        paths = {kind: [os.path.join(inputs_dir, f"{kind}.xlsx")] for kind in RUN_INPUT_KINDS}
+    if any(len(paths[kind]) != 1 for kind in ('employees', 'shifts')):
+        return None
+    if not all(os.path.exists(path) for kind_paths in paths.values() for path in kind_paths):
+        return None
+    return paths
+
+def _concat_constraint_frames(paths) -> pd.DataFrame:
+    frames = [frame for frame in (load_constraints(path) for path in paths) if not frame.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['constraint_type'])
+
+def load_last_run_inputs() -> Optional[Dict[str, Any]]:
+    """
+    Load the inputs of the last successful interactive run.
+    
+    Returns:
+        Dict with the job id, its config, the output file and the employees,
+        shifts, hard_constraints and soft_constraints frames, or None
+    """
+    try:
+        with open(LAST_SUCCESS_FILE, 'r', encoding='utf-8') as f:
+            record = json.load(f)
+        with open(os.path.join(SOLVER_JOBS_DIR, record['job_id'], 'config.json'), 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except (OSError, ValueError, KeyError):
+        return None
+    
+    paths = _last_run_input_paths(record['job_id'])
+    if paths is None or not os.path.exists(record.get('output_file', '')):
+        return None
+    
+    return {
+        'job_id': record['job_id'],
+        'config': config,
+        'output_file': record['output_file'],
+        'employees': load_employees(paths['employees'][0]),
+        'shifts': load_shifts(paths['shifts'][0]),
+        'hard_constraints': _concat_constraint_frames(paths['hard_constraints']),
+        'soft_constraints': _concat_constraint_frames(paths['soft_constraints'])
+    }
+
+def _row_signatures(df: pd.DataFrame) -> pd.Series:
+    """One comparable string per row, independent of column order and dtype."""
+    if df.empty:
+        return pd.Series([], dtype=object)
+    columns = sorted(df.columns, key=str)
+    text = df[columns].astype(str).where(df[columns].notna(), '')
+    return pd.Series(['\x1f'.join(values) for values in text.itertuples(index=False, name=None)], index=df.index)
+
+def _changed_constraint_rows(previous: pd.DataFrame, current: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rows present in only one of the two constraint frames (added, removed or edited).
+    
+    Rows are compared by constraint_row_key, so blank columns, column order
+    and dtypes do not make a row look changed.
+    """
+    previous_keys = constraint_row_keys(previous)
+    current_keys = constraint_row_keys(current)
+    previous_set, current_set = set(previous_keys.values()), set(current_keys.values())
+    removed = previous.loc[[label for label, key in previous_keys.items() if key not in current_set]]
+    added = current.loc[[label for label, key in current_keys.items() if key not in previous_set]]
+    return pd.concat([removed, added], ignore_index=True)
+
+def _constraint_row_scope(row, all_dates, current_ids) -> Tuple[Optional[set], Optional[set]]:
+    """
+    Employees and dates of the current run a constraint row refers to.
+    
+    Args:
+        row: Constraint source row
+        all_dates: Dates of the planning window
+        current_ids: IDs of the current employees
+        
+    Returns:
+        (employee IDs or None for everyone, dates or None for the whole window).
+        A set is clipped to the window/current employees and is empty when the
+        row names only dates or employees outside them.
+    """
+    employee_ids = None
+    named_ids = {value.strip() for value in str(row.get('ID', '') or '').split(',')
+                 if value.strip() and value.strip().lower() != 'nan'}
+    if named_ids:
+        employee_ids = named_ids & set(current_ids)
+    
+    dates = None
+    window = set(all_dates)
+    days = pd.to_datetime(pd.Series(_split_list(row.get('day', '')), dtype=object), errors='coerce').dropna()
+    if len(days):
+        dates = {day.date() for day in days} & window
+    start = pd.to_datetime(str(row.get('start_day', '') or ''), errors='coerce')
+    end = pd.to_datetime(str(row.get('end_day', '') or ''), errors='coerce')
+    if not pd.isna(start) or not pd.isna(end):
+        start = start.date() if not pd.isna(start) else min(all_dates)
+        end = end.date() if not pd.isna(end) else max(all_dates)
+        dates = (dates or set()) | {d for d in window if start <= d <= end}
+    
+    return employee_ids, dates
+
+def diff_run_inputs(previous: Dict[str, Any], current: Dict[str, pd.DataFrame], start_date, end_date,
+                    holidays) -> Dict[str, Any]:
+    """
+    Work out which part of the schedule has to be re-solved.
+    
+    Args:
+        previous: Result of load_last_run_inputs
+        current: Current employees, shifts, hard_constraints and soft_constraints frames
+        start_date, end_date: Planning window of the new run
+        holidays: Holidays (ISO strings) of the new run
         
-        # Show traceback for debugging
-        import traceback
-        with st.expander("🐛 " + ("Debug information" if lang == 'en' else "Debug information")):
-            st.text(traceback.format_exc())
+    Returns:
+        Dict with full_resolve_reason (None if an incremental run is possible),
+        changes (readable list), free_cells (list of {'employees', 'dates'}
+        rectangles, None meaning "all") and the variable counts
+        total_variables, free_variables and fixed_variables
+    """
+    all_dates = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    current_ids = current['employees']['ID'].astype(str).str.strip()
+    result = {'full_resolve_reason': None, 'changes': [], 'free_cells': [],
+              'total_variables': len(current_ids) * len(all_dates) * len(current['shifts'])}
+    
+    previous_config = previous['config']
+    if (previous_config.get('start_date'), previous_config.get('end_date')) != (start_date.isoformat(), end_date.isoformat()):
+        result['full_resolve_reason'] = "planning window changed"
+    elif sorted(previous_config.get('holidays') or []) != sorted(holidays or []):
+        result['full_resolve_reason'] = "holidays changed"
+    elif not _row_signatures(previous['shifts']).sort_values().reset_index(drop=True).equals(
+            _row_signatures(current['shifts']).sort_values().reset_index(drop=True)):
+        result['full_resolve_reason'] = "shifts changed"
+    if result['full_resolve_reason']:
+        return result
+    
+    # Employees: edited and new employees are re-planned on every day
+    previous_employees = previous['employees'].assign(_key=previous['employees']['ID'].astype(str).str.strip())
+    current_employees = current['employees'].assign(_key=current_ids)
+    previous_rows = dict(zip(previous_employees['_key'], _row_signatures(previous_employees.drop(columns='_key'))))
+    current_rows = dict(zip(current_employees['_key'], _row_signatures(current_employees.drop(columns='_key'))))
+    
+    changed_employees = {key for key, signature in current_rows.items() if previous_rows.get(key) != signature}
+    if changed_employees:
+        result['free_cells'].append({'employees': sorted(changed_employees), 'dates': None})
+        result['changes'].append(f"{len(changed_employees)} employee(s) added or edited")
+    
+    # Removed employees: everyone is re-planned on the days they worked
+    removed_employees = set(previous_rows) - set(current_rows)
+    if removed_employees:
+        try:
+            base = read_schedule_assignments(previous['output_file'])
+        except Exception:
+            base = pd.DataFrame(columns=['employee_id', 'date', 'shift_id'])
+        worked_days = sorted(set(base.loc[base['employee_id'].isin(removed_employees), 'date']))
+        if base.empty:
+            result['full_resolve_reason'] = "employees removed and the previous schedule is unreadable"
+            return result
+        if worked_days:
+            result['free_cells'].append({'employees': None, 'dates': worked_days})
+        result['changes'].append(f"{len(removed_employees)} employee(s) removed")
+    
+    # Constraints: each changed row frees the employees and dates it refers to
+    for kind in ('hard_constraints', 'soft_constraints'):
+        changed_rows = _changed_constraint_rows(previous[kind], current[kind])
+        for _, row in changed_rows.iterrows():
+            employees, dates = _constraint_row_scope(row, all_dates, current_ids)
+            if employees is None and dates is None:
+                result['full_resolve_reason'] = f"global {kind.split('_')[0]} constraint changed ({row.get('constraint_type', '')})"
+                return result
+            if employees == set() or dates == set():
+                continue  # only touches days or employees outside this run
+            result['free_cells'].append({'employees': sorted(employees) if employees is not None else None,
+                                         'dates': sorted(dates) if dates is not None else None})
+        if len(changed_rows):
+            result['changes'].append(f"{len(changed_rows)} {kind.replace('_', ' ')} row(s) changed")
+    
+    # Count the freed (employee, date) cells once, even where rectangles overlap
+    free_cells = set()
+    for cell in result['free_cells']:
+        employees = cell['employees'] if cell['employees'] is not None else list(current_ids)
+        dates = cell['dates'] if cell['dates'] is not None else all_dates
+        free_cells.update((employee, day) for employee in employees for day in dates)
+    result['free_variables'] = len(free_cells) * len(current['shifts'])
+    result['fixed_variables'] = result['total_variables'] - result['free_variables']
+    return result
+
+def build_incremental_config(previous: Dict[str, Any], diff: Dict[str, Any]) -> Dict[str, Any]:
+    """The config['incremental'] block: base schedule plus the cells the core may change."""
+    return {
+        'base_schedule': previous['output_file'],
+        'base_job_id': previous['job_id'],
+        'free_cells': [
+            {'employees': cell['employees'],
+             'dates': [day.isoformat() for day in cell['dates']] if cell['dates'] is not None else None}
+            for cell in diff['free_cells']
+        ]
+    }
+
+def show_incremental_ui(lang, start_date, end_date, final_file_paths):
+    """
+    Display the change-aware run option.
     
-    finally:
-        # Clean up config file
-        if os.path.exists(config_file):
+    Returns:
+        The config['incremental'] block, or None for a full solve
+    """
+    use_incremental = st.checkbox(
+        "Inkrementel genberegning (kun ændrede medarbejdere/datoer)" if lang == 'da'
+        else "Incremental re-solve (only changed employees/dates)",
+        value=False,
+        help="Fastholder den forrige løsning og løser kun det, som ændringerne berører" if lang == 'da'
+             else "Pins the previous solution and only re-solves what the changes touch"
+    )
+    if not use_incremental:
+        return None
+    
+    previous = load_last_run_inputs()
+    if previous is None:
+        st.warning("⚠️ " + ("Ingen tidligere vellykket kørsel at sammenligne med" if lang == 'da'
+                            else "No previous successful run to compare against"))
+        return None
+    
+    current = {
+        'employees': load_employees(final_file_paths['employees']),
+        'shifts': load_shifts(final_file_paths['shifts']),
+        'hard_constraints': load_constraint_source_rows(final_file_paths['hard_constraints']),
+        'soft_constraints': load_constraint_source_rows(final_file_paths['soft_constraints'])
+    }
+    holidays = [holiday.isoformat() for holiday in load_holidays_from_json("holidays.json")]
+    diff = diff_run_inputs(previous, current, start_date, end_date, holidays)
+    
+    if diff['full_resolve_reason']:
+        st.info("🔁 " + ("Fuld genberegning nødvendig: " if lang == 'da' else "Full re-solve required: ")
+                + diff['full_resolve_reason'])
+        return None
+    if not diff['free_cells']:
+        st.info("✅ " + ("Ingen ændringer siden sidste kørsel" if lang == 'da' else "No changes since the last run"))
+        return None
+    
+    st.info(
+        f"🧩 {', '.join(diff['changes'])} — {diff['free_variables']:,} variable frigivet, "
+        f"{diff['fixed_variables']:,} fastholdt af {diff['total_variables']:,}"
+        if lang == 'da' else
+        f"🧩 {', '.join(diff['changes'])} — {diff['free_variables']:,} variables freed, "
+        f"{diff['fixed_variables']:,} fixed of {diff['total_variables']:,}"
+    )
+    return build_incremental_config(previous, diff)
+
+def show_incremental_report(config, events, lang):
+    """Show the fixed/freed variable counts of an incremental run (as reported by the core when available)."""
+    reported = {}
+    for event in events:
+        for key in ('fixed_variables', 'free_variables'):
+            if event.get(key) is not None:
+                reported[key] = event[key]
+    if reported:
+        st.info(
+            "🧩 " + (f"Inkrementel kørsel: {reported.get('free_variables', '?')} frie, "
+                     f"{reported.get('fixed_variables', '?')} fastholdte variable" if lang == 'da' else
+                     f"Incremental run: {reported.get('free_variables', '?')} free, "
+                     f"{reported.get('fixed_variables', '?')} fixed variables")
+        )
+    else:
+        st.caption("🧩 " + (f"Inkrementel kørsel baseret på job {config['base_job_id'][:8]}" if lang == 'da'
+                           else f"Incremental run based on job {config['base_job_id'][:8]}"))
+
+# =============================================================================
+# HISTORICAL SCHEDULE STORE
+# Past assignments in long format (employee_id, date, shift_id), partitioned
+# by month under ./.history_store/YYYY-MM/. Ingestion only appends part files;
+# the newest part wins for an (employee, date) cell, and a month is compacted
+# into one part once it has accumulated HISTORY_COMPACT_PARTS parts. The run
+# tab exports a compact wide slice of the last N weeks for the solver.
+# =============================================================================
+
+HISTORY_STORE_DIR = "./.history_store"
+HISTORY_SLICES_DIR = os.path.join(HISTORY_STORE_DIR, "slices")
+HISTORY_COMPACT_PARTS = 8
+HISTORY_COLUMNS = ['employee_id', 'date', 'shift_id', 'source', 'ingested_at']
+
+def _history_month_dirs() -> List[str]:
+    """Month partition names (YYYY-MM), oldest first."""
+    if not os.path.isdir(HISTORY_STORE_DIR):
+        return []
+    return sorted(name for name in os.listdir(HISTORY_STORE_DIR)
+                  if len(name) == 7 and name[4] == '-' and os.path.isdir(os.path.join(HISTORY_STORE_DIR, name)))
+
+def _time_ns() -> int:
+    """Wall clock in nanoseconds (the module-level name time refers to datetime.time)."""
+    import time
+    return time.time_ns()
+
+def _write_history_part(month: str, part: pd.DataFrame):
+    """Atomically write one part file into a month partition."""
+    month_dir = os.path.join(HISTORY_STORE_DIR, month)
+    os.makedirs(month_dir, exist_ok=True)
+    part_path = os.path.join(month_dir, f"part-{_time_ns():020d}-{uuid.uuid4().hex[:8]}.pkl")
+    with open(part_path + '.tmp', 'wb') as f:
+        pickle.dump(part.reset_index(drop=True), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(part_path + '.tmp', part_path)
+
+def _read_history_month(month: str) -> pd.DataFrame:
+    """All cells of one month, newest ingestion winning per (employee_id, date)."""
+    month_dir = os.path.join(HISTORY_STORE_DIR, month)
+    parts = []
+    for name in sorted(os.listdir(month_dir)):
+        if name.startswith('part-') and name.endswith('.pkl'):
             try:
-                os.remove(config_file)
-            except:
-                pass  # Ignore cleanup errors
+                with open(os.path.join(month_dir, name), 'rb') as f:
+                    parts.append(pickle.load(f))
+            except (OSError, pickle.UnpicklingError, EOFError):
+                continue
+    if not parts:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    month_df = pd.concat(parts, ignore_index=True)
+    month_df = month_df.sort_values('ingested_at', kind='stable')
+    return month_df.drop_duplicates(['employee_id', 'date'], keep='last').reset_index(drop=True)
+
+def _compact_history_month(month: str):
+    """Replace the parts of a month by a single deduplicated part."""
+    month_dir = os.path.join(HISTORY_STORE_DIR, month)
+    old_parts = [name for name in os.listdir(month_dir) if name.startswith('part-') and name.endswith('.pkl')]
+    if len(old_parts) < HISTORY_COMPACT_PARTS:
+        return
+    compacted = _compact_history_dtypes(_read_history_month(month))
+    _write_history_part(month, compacted)
+    for name in old_parts:
+        try:
+            os.remove(os.path.join(month_dir, name))
+        except OSError:
+            pass
+
+def _compact_history_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Columnar, compact dtypes: categories for repeated strings, datetime64 for dates."""
+    df = df.copy()
+    for column in ('employee_id', 'shift_id', 'source'):
+        df[column] = df[column].astype(str).astype('category')
+    df['date'] = pd.to_datetime(df['date']).astype('datetime64[ns]')
+    df['ingested_at'] = df['ingested_at'].astype('int64')
+    return df
+
+def ingest_history_assignments(assignments: pd.DataFrame, source: str) -> int:
+    """
+    Append assignments to the store.
+    
+    Args:
+        assignments: Long frame with employee_id, date, shift_id; an empty
+                     shift_id records a day off and overrides older entries
+        source: Where the data came from (e.g. 'run:<job id>', 'converter')
         
-        # Clean up uploaded historical file if it was temporary
-        if historical_file_path and (historical_file_path.startswith('/tmp') or 'temp' in historical_file_path.lower()):
+    Returns:
+        Number of cells written
+    """
+    if assignments.empty:
+        return 0
+    batch = assignments[['employee_id', 'date', 'shift_id']].copy()
+    batch['source'] = source
+    batch['ingested_at'] = _time_ns()
+    batch = _compact_history_dtypes(batch)
+    
+    for month, part in batch.groupby(batch['date'].dt.strftime('%Y-%m'), observed=True):
+        _write_history_part(month, part)
+        _compact_history_month(month)
+    return len(batch)
+
+def ingest_history_file(file_path, source: str) -> int:
+    """
+    Ingest a schedule workbook in the historical layout.
+    
+    Falls back to convert_schedule_format for finished schedules in the
+    date-rows layout. Returns the number of cells written (0 if unreadable).
+    """
+    assignments = read_schedule_assignments(file_path, include_empty=True)
+    if assignments.empty and convert_schedule_format is not None:
+        with tempfile.NamedTemporaryFile(delete=False, suffix='_converted.xlsx') as tmp_output:
+            converted_path = tmp_output.name
+        try:
+            if convert_schedule_format(file_path, converted_path):
+                assignments = read_schedule_assignments(converted_path, include_empty=True)
+        finally:
             try:
-                if os.path.exists(historical_file_path):
-                    os.remove(historical_file_path)
-            except:
-                pass  # Ignore cleanup errors
+                os.remove(converted_path)
+            except OSError:
+                pass
+    return ingest_history_assignments(assignments, source)
+
+def ingest_job_output_into_history(job_id, output_file) -> int:
+    """Ingest a successful interactive run's output once (a marker file in the job folder prevents repeats)."""
+    marker = os.path.join(SOLVER_JOBS_DIR, job_id, 'history_ingested')
+    if os.path.exists(marker) or not os.path.exists(output_file):
+        return 0
+    try:
+        written = ingest_history_file(output_file, f"run:{job_id[:8]}")
+    except Exception:
+        return 0
+    with open(marker, 'w', encoding='utf-8') as f:
+        f.write(str(written))
+    return written
+
+def load_history_window(start_date, end_date) -> pd.DataFrame:
+    """Worked assignments between start_date and end_date (inclusive), reading only the months needed."""
+    first_month, last_month = start_date.strftime('%Y-%m'), end_date.strftime('%Y-%m')
+    months = [month for month in _history_month_dirs() if first_month <= month <= last_month]
+    frames = [_read_history_month(month) for month in months]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    window = pd.concat(frames, ignore_index=True)
+    dates = pd.to_datetime(window['date']).dt.date
+    window = window[(dates >= start_date) & (dates <= end_date) & (window['shift_id'].astype(str) != '')]
+    return window.reset_index(drop=True)
+
+def history_store_revision() -> str:
+    """
+    Short hash naming the current contents of the store.
+    
+    Part files are immutable and uniquely named, so the set of part names
+    changes whenever anything is ingested or compacted.
+    """
+    parts = []
+    for month in _history_month_dirs():
+        parts.extend(f"{month}/{name}" for name in os.listdir(os.path.join(HISTORY_STORE_DIR, month))
+                     if name.startswith('part-') and name.endswith('.pkl'))
+    return hashlib.sha256('\n'.join(sorted(parts)).encode('utf-8')).hexdigest()[:12]
+
+def _remove_stale_history_slices(revision: str):
+    """Delete slices of older store revisions that no unfinished solver job reads."""
+    if not os.path.isdir(HISTORY_SLICES_DIR):
+        return
+    live_files = get_solver_job_manager().live_input_files()
+    for name in os.listdir(HISTORY_SLICES_DIR):
+        slice_path = os.path.abspath(os.path.join(HISTORY_SLICES_DIR, name))
+        if name.startswith(f"history_{revision}_") or slice_path in live_files:
+            continue
+        try:
+            os.remove(slice_path)
+        except OSError:
+            pass
+
+def history_store_last_date():
+    """Most recent date held in the store, or None if it is empty."""
+    for month in reversed(_history_month_dirs()):
+        month_df = _read_history_month(month)
+        if not month_df.empty:
+            return pd.to_datetime(month_df['date']).max().date()
+    return None
+
+def export_history_slice(window: pd.DataFrame, file_path) -> str:
+    """Write a history window as a wide historical-layout workbook (Employee_ID × dates)."""
+    wide = (window.assign(date=pd.to_datetime(window['date']).dt.strftime('%Y-%m-%d'),
+                          employee_id=window['employee_id'].astype(str),
+                          shift_id=window['shift_id'].astype(str))
+            .pivot(index='employee_id', columns='date', values='shift_id')
+            .sort_index(axis=1)
+            .fillna('')
+            .reset_index()
+            .rename(columns={'employee_id': 'Employee_ID'}))
+    wide.columns.name = None
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    wide.to_excel(file_path, index=False)
+    return file_path
+
+def show_history_store_source(lang) -> Optional[str]:
+    """
+    Historical source "last N weeks from the history store".
+    
+    Returns:
+        Path of the exported slice, or None if the store is empty
+    """
+    last_date = history_store_last_date()
+    if last_date is None:
+        st.warning("⚠️ " + ("Historiklageret er tomt. Det fyldes efter vellykkede kørsler og fra konverteren i Værktøjer."
+                            if lang == 'da' else
+                            "The history store is empty. It is filled after successful runs and from the converter in Tools."))
+        return None
+    
+    weeks = st.number_input(
+        "Antal uger" if lang == 'da' else "Number of weeks",
+        min_value=1, max_value=104, value=8, step=1,
+        key="history_store_weeks"
+    )
+    window_start = last_date - timedelta(days=7 * weeks - 1)
+    window = load_history_window(window_start, last_date)
+    
+    # Keyed by store revision: a window over changed history is a new slice
+    revision = history_store_revision()
+    slice_path = os.path.join(HISTORY_SLICES_DIR,
+                              f"history_{revision}_{window_start.isoformat()}_{last_date.isoformat()}.xlsx")
+    if not os.path.exists(slice_path):
+        _remove_stale_history_slices(revision)
+        export_history_slice(window, slice_path)
+    
+    st.info(
+        f"**Historisk data:** {window['employee_id'].nunique()} medarbejdere, {len(window)} vagter "
+        f"({window_start} til {last_date})"
+        if lang == 'da' else
+        f"**Historical data:** {window['employee_id'].nunique()} employees, {len(window)} shifts "
+        f"({window_start} to {last_date})"
+    )
+    return slice_path
 
 # =============================================================================
 # MAIN APPLICATION
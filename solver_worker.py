@@ -0,0 +1,266 @@
+"""
+Persistent solver worker for the scheduling UI.
+
+Started once by UI_app.py, the worker imports pandas, the solver library and
+core/main.py with all of its constraint modules, then waits for jobs on a
+local TCP port. Every job runs in a forked child that inherits the warm
+interpreter, so a solve starts without interpreter or import start-up.
+Excel inputs read through pandas.read_excel are cached in the worker, keyed
+by path, size and modification time, and children read them from memory.
+Only the newest version of each path is kept, and at most
+WORKBOOK_CACHE_LIMIT workbooks in total.
+
+The worker never runs threads of its own: connections, child exits and the
+parent check are all handled by one select loop, so a fork never copies a
+lock held by another thread. If a preloaded native library started threads
+anyway, jobs run in a fresh interpreter instead of a fork. The worker exits
+when the UI process that started it is gone.
+
+Protocol (one connection per job):
+    client -> worker   one JSON line: {"config_file": ..., "stderr_log": ..., "cwd": ...}
+    worker -> client   "__PID__:<pid>", then the child's stdout, then
+                       "__EXIT__:<return code>"
+
+POSIX only (requires os.fork); the UI falls back to a plain subprocess elsewhere.
+"""
+
+import argparse
+import json
+import os
+import runpy
+import select
+import signal
+import socket
+import subprocess
+import sys
+import traceback
+from collections import OrderedDict
+
+import pandas as pd
+
+PID_PREFIX = "__PID__:"
+EXIT_PREFIX = "__EXIT__:"
+READY_PREFIX = "READY:"
+
+# =============================================================================
+# INPUT CACHE
+# =============================================================================
+
+WORKBOOK_CACHE_LIMIT = 16
+
+_original_read_excel = pd.read_excel
+# abspath -> (key, sheets), least recently used first
+_workbook_cache = OrderedDict()
+_CACHEABLE_KWARGS = {'sheet_name', 'engine'}
+
+def _workbook_key(path):
+    """Cache key of a workbook on disk, or None if it is not a readable file."""
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+def _cached_sheets(key):
+    """Cached sheets for key, or None if the path is not cached at this version."""
+    if key is None or key[0] not in _workbook_cache:
+        return None
+    cached_key, sheets = _workbook_cache[key[0]]
+    if cached_key != key:
+        return None
+    _workbook_cache.move_to_end(key[0])
+    return sheets
+
+def warm_workbook(path):
+    """Read every sheet of path into the cache unless the cached copy is current."""
+    key = _workbook_key(path)
+    if key is None or _cached_sheets(key) is not None:
+        return
+    # Drop the stale version first so a failed read does not leave it behind
+    _workbook_cache.pop(key[0], None)
+    try:
+        _workbook_cache[key[0]] = (key, _original_read_excel(path, sheet_name=None))
+    except Exception:
+        return
+    while len(_workbook_cache) > WORKBOOK_CACHE_LIMIT:
+        _workbook_cache.popitem(last=False)
+
+def cached_read_excel(io, *args, **kwargs):
+    """
+    Drop-in replacement for pandas.read_excel serving warmed workbooks from memory.
+
+    Only plain reads (optionally selecting a sheet) are served from the cache;
+    any other arguments go to pandas unchanged.
+    """
+    if args or set(kwargs) - _CACHEABLE_KWARGS or not isinstance(io, (str, os.PathLike)):
+        return _original_read_excel(io, *args, **kwargs)
+
+    sheets = _cached_sheets(_workbook_key(io))
+    if sheets is None:
+        return _original_read_excel(io, *args, **kwargs)
+
+    sheet_name = kwargs.get('sheet_name', 0)
+    names = list(sheets)
+    if sheet_name is None:
+        return {name: frame.copy() for name, frame in sheets.items()}
+    if isinstance(sheet_name, list):
+        return {name: sheets[names[name] if isinstance(name, int) else name].copy() for name in sheet_name}
+    if isinstance(sheet_name, int):
+        return sheets[names[sheet_name]].copy()
+    return sheets[sheet_name].copy()
+
+# =============================================================================
+# JOB EXECUTION
+# =============================================================================
+
+def preload_core(main_path):
+    """Execute core/main.py's module level once so all of its imports are in sys.modules."""
+    core_dir = os.path.dirname(os.path.abspath(main_path))
+    if core_dir not in sys.path:
+        sys.path.insert(0, core_dir)
+    try:
+        import ortools.sat.python.cp_model  # noqa: F401
+    except ImportError:
+        pass
+    try:
+        runpy.run_path(main_path, run_name='__solver_preload__')
+    except Exception:
+        traceback.print_exc()
+
+def _native_thread_count():
+    """Number of OS threads in this process (1 where it cannot be determined)."""
+    try:
+        return len(os.listdir('/proc/self/task'))
+    except OSError:
+        return 1
+
+def run_job_in_child(conn, main_path, request):
+    """Forked child: redirect stdout to the connection, stderr to the log, and run main.py in the job folder."""
+    exit_code = 1
+    try:
+        conn.sendall(f"{PID_PREFIX}{os.getpid()}\n".encode('utf-8'))
+        os.dup2(conn.fileno(), 1)
+        stderr_fd = os.open(request['stderr_log'], os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        os.dup2(stderr_fd, 2)
+        os.close(stderr_fd)
+        if request.get('cwd'):
+            os.chdir(request['cwd'])
+        sys.stdout = os.fdopen(1, 'w', buffering=1, encoding='utf-8', closefd=False)
+        sys.stderr = os.fdopen(2, 'w', buffering=1, encoding='utf-8', closefd=False)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+        sys.argv = [main_path, '--config', request['config_file']]
+        try:
+            runpy.run_path(main_path, run_name='__main__')
+            exit_code = 0
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except Exception:
+            pass
+        os._exit(exit_code)
+
+def run_job_in_subprocess(conn, main_path, request):
+    """Run main.py in a fresh interpreter wired like a forked child; returns its process."""
+    with open(request['stderr_log'], 'a', encoding='utf-8') as stderr_file:
+        process = subprocess.Popen(
+            [sys.executable, "-u", main_path, '--config', request['config_file']],
+            stdout=conn.fileno(),
+            stderr=stderr_file,
+            cwd=request.get('cwd') or None,
+        )
+    conn.sendall(f"{PID_PREFIX}{process.pid}\n".encode('utf-8'))
+    return process
+
+def handle_connection(conn, main_path):
+    """
+    Read a job request, warm its inputs and start a child to run it.
+
+    Returns:
+        pid of the child, or None if the request was rejected
+    """
+    reader = conn.makefile('r', encoding='utf-8')
+    try:
+        request = json.loads(reader.readline())
+        reader.close()
+        with open(request['config_file'], 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except (OSError, ValueError, KeyError) as e:
+        conn.sendall(f"Invalid job request: {e}\n{EXIT_PREFIX}1\n".encode('utf-8'))
+        conn.close()
+        return None
+
+    # Forking is only safe while this is the only thread in the process
+    if _native_thread_count() > 1:
+        return run_job_in_subprocess(conn, main_path, request).pid
+
+    for key in ('employees_file', 'shifts_file', 'hard_constraints_file', 'soft_constraints_file'):
+        if config.get(key):
+            warm_workbook(config[key])
+
+    pid = os.fork()
+    if pid == 0:
+        run_job_in_child(conn, main_path, request)
+    return pid
+
+def reap_children(children):
+    """Report the exit code of every finished child to its client and forget it."""
+    for pid in list(children):
+        try:
+            finished, status = os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            finished, status = pid, 1 << 8
+        if finished == 0:
+            continue
+        return_code = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+        conn = children.pop(pid)
+        try:
+            conn.sendall(f"\n{EXIT_PREFIX}{return_code}\n".encode('utf-8'))
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+def serve(main_path, parent_pid=None):
+    """Preload core, announce the port on stdout and run jobs until the parent exits or the worker is killed."""
+    pd.read_excel = cached_read_excel
+    preload_core(main_path)
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(8)
+    print(f"{READY_PREFIX}{server.getsockname()[1]}", flush=True)
+
+    children = {}
+    while parent_pid is None or os.getppid() == parent_pid:
+        readable, _, _ = select.select([server], [], [], 1.0)
+        if readable:
+            conn, _ = server.accept()
+            try:
+                pid = handle_connection(conn, main_path)
+                if pid is not None:
+                    children[pid] = conn
+            except Exception:
+                traceback.print_exc()
+                conn.close()
+        reap_children(children)
+
+    # The UI is gone: stop running solves instead of leaving them orphaned
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Persistent solver worker")
+    parser.add_argument('--main', required=True, help="Path to core/main.py")
+    parser.add_argument('--parent-pid', type=int, default=None, help="Exit when this process is no longer the parent")
+    args = parser.parse_args()
+    serve(args.main, args.parent_pid)